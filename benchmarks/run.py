@@ -0,0 +1,316 @@
+"""
+Measure per-request overhead of layab request handling against a trivial endpoint.
+
+Each scenario is driven in process (no network) and reports:
+    - ns/request: Average time spent per request.
+    - peak KiB/request: Memory allocated at peak while processing a single request (tracemalloc).
+    - ratio: ns/request relative to the same framework without layab, so that baselines can be compared across machines.
+
+Run with:
+    python benchmarks/run.py
+    python benchmarks/run.py --update-baseline
+"""
+import argparse
+import asyncio
+import gc
+import io
+import json
+import logging
+import os.path
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+# Benchmark the working copy, without requiring it to be installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Name: (number of extra headers, number of query parameters, body size in bytes)
+VARIANTS = {
+    "small": (0, 0, 0),
+    "headers": (50, 0, 0),
+    "query": (0, 50, 0),
+    "body": (0, 0, 64 * 1024),
+}
+
+
+def _request_parts(variant: str):
+    header_count, query_count, body_size = VARIANTS[variant]
+    headers = [("Host", "localhost"), ("User-Agent", "benchmark")]
+    headers.extend(
+        (f"X-Header-{index}", f"value {index}") for index in range(header_count)
+    )
+    query = "&".join(f"param{index}=value{index}" for index in range(query_count))
+    return headers, query, b"x" * body_size
+
+
+class StarletteDriver:
+    def __init__(self, variant: str, **middleware_options):
+        from starlette.applications import Starlette
+        from starlette.middleware import Middleware
+        from starlette.responses import PlainTextResponse
+
+        import layab.starlette
+
+        middleware = {
+            None: None,
+            "logging": lambda: [Middleware(layab.starlette.LoggingMiddleware)],
+            "proxy": lambda: [Middleware(layab.starlette.ProxyHeadersMiddleware)],
+            "stack": lambda: layab.starlette.middleware(compress=True),
+            "fused": lambda: layab.starlette.middleware(compress=True, fused=True),
+        }[middleware_options.get("middleware")]
+        self.app = Starlette(middleware=middleware() if middleware else None)
+
+        @self.app.route("/bench", methods=["GET", "POST"])
+        async def bench(request):
+            await request.body()
+            return PlainTextResponse("")
+
+        headers, query, self.body = _request_parts(variant)
+        self.scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": "POST" if self.body else "GET",
+            "scheme": "http",
+            "path": "/bench",
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": [
+                (name.lower().encode(), value.encode()) for name, value in headers
+            ]
+            + [(b"x-forwarded-proto", b"https"), (b"x-forwarded-for", b"10.0.0.1")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 80),
+        }
+        self.loop = asyncio.new_event_loop()
+
+    def _receiver(self):
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": self.body, "more_body": False}
+            # Client stays connected until the response is sent
+            await asyncio.Event().wait()
+
+        return receive
+
+    async def _send(self, message):
+        pass
+
+    async def _requests(self, count: int):
+        for _ in range(count):
+            await self.app(dict(self.scope), self._receiver(), self._send)
+
+    def __call__(self, count: int):
+        self.loop.run_until_complete(self._requests(count))
+
+    def close(self):
+        self.loop.close()
+
+
+class FlaskDriver:
+    def __init__(self, variant: str, log_requests: bool = False):
+        import flask
+        import flask_restx
+        from werkzeug.test import EnvironBuilder
+
+        import layab.flask_restx
+
+        flask_restx.Resource.method_decorators.clear()
+        if log_requests:
+            layab.flask_restx.log_requests()
+        # Decorators are shared by all resources, only apply them while this driver is running
+        self.method_decorators = list(flask_restx.Resource.method_decorators)
+        flask_restx.Resource.method_decorators.clear()
+        self.app = flask.Flask(__name__)
+        api = flask_restx.Api(self.app)
+
+        @api.route("/bench")
+        class Bench(flask_restx.Resource):
+            def get(self):
+                return flask.Response(b"")
+
+            def post(self):
+                flask.request.get_data()
+                return flask.Response(b"")
+
+        headers, query, self.body = _request_parts(variant)
+        self.environ = EnvironBuilder(
+            path="/bench",
+            method="POST" if self.body else "GET",
+            query_string=query,
+            headers=headers,
+            data=self.body,
+        ).get_environ()
+
+    def _start_response(self, status, headers, exc_info=None):
+        pass
+
+    def __call__(self, count: int):
+        import flask_restx
+
+        flask_restx.Resource.method_decorators[:] = self.method_decorators
+        for _ in range(count):
+            environ = dict(self.environ)
+            environ["wsgi.input"] = io.BytesIO(self.body)
+            for _ in self.app.wsgi_app(environ, self._start_response):
+                pass
+
+    def close(self):
+        import flask_restx
+
+        flask_restx.Resource.method_decorators.clear()
+
+
+# Name: (reference scenario name, driver factory)
+def _scenarios() -> Dict[str, tuple]:
+    scenarios = {}
+    for variant in VARIANTS:
+        reference = f"starlette-none-{variant}"
+        for middleware in (None, "logging", "proxy", "stack", "fused"):
+            scenarios[f"starlette-{middleware or 'none'}-{variant}"] = (
+                reference,
+                lambda variant=variant, middleware=middleware: StarletteDriver(
+                    variant, middleware=middleware
+                ),
+            )
+        reference = f"flask-none-{variant}"
+        scenarios[reference] = (reference, lambda variant=variant: FlaskDriver(variant))
+        scenarios[f"flask-log_requests-{variant}"] = (
+            reference,
+            lambda variant=variant: FlaskDriver(variant, log_requests=True),
+        )
+    return scenarios
+
+
+def _time_per_request(
+    drivers: List[Callable[[int], None]], requests: int, repeat: int
+) -> List[float]:
+    """
+    Return the best ns/request of each driver.
+    Drivers are run alternately so that machine load variations affect them the same way.
+    """
+    timings = [[] for _ in drivers]
+    for driver in drivers:
+        driver(max(requests // 10, 1))  # Warm up
+    # Same as timeit, do not let garbage collection add noise to timings
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for driver, driver_timings in zip(drivers, timings):
+                start = time.perf_counter_ns()
+                driver(requests)
+                driver_timings.append((time.perf_counter_ns() - start) / requests)
+    finally:
+        gc.enable()
+    return [min(driver_timings) for driver_timings in timings]
+
+
+def _peak_bytes_per_request(driver: Callable[[int], None], requests: int) -> float:
+    peaks = []
+    for _ in range(requests):
+        tracemalloc.start()
+        driver(1)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def measure(names: List[str], requests: int, repeat: int) -> Dict[str, dict]:
+    scenarios = _scenarios()
+    results = {}
+    for name in names:
+        reference, create_driver = scenarios[name]
+        driver = create_driver()
+        drivers = [driver] if reference == name else [driver, scenarios[reference][1]()]
+        try:
+            timings = _time_per_request(drivers, requests, repeat)
+            results[name] = {
+                "ns_per_request": round(timings[0]),
+                "peak_bytes_per_request": round(
+                    _peak_bytes_per_request(driver, max(requests // 20, 1))
+                ),
+                "ratio": round(timings[0] / timings[-1], 2),
+            }
+        finally:
+            for driver in drivers:
+                driver.close()
+    return results
+
+
+def compare(
+    results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float
+) -> List[str]:
+    """Return the name of scenarios slower than baseline (given the tolerance)."""
+    print(
+        f"{'scenario':35} {'ns/request':>12} {'peak KiB/req':>13} {'ratio':>7} {'baseline':>9} {'change':>8}"
+    )
+    regressions = []
+    for name, result in results.items():
+        line = (
+            f"{name:35} {result['ns_per_request']:12.0f} "
+            f"{result['peak_bytes_per_request'] / 1024:13.1f} {result['ratio']:7.2f}"
+        )
+        if name in baseline:
+            change = result["ratio"] / baseline[name]["ratio"] - 1
+            line += f" {baseline[name]['ratio']:9.2f} {change:+8.0%}"
+            if change > tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+def main(args: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--filter", default="", help="Only run scenarios containing this text."
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="Accepted ratio increase compared to baseline (0.3 by default).",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help=f"Store results as the new baseline in {BASELINE_PATH}.",
+    )
+    options = parser.parse_args(args)
+
+    scenarios = _scenarios()
+    names = sorted(name for name in scenarios if options.filter in name)
+
+    # Measure request handling, not logging handlers
+    logging.disable(logging.CRITICAL)
+    results = measure(names, options.requests, options.repeat)
+
+    baseline = {}
+    if os.path.isfile(BASELINE_PATH):
+        with open(BASELINE_PATH) as baseline_file:
+            baseline = json.load(baseline_file)
+    regressions = compare(results, baseline, options.tolerance)
+
+    if options.update_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=4, sort_keys=True)
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} scenario(s) slower than baseline: {regressions}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
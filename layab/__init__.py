@@ -1,7 +1,50 @@
+import importlib
+from typing import TYPE_CHECKING
+
 from layab.version import __version__
-from layab._configuration import (
-    load,
-    load_configuration,
-    load_logging_configuration,
-    get_environment,
-)
+
+# Public name: module providing it. Modules are only imported on first access to keep import time low.
+_LAZY_ATTRIBUTES = {
+    "load": "layab._configuration",
+    "load_configuration": "layab._configuration",
+    "load_logging_configuration": "layab._configuration",
+    "get_environment": "layab._configuration",
+    "MemoryTracker": "layab._memory",
+    "RequestContextFilter": "layab._logging",
+    "current_request_id": "layab._logging",
+    "HealthChecks": "layab._health",
+    "GracefulShutdown": "layab._shutdown",
+    "ConfigurationWatcher": "layab._reload",
+    "preload": "layab._prefork",
+    "reinitialize_logging_handlers": "layab._prefork",
+    "Metrics": "layab._metrics",
+}
+
+if TYPE_CHECKING:
+    from layab._configuration import (
+        load,
+        load_configuration,
+        load_logging_configuration,
+        get_environment,
+    )
+    from layab._memory import MemoryTracker
+    from layab._logging import RequestContextFilter, current_request_id
+    from layab._health import HealthChecks
+    from layab._shutdown import GracefulShutdown
+    from layab._reload import ConfigurationWatcher
+    from layab._prefork import preload, reinitialize_logging_handlers
+    from layab._metrics import Metrics
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module 'layab' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    # Next accesses will not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -0,0 +1,122 @@
+import json
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Headers that only apply to a single connection (RFC 7230, section 6.1), and Accept-Encoding as sub-responses are
+# embedded (decoded) within the batch response
+_NOT_FORWARDED = frozenset(
+    {
+        "accept-encoding",
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+# Header names are tokens (RFC 7230, section 3.2.6)
+_HEADER_NAME = re.compile(r"[!#$%&'*+\-.^_`|~0-9A-Za-z]+")
+# Header values are latin-1 encoded (as sent by HTTP/1.1 servers) and cannot span lines
+_HEADER_VALUE = re.compile(r"[^\x00\r\n\x7f\u0100-\U0010ffff]*")
+
+
+def parse_batch(payload: Any, max_requests: int) -> List[dict]:
+    """
+    Validate a batch of sub-requests.
+
+    :param payload: Deserialized JSON body of the batch request, a list of sub-requests such as:
+        {"method": "GET", "path": "/items?page=2", "headers": {"Accept": "application/json"}, "body": {...}}
+        method defaults to GET, headers and body are optional (body is sent as JSON).
+    :param max_requests: Maximum number of sub-requests.
+    :return: Sub-requests with method (upper cased), path, query string, headers and body (bytes).
+    :raises ValueError: if payload is not a valid batch.
+    """
+    if not isinstance(payload, list):
+        raise ValueError("Batch must be a list of sub-requests.")
+    if len(payload) > max_requests:
+        raise ValueError(f"Batch cannot contain more than {max_requests} sub-requests.")
+
+    sub_requests = []
+    for index, sub_request in enumerate(payload):
+        if not isinstance(sub_request, dict) or not isinstance(
+            sub_request.get("path"), str
+        ):
+            raise ValueError(f"Sub-request {index} must be an object with a path.")
+        if not sub_request["path"].startswith("/"):
+            raise ValueError(f"Sub-request {index} path must start with /.")
+        headers = sub_request.get("headers", {})
+        if not isinstance(headers, dict):
+            raise ValueError(f"Sub-request {index} headers must be an object.")
+
+        headers = {name.lower(): str(value) for name, value in headers.items()}
+        for name, value in headers.items():
+            if not _HEADER_NAME.fullmatch(name) or not _HEADER_VALUE.fullmatch(value):
+                raise ValueError(f"Sub-request {index} header {name!r} is not valid.")
+
+        path, _, query_string = sub_request["path"].partition("?")
+        headers = {
+            name: value for name, value in headers.items() if name not in _NOT_FORWARDED
+        }
+        body = b""
+        if "body" in sub_request:
+            body = json.dumps(sub_request["body"]).encode()
+            headers.setdefault("content-type", "application/json")
+        sub_requests.append(
+            {
+                "method": str(sub_request.get("method", "GET")).upper(),
+                "path": path,
+                "query_string": query_string,
+                "headers": headers,
+                "body": body,
+            }
+        )
+    return sub_requests
+
+
+def inherited_headers(headers: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+    """
+    Return the batch request headers inherited by every sub-request (such as Authorization), with lower cased names.
+    Headers describing the batch body, hop-by-hop headers and Accept-Encoding are not inherited.
+    """
+    headers = {name.lower(): value for name, value in headers}
+    # Connection header lists additional hop-by-hop headers
+    not_inherited = {"content-length", "content-type", *_NOT_FORWARDED} | {
+        name.strip().lower() for name in headers.get("connection", "").split(",")
+    }
+    inherited = {
+        name: value for name, value in headers.items() if name not in not_inherited
+    }
+    # Sub-responses must not be compressed
+    inherited["accept-encoding"] = "identity"
+    return inherited
+
+
+def sub_response(status: int, headers: List[tuple], body: bytes) -> dict:
+    """
+    Return the representation of a sub-request response within the batch response.
+    Body is provided as JSON if response is JSON, as text otherwise.
+    A 502 (Bad Gateway) error is provided instead if body cannot be decoded.
+    """
+    headers = {name.lower(): value for name, value in headers}
+    if headers.get("content-encoding", "identity") != "identity":
+        return _undecodable(f"{headers['content-encoding']} encoded")
+    content_type = headers.get("content-type", "")
+    if content_type.startswith("application/json") and body:
+        try:
+            content = json.loads(body)
+        except ValueError:  # UnicodeDecodeError and JSONDecodeError are ValueError
+            return _undecodable("not valid JSON")
+    else:
+        content = body.decode("utf-8", errors="replace")
+    return {"status": status, "headers": headers, "body": content}
+
+
+def _undecodable(reason: str) -> dict:
+    return {
+        "status": 502,
+        "headers": {},
+        "body": f"Sub-response cannot be decoded ({reason}).",
+    }
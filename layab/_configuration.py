@@ -1,30 +1,53 @@
+import contextlib
+import hashlib
 import logging
 import logging.config
 import os
 import os.path
+import pickle
 import sys
+import tempfile
+from typing import Any
 
 import yaml
 
 logger = logging.getLogger(__name__)
 
 
-def load(server_file_path: str, logging_loader=yaml.FullLoader) -> dict:
+# Python loaders and their (faster) libyaml based equivalent, if PyYAML was built with libyaml
+_C_LOADERS = {
+    loader: getattr(yaml, f"C{loader.__name__}")
+    for loader in (
+        yaml.BaseLoader,
+        yaml.SafeLoader,
+        yaml.FullLoader,
+        yaml.UnsafeLoader,
+        yaml.Loader,
+    )
+    if yaml.__with_libyaml__ and hasattr(yaml, f"C{loader.__name__}")
+}
+
+
+def load(
+    server_file_path: str, logging_loader=yaml.FullLoader, cache_folder: str = None
+) -> dict:
     """
     Load logging and server YAML configurations according to SERVER_ENVIRONMENT environment variable.
 
     :param server_file_path: Path to the server.py file (or any other file located in the python module directory).
     :param logging_loader: yaml loader to use to process the logging configuration. Use yaml.FullLoader by default.
+    :param cache_folder: Folder used to store parsed configurations, so that YAML files are only parsed when modified.
+    Not cached by default.
     :return: server configuration as a dictionary.
     """
     module_directory = os.path.abspath(os.path.dirname(server_file_path))
     configuration_folder = os.path.join(module_directory, "..", "configuration")
-    load_logging_configuration(configuration_folder, logging_loader)
-    return load_configuration(configuration_folder)
+    load_logging_configuration(configuration_folder, logging_loader, cache_folder)
+    return load_configuration(configuration_folder, cache_folder)
 
 
 def load_logging_configuration(
-    configuration_folder: str, loader=yaml.FullLoader
+    configuration_folder: str, loader=yaml.FullLoader, cache_folder: str = None
 ) -> str:
     """
     Load logging configuration according to SERVER_ENVIRONMENT environment variable.
@@ -32,9 +55,11 @@ def load_logging_configuration(
     Return loaded configuration file path. None if not loaded.
 
     :param loader: yaml loader to use to process the logging configuration. Use yaml.FullLoader by default.
+    :param cache_folder: Folder used to store parsed configuration, so that YAML file is only parsed when modified.
+    Not cached by default.
     """
     file_path = os.path.join(configuration_folder, f"logging_{get_environment()}.yml")
-    return _load_logging_configuration(file_path, loader)
+    return _load_logging_configuration(file_path, loader, cache_folder)
 
 
 def get_environment():
@@ -42,14 +67,15 @@ def get_environment():
     return os.environ.get("SERVER_ENVIRONMENT", "default")
 
 
-def _load_logging_configuration(file_path: str, loader) -> str:
+def _load_logging_configuration(
+    file_path: str, loader, cache_folder: str = None
+) -> str:
     """
     Load YAML logging configuration file_path.
     If file is not found, then logging will be performed as INFO into stdout.
     """
     if os.path.isfile(file_path):
-        with open(file_path, "r") as config_file:
-            logging.config.dictConfig(yaml.load(config_file, loader))
+        logging.config.dictConfig(_load_yaml(file_path, loader, cache_folder))
         logger.info(f"Logging configuration file ({file_path}) loaded.")
         return file_path
     else:
@@ -63,29 +89,82 @@ def _load_logging_configuration(file_path: str, loader) -> str:
         )
 
 
-def load_configuration(configuration_folder: str) -> dict:
+def load_configuration(configuration_folder: str, cache_folder: str = None) -> dict:
     """
     Load configuration according to SERVER_ENVIRONMENT environment variable.
     Return a dictionary (empty if file cannot be found).
+
+    :param cache_folder: Folder used to store parsed configuration, so that YAML file is only parsed when modified.
+    Not cached by default.
     """
     file_path = os.path.join(
         configuration_folder, f"configuration_{get_environment()}.yml"
     )
-    return _load_configuration(file_path)
+    return _load_configuration(file_path, cache_folder)
 
 
-def _load_configuration(file_path: str) -> dict:
+def _load_configuration(file_path: str, cache_folder: str = None) -> dict:
     """
     Load YAML configuration file path.
     Return a dictionary (empty if file cannot be found).
     """
     if os.path.isfile(file_path):
-        with open(file_path, "r") as config_file:
-            conf = yaml.full_load(config_file)
-            logger.info(f"Loading configuration from {file_path}.")
-            return conf
+        conf = _load_yaml(file_path, yaml.FullLoader, cache_folder)
+        logger.info(f"Loading configuration from {file_path}.")
+        return conf
     else:
         logger.warning(
             f"Configuration file {file_path} cannot be found. Considering as empty."
         )
         return {}
+
+
+def _load_yaml(file_path: str, loader, cache_folder: str = None) -> Any:
+    """
+    Parse YAML file_path using the libyaml based equivalent of loader (if available).
+    If a cache folder is provided, parsed content is stored in it (using pickle) and reused as long as the file path,
+    modification time, size and loader are the same.
+    """
+    if not cache_folder:
+        return _parse_yaml(file_path, loader)
+
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    key = (
+        file_path,
+        stat.st_mtime_ns,
+        stat.st_size,
+        f"{loader.__module__}.{loader.__qualname__}",
+    )
+    cache_path = os.path.join(
+        cache_folder, f"{hashlib.sha1(file_path.encode()).hexdigest()}.pickle"
+    )
+    try:
+        with open(cache_path, "rb") as cache_file:
+            cached_key, content = pickle.load(cache_file)
+        if cached_key == key:
+            return content
+    except Exception:  # Cache is missing, outdated (or corrupted)
+        pass
+
+    content = _parse_yaml(file_path, loader)
+    cache_file = None
+    try:
+        os.makedirs(cache_folder, exist_ok=True)
+        # Other processes might be reading the cache, replace it atomically
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=cache_folder, suffix=".tmp", delete=False
+        ) as cache_file:
+            pickle.dump((key, content), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cache_file.name, cache_path)
+    except Exception:  # Cache is optional (content might not even be picklable)
+        logger.warning(f"Parsed {file_path} cannot be cached in {cache_folder}.")
+        if cache_file is not None:
+            with contextlib.suppress(OSError):
+                os.remove(cache_file.name)
+    return content
+
+
+def _parse_yaml(file_path: str, loader) -> Any:
+    with open(file_path, "rb") as yaml_file:
+        return yaml.load(yaml_file, _C_LOADERS.get(loader, loader))
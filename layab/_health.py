@@ -0,0 +1,199 @@
+import asyncio
+import concurrent.futures
+import datetime
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from layab._shutdown import GracefulShutdown
+
+_STATUSES = ("pass", "warn", "fail")
+
+
+class HealthChecks:
+    """
+    Registry of dependency checks (database, downstream services, ...) used to compute the health of the service.
+
+    Checks are run concurrently (each with a timeout) and results are cached, so that health probes do not reach
+    dependencies more than once per ttl, whatever the number of probes.
+
+    A check is a function (or coroutine function) without parameters, returning a status ("pass", "warn" or "fail")
+    or a status and a dictionary of details (such as {"observedValue": 42, "observedUnit": "ms"}).
+    A check raising an exception (or timing out) fails.
+
+    Health is provided using https://inadarei.github.io/rfc-healthcheck/ format.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 10.0,
+        timeout: float = 5.0,
+        release_id: str = None,
+        graceful_shutdown: GracefulShutdown = None,
+    ):
+        """
+        :param ttl: Number of seconds results are cached for. 10 seconds by default.
+        :param timeout: Default maximum number of seconds a check can take. 5 seconds by default.
+        :param release_id: Release of the service, provided as releaseId. Not provided by default.
+        :param graceful_shutdown: Service is not ready (without running checks) once shutdown started.
+        """
+        self.ttl = ttl
+        self.graceful_shutdown = graceful_shutdown
+        self.timeout = timeout
+        self.release_id = release_id
+        self._checks: Dict[str, Tuple[Callable, float]] = {}
+        self._cache: Optional[Tuple[float, dict]] = None
+        self._lock = threading.Lock()
+        self._refreshing: Optional[asyncio.Future] = None
+
+    def add(self, name: str, check: Callable = None, *, timeout: float = None):
+        """
+        Register a check. Can also be used as a decorator: @health_checks.add("database")
+
+        :param name: Name of the check (such as "database:responseTime").
+        :param check: Function (or coroutine function) performing the check.
+        :param timeout: Maximum number of seconds this check can take. Registry timeout by default.
+        """
+        if check is None:
+            return lambda check: self.add(name, check, timeout=timeout)
+        self._checks[name] = check, timeout or self.timeout
+        self._cache = None
+        return check
+
+    async def health(self) -> dict:
+        """
+        Return health of the service (checks are only run if cached result expired).
+        Checks are run in the event loop (coroutine functions) or in the default executor (functions).
+        """
+        health = self._cached()
+        if health is not None:
+            return health
+
+        # Concurrent requests share the same checks execution
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._run_async())
+            self._refreshing.add_done_callback(self._refreshed)
+        return await asyncio.shield(self._refreshing)
+
+    def health_sync(self) -> dict:
+        """
+        Return health of the service (checks are only run if cached result expired).
+        Checks are run in threads (coroutine functions are run in a new event loop).
+        """
+        health = self._cached()
+        if health is not None:
+            return health
+
+        # Concurrent requests share the same checks execution
+        with self._lock:
+            health = self._cached()
+            if health is None:
+                health = self._run_sync()
+        return health
+
+    @staticmethod
+    def status_code(health: dict) -> int:
+        """
+        Return HTTP status code to reply with: 200 if service is healthy (pass or warn), 503 otherwise.
+        """
+        return 503 if health["status"] == "fail" else 200
+
+    def _cached(self) -> Optional[dict]:
+        if self.graceful_shutdown is not None and self.graceful_shutdown.draining:
+            return self._shutting_down()
+        cache = self._cache
+        if cache is not None and cache[0] > time.monotonic():
+            return cache[1]
+        return None
+
+    def _shutting_down(self) -> dict:
+        health = {"status": "fail"}
+        if self.release_id:
+            health["releaseId"] = self.release_id
+        health["checks"] = {
+            "shutdown": [_result(("fail", {"output": "Service is shutting down."}))]
+        }
+        return health
+
+    def _refreshed(self, future: asyncio.Future):
+        self._refreshing = None
+
+    async def _run_async(self) -> dict:
+        loop = asyncio.get_event_loop()
+
+        async def run(check: Callable, timeout: float):
+            try:
+                if asyncio.iscoroutinefunction(check):
+                    outcome = await asyncio.wait_for(check(), timeout)
+                else:
+                    outcome = await asyncio.wait_for(
+                        loop.run_in_executor(None, check), timeout
+                    )
+            except asyncio.TimeoutError:
+                outcome = _timed_out(timeout)
+            except Exception as e:
+                outcome = _failed(e)
+            return _result(outcome)
+
+        names = list(self._checks)
+        results = await asyncio.gather(*(run(*self._checks[name]) for name in names))
+        return self._store(dict(zip(names, results)))
+
+    def _run_sync(self) -> dict:
+        def run(check: Callable) -> Union[str, tuple]:
+            try:
+                if asyncio.iscoroutinefunction(check):
+                    return asyncio.run(check())
+                return check()
+            except Exception as e:
+                return _failed(e)
+
+        names = list(self._checks)
+        results = {}
+        if names:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(names))
+            futures = {
+                name: executor.submit(run, self._checks[name][0]) for name in names
+            }
+            started = time.monotonic()
+            for name in names:
+                timeout = self._checks[name][1]
+                try:
+                    outcome = futures[name].result(
+                        max(started + timeout - time.monotonic(), 0)
+                    )
+                except concurrent.futures.TimeoutError:
+                    outcome = _timed_out(timeout)
+                results[name] = _result(outcome)
+            # Do not wait for checks that timed out
+            executor.shutdown(wait=False)
+        return self._store(results)
+
+    def _store(self, results: Dict[str, dict]) -> dict:
+        statuses = [result["status"] for result in results.values()]
+        health = {"status": max(statuses, key=_STATUSES.index) if statuses else "pass"}
+        if self.release_id:
+            health["releaseId"] = self.release_id
+        health["checks"] = {name: [result] for name, result in results.items()}
+        self._cache = time.monotonic() + self.ttl, health
+        return health
+
+
+def _timed_out(timeout: float) -> tuple:
+    return "fail", {"output": f"Check timed out after {timeout} seconds."}
+
+
+def _failed(exception: Exception) -> tuple:
+    return "fail", {"output": f"{type(exception).__name__}: {exception}"}
+
+
+def _result(outcome: Union[str, tuple]) -> dict:
+    status, details = outcome if isinstance(outcome, tuple) else (outcome, {})
+    if status not in _STATUSES:
+        status, details = "fail", {"output": f"{status} is not a valid status."}
+    return {
+        "status": status,
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        **details,
+    }
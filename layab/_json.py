@@ -0,0 +1,49 @@
+import dataclasses
+import datetime
+import enum
+import json
+import uuid
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional dependency, use standard library instead
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """
+    Serialize values not natively handled by the JSON serializer.
+    """
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    # numpy arrays and scalars (or any array like value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize content as JSON (UTF-8 encoded, without spaces), using orjson if installed.
+    Handles datetimes, dates, times, UUIDs, dataclasses, enums and numpy like arrays.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
@@ -0,0 +1,33 @@
+import contextvars
+import logging
+from typing import Optional
+
+# Statistics of the current (logged) request, providing its request_id and route (a single variable to set per request)
+current_statistics = contextvars.ContextVar("current_statistics", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    """
+    Return the identifier of the request being processed (None outside of a logged request).
+    """
+    statistics = current_statistics.get()
+    return None if statistics is None else statistics.request_id
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Add request_id and request_route attributes to every log record (None outside of a logged request).
+
+    Add it to your handlers to be able to use %(request_id)s and %(request_route)s in your formats.
+    As values are stored in context variables, they are also available in threads started via
+    contextvars.copy_context().run (as done by Starlette for synchronous endpoints).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        statistics = current_statistics.get()
+        if statistics is None:
+            record.request_id = record.request_route = None
+        else:
+            record.request_id = statistics.request_id
+            record.request_route = statistics.route
+        return True
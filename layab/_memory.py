@@ -0,0 +1,155 @@
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryTracker:
+    """
+    Measure memory allocated while processing requests and periodically log the routes allocating the most.
+
+    Measures are process wide: memory allocated by concurrent requests is attributed to all of them.
+    """
+
+    def __init__(
+        self,
+        mode: str = "tracemalloc",
+        *,
+        sample_rate: float = 1.0,
+        report_interval: float = 60.0,
+        top: int = 10,
+    ):
+        """
+        :param mode: How memory is measured:
+            * tracemalloc: Bytes allocated by Python (precise but slows down measured requests).
+            * rss: Resident set size of the process (cheaper but less precise).
+        tracemalloc by default.
+        :param sample_rate: Ratio of requests to measure (between 0 and 1). All requests are measured by default.
+        Consider lowering it when using tracemalloc mode.
+        :param report_interval: Minimum number of seconds between two logs of the top allocating routes.
+        Every minute by default.
+        :param top: Number of routes to log. 10 by default.
+        """
+        if mode == "tracemalloc":
+            self._memory = tracemalloc.get_traced_memory
+        elif mode == "rss":
+            self._memory = _rss_memory()
+        else:
+            raise ValueError(
+                f"{mode} is not a valid memory tracking mode. Valid modes are tracemalloc and rss."
+            )
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.report_interval = report_interval
+        self.top = top
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._owns_tracing = False
+        self._routes = {}
+        self._last_report = time.monotonic()
+
+    def start(self) -> Optional[tuple]:
+        """
+        Start measuring a request.
+
+        :return: Measure to provide to stop, None if request is not sampled.
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+
+        with self._lock:
+            if self._in_flight == 0 and self.mode == "tracemalloc":
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._owns_tracing = True
+                elif hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+                    tracemalloc.reset_peak()
+            self._in_flight += 1
+            return self._memory()
+
+    def stop(self, measure: Optional[tuple], route: str) -> Optional[dict]:
+        """
+        Stop measuring a request.
+
+        :param measure: Value returned by start.
+        :param route: Route used to aggregate measures.
+        :return: allocated (bytes still allocated compared to start) and peak (maximum bytes allocated compared
+        to start), None if request was not sampled.
+        """
+        if measure is None:
+            return None
+
+        with self._lock:
+            current, peak = self._memory()
+            self._in_flight -= 1
+            if self._in_flight == 0 and self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+
+            memory = {
+                "allocated": current - measure[0],
+                # Resident set size peak is process wide, only consider how much it increased
+                "peak": max(
+                    peak - (measure[0] if self.mode == "tracemalloc" else measure[1]), 0
+                ),
+            }
+            requests, allocated, peak = self._routes.get(route, (0, 0, 0))
+            self._routes[route] = (
+                requests + 1,
+                allocated + memory["allocated"],
+                max(peak, memory["peak"]),
+            )
+            if time.monotonic() - self._last_report >= self.report_interval:
+                self._report()
+        return memory
+
+    def _report(self):
+        top_routes = sorted(
+            self._routes.items(), key=lambda route: route[1][1], reverse=True
+        )[: self.top]
+        logger.info(
+            {
+                "memory_top_routes": [
+                    {
+                        "route": route,
+                        "requests": requests,
+                        "allocated": allocated,
+                        "peak": peak,
+                    }
+                    for route, (requests, allocated, peak) in top_routes
+                ]
+            }
+        )
+        self._routes = {}
+        self._last_report = time.monotonic()
+
+
+def _rss_memory():
+    """
+    Return a function providing (current resident set size, maximum resident set size) of the process in bytes.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        resource = None
+
+    page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 0
+
+    def rss_memory() -> tuple:
+        try:
+            with open("/proc/self/statm") as statm:
+                current = int(statm.read().split()[1]) * page_size
+        except OSError:
+            current = 0
+        # Maximum resident set size is provided in kilobytes
+        maximum = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return current or maximum, max(current, maximum)
+
+    if resource is None:
+        raise ValueError("rss memory tracking mode is not supported on this platform.")
+    return rss_memory
@@ -0,0 +1,231 @@
+import bisect
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (in seconds) of request processing time histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_MAGIC = b"LAYABM01"
+# Magic, number of buckets, maximum number of series
+_HEADER = struct.Struct("<8sII")
+# Length of the (JSON encoded) series labels, written once labels are, so that readers skip series being created
+_LABELS_LENGTH = struct.Struct("<I")
+_LABELS_SIZE = 256
+_COUNT = struct.Struct("<q")
+_SUM = struct.Struct("<d")
+
+
+class Metrics:
+    """
+    Count requests and their processing time (as an histogram) per route and status code.
+
+    Every worker process of a pre-forking server (such as gunicorn or uvicorn with multiple workers) writes its own
+    metrics in a memory mapped file (only written by this process, without any inter-process communication), and
+    metrics of every worker are merged when collected, so that any worker provides metrics of the whole service.
+
+    Folder should be emptied (see clear) before starting workers, metrics of previous workers are collected otherwise.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        max_series: int = 512,
+    ):
+        """
+        :param folder: Folder (shared by every worker) containing a metrics file per worker process.
+        :param buckets: Upper bounds (in seconds) of processing time histogram buckets.
+        Ranging from 5 milliseconds to 10 seconds by default.
+        :param max_series: Maximum number of route and status code combinations per worker. Requests of other
+        combinations are not counted (a warning is logged once). 512 by default.
+        """
+        self.folder = folder
+        self.buckets = tuple(sorted(buckets))
+        self.max_series = max_series
+        # Labels, count, sum, then a count per bucket (requests slower than every bucket are not stored)
+        self._series_size = (
+            _LABELS_SIZE + _COUNT.size + _SUM.size + _COUNT.size * len(self.buckets)
+        )
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._series: Dict[Tuple[str, int], int] = {}
+        self._overflow_logged = False
+
+    def observe(self, route: str, status_code: int, duration: float):
+        """
+        Count a processed request.
+
+        :param route: Route of the request (such as GET /items/{item_id}).
+        :param status_code: Response status code.
+        :param duration: Processing time in seconds.
+        """
+        with self._lock:
+            if self._pid != os.getpid():  # First request of this (forked) process
+                self._open()
+            offset = self._series.get((route, status_code))
+            if offset is None:
+                offset = self._add_series(route, status_code)
+                if offset is None:
+                    return
+            offset += _LABELS_SIZE
+            _increment(self._mmap, offset, 1)
+            offset += _COUNT.size
+            _SUM.pack_into(
+                self._mmap, offset, _SUM.unpack_from(self._mmap, offset)[0] + duration
+            )
+            bucket = bisect.bisect_left(self.buckets, duration)
+            if bucket < len(self.buckets):
+                _increment(self._mmap, offset + _SUM.size + _COUNT.size * bucket, 1)
+
+    def collect(self) -> Dict[Tuple[str, int], dict]:
+        """
+        Merge metrics of every worker.
+
+        :return: count, sum (in seconds) and buckets (cumulative number of requests per bucket upper bound) per
+        route and status code.
+        """
+        merged: Dict[Tuple[str, int], dict] = {}
+        for file_path in glob.glob(os.path.join(self.folder, "layab_metrics_*.db")):
+            try:
+                with open(file_path, "rb") as file:
+                    content = file.read()
+            except OSError:  # Removed in the meantime
+                continue
+            for labels, count, total, buckets in self._read(content):
+                series = merged.setdefault(
+                    labels, {"count": 0, "sum": 0.0, "buckets": [0] * len(buckets)}
+                )
+                series["count"] += count
+                series["sum"] += total
+                for index, bucket in enumerate(buckets):
+                    series["buckets"][index] += bucket
+
+        for series in merged.values():
+            cumulated = 0
+            for index, bucket in enumerate(series["buckets"]):
+                cumulated += bucket
+                series["buckets"][index] = cumulated
+        return merged
+
+    def exposition(self) -> str:
+        """
+        Metrics of every worker using Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP http_request_duration_seconds Processing time of HTTP requests.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (route, status_code), series in sorted(self.collect().items()):
+            labels = f'route="{_escape(route)}",status_code="{status_code}"'
+            for upper_bound, bucket in zip(self.buckets, series["buckets"]):
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels},le="{upper_bound}"}} {bucket}'
+                )
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series["count"]}'
+            )
+            lines.append(
+                f"http_request_duration_seconds_sum{{{labels}}} {series['sum']}"
+            )
+            lines.append(
+                f"http_request_duration_seconds_count{{{labels}}} {series['count']}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """
+        Remove metrics of every worker. To be called before starting workers (in the master process).
+        """
+        with self._lock:
+            for file_path in glob.glob(os.path.join(self.folder, "layab_metrics_*.db")):
+                os.remove(file_path)
+            self._close()
+
+    def _open(self):
+        # Metrics inherited from the parent process belong to its own file
+        self._close()
+        file_path = os.path.join(self.folder, f"layab_metrics_{os.getpid()}.db")
+        os.makedirs(self.folder, exist_ok=True)
+        size = _HEADER.size + self.max_series * self._series_size
+        with open(file_path, "wb+") as file:
+            file.truncate(size)
+            self._mmap = mmap.mmap(file.fileno(), size)
+        _HEADER.pack_into(self._mmap, 0, _MAGIC, len(self.buckets), self.max_series)
+        self._pid = os.getpid()
+
+    def _close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = None
+        self._pid = None
+        self._series = {}
+
+    def _add_series(self, route: str, status_code: int) -> Optional[int]:
+        if len(self._series) >= self.max_series:
+            if not self._overflow_logged:
+                logger.warning(
+                    f"Metrics are limited to {self.max_series} series. {route} ({status_code}) is not counted."
+                )
+                self._overflow_logged = True
+            return None
+
+        labels = json.dumps([route, status_code]).encode()
+        truncated_route = route
+        while len(labels) > _LABELS_SIZE - _LABELS_LENGTH.size:
+            truncated_route = truncated_route[: len(truncated_route) // 2]
+            labels = json.dumps([truncated_route, status_code]).encode()
+        offset = _HEADER.size + len(self._series) * self._series_size
+        self._mmap[
+            offset + _LABELS_LENGTH.size : offset + _LABELS_LENGTH.size + len(labels)
+        ] = labels
+        _LABELS_LENGTH.pack_into(self._mmap, offset, len(labels))
+        self._series[(route, status_code)] = offset
+        return offset
+
+    def _read(self, content: bytes) -> List[tuple]:
+        if len(content) < _HEADER.size:
+            return []
+        magic, buckets_count, max_series = _HEADER.unpack_from(content, 0)
+        if magic != _MAGIC or buckets_count != len(self.buckets):
+            logger.warning("Ignoring metrics written with other buckets.")
+            return []
+
+        series = []
+        offset = _HEADER.size
+        for _ in range(max_series):
+            if offset + self._series_size > len(content):
+                break
+            (labels_length,) = _LABELS_LENGTH.unpack_from(content, offset)
+            if not labels_length:  # Series are created in order
+                break
+            labels_start = offset + _LABELS_LENGTH.size
+            route, status_code = json.loads(
+                content[labels_start : labels_start + labels_length]
+            )
+            values = offset + _LABELS_SIZE
+            (count,) = _COUNT.unpack_from(content, values)
+            (total,) = _SUM.unpack_from(content, values + _COUNT.size)
+            buckets = struct.unpack_from(
+                f"<{buckets_count}q", content, values + _COUNT.size + _SUM.size
+            )
+            series.append(((route, status_code), count, total, buckets))
+            offset += self._series_size
+        return series
+
+
+def _increment(buffer: mmap.mmap, offset: int, value: int):
+    _COUNT.pack_into(buffer, offset, _COUNT.unpack_from(buffer, offset)[0] + value)
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
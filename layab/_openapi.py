@@ -0,0 +1,80 @@
+import hashlib
+import zlib
+from typing import Dict, Optional, Set, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is an optional dependency, only gzip is provided
+    brotli = None
+
+
+class OpenAPIDocument:
+    """
+    Serialized OpenAPI document, compressed once (gzip and brotli if installed) and identified by strong ETags.
+    """
+
+    def __init__(self, body: bytes):
+        """
+        :param body: JSON encoded document.
+        """
+        tag = hashlib.sha256(body).hexdigest()[:32]
+        # Encoding: (body, ETag), preferred encodings first
+        self.variants: Dict[Optional[str], Tuple[bytes, str]] = {}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body), f'"{tag}-br"'
+        compressor = zlib.compressobj(9, wbits=zlib.MAX_WBITS | 16)
+        self.variants["gzip"] = (
+            compressor.compress(body) + compressor.flush(),
+            f'"{tag}-gzip"',
+        )
+        self.variants[None] = body, f'"{tag}"'
+        self._etags = {etag for _, etag in self.variants.values()}
+
+    def response(
+        self, accept_encoding: str = None, if_none_match: str = None
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        """
+        Select the representation of the document to send.
+
+        :param accept_encoding: Accept-Encoding request header value.
+        :param if_none_match: If-None-Match request header value.
+        :return: Status code (200 or 304), body and headers.
+        """
+        accepted = _accepted_encodings(accept_encoding or "")
+        encoding = next(
+            encoding
+            for encoding in self.variants
+            if encoding is None or encoding in accepted or "*" in accepted
+        )
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if if_none_match and self._matches(if_none_match):
+            return 304, b"", headers
+
+        headers["Content-Type"] = "application/json"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return 200, body, headers
+
+    def _matches(self, if_none_match: str) -> bool:
+        # Every representation has the same content, weak comparison is used (RFC 7232, section 3.2)
+        for etag in if_none_match.split(","):
+            etag = etag.strip()
+            if etag == "*" or etag.replace("W/", "", 1) in self._etags:
+                return True
+        return False
+
+
+def _accepted_encodings(accept_encoding: str) -> Set[str]:
+    accepted = set()
+    for coding in accept_encoding.split(","):
+        name, _, parameters = coding.partition(";")
+        quality = parameters.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
@@ -0,0 +1,93 @@
+import gc
+import logging
+import logging.handlers
+import os
+import types
+from typing import Any, Iterator, Mapping
+
+import yaml
+
+from layab._configuration import load
+
+_registered = False
+
+
+def preload(
+    server_file_path: str,
+    logging_loader=yaml.FullLoader,
+    cache_folder: str = None,
+    freeze_gc: bool = True,
+) -> Mapping:
+    """
+    Load logging and server YAML configurations once, in the master process of a pre-forking server (such as gunicorn
+    with --preload), so that workers share them instead of loading them again.
+
+    Server configuration is frozen (dictionaries are provided as read only mappings and lists as tuples) and logging
+    handlers that cannot be shared across processes (files and sockets) are re-opened in every forked worker.
+
+    :param server_file_path: Path to the server.py file (or any other file located in the python module directory).
+    :param logging_loader: yaml loader to use to process the logging configuration. Use yaml.FullLoader by default.
+    :param cache_folder: Folder used to store parsed configurations, so that YAML files are only parsed when modified.
+    Not cached by default.
+    :param freeze_gc: Move every object tracked so far to the permanent garbage collector generation, so that
+    garbage collections in workers do not copy memory pages shared with the master process. True by default.
+    :return: server configuration as a read only mapping.
+    """
+    global _registered
+
+    configuration = _freeze(load(server_file_path, logging_loader, cache_folder))
+    # Records buffered in the master would be emitted by every worker otherwise
+    for handler in _handlers():
+        handler.flush()
+    if not _registered and hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=reinitialize_logging_handlers)
+        _registered = True
+    if freeze_gc:
+        gc.freeze()
+    return configuration
+
+
+def _freeze(value: Any) -> Any:
+    """
+    Return a read only equivalent of value: dictionaries are provided as read only mappings and lists as tuples.
+    """
+    if isinstance(value, dict):
+        return types.MappingProxyType(
+            {key: _freeze(item) for key, item in value.items()}
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def reinitialize_logging_handlers():
+    """
+    Re-open logging handlers that cannot be shared with the parent process (files and sockets).
+    Automatically called in forked processes once layab.preload was called.
+    """
+    for handler in _handlers():
+        handler.createLock()
+        if isinstance(handler, logging.FileHandler):
+            # Stream will be re-opened on next record
+            if handler.stream is not None:
+                stream, handler.stream = handler.stream, None
+                stream.close()
+        elif isinstance(handler, logging.handlers.SocketHandler):
+            # Socket will be re-created on next record
+            if handler.sock is not None:
+                sock, handler.sock = handler.sock, None
+                sock.close()
+
+
+def _handlers() -> Iterator[logging.Handler]:
+    loggers = [logging.getLogger()] + [
+        logger
+        for logger in list(logging.Logger.manager.loggerDict.values())
+        if isinstance(logger, logging.Logger)
+    ]
+    seen = set()
+    for logger in loggers:
+        for handler in list(logger.handlers):
+            if id(handler) not in seen:
+                seen.add(id(handler))
+                yield handler
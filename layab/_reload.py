@@ -0,0 +1,177 @@
+import logging
+import logging.config
+import os
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+import yaml
+
+from layab._configuration import (
+    _load_configuration,
+    _load_logging_configuration,
+    _load_yaml,
+    get_environment,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigurationWatcher:
+    """
+    Load logging and service configurations (as layab.load_logging_configuration and layab.load_configuration would),
+    then reload them (in a background thread) once their file is modified, without restarting the service.
+
+    Reloaded service configuration replaces the previous one as a whole: a configuration retrieved once is never
+    modified. If a modified file cannot be loaded (or was removed or emptied), previous configuration is kept.
+    """
+
+    def __init__(
+        self,
+        configuration_folder: str,
+        *,
+        interval: float = 1.0,
+        logging_loader=yaml.FullLoader,
+        cache_folder: str = None,
+    ):
+        """
+        :param configuration_folder: Folder containing configuration_{env}.yml and logging_{env}.yml files.
+        :param interval: Number of seconds between two checks of files modification. Every second by default.
+        :param logging_loader: yaml loader to use to process the logging configuration. Use yaml.FullLoader by default.
+        :param cache_folder: Folder used to store parsed configurations, so that YAML files are only parsed when
+        modified. Not cached by default.
+        """
+        environment = get_environment()
+        self.interval = interval
+        self.logging_loader = logging_loader
+        self.cache_folder = cache_folder
+        self.configuration_file_path = os.path.join(
+            configuration_folder, f"configuration_{environment}.yml"
+        )
+        self.logging_file_path = os.path.join(
+            configuration_folder, f"logging_{environment}.yml"
+        )
+        self._subscribers: List[Callable[[dict], None]] = []
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._logging_stamp = _stamp(self.logging_file_path)
+        _load_logging_configuration(
+            self.logging_file_path, self.logging_loader, self.cache_folder
+        )
+        self._configuration_stamp = _stamp(self.configuration_file_path)
+        self._configuration = _load_configuration(
+            self.configuration_file_path, self.cache_folder
+        )
+
+    @property
+    def configuration(self) -> dict:
+        """Latest service configuration."""
+        return self._configuration
+
+    def subscribe(self, callback: Callable[[dict], None]) -> Callable[[dict], None]:
+        """
+        Call callback with the new service configuration every time it is reloaded.
+        Can also be used as a decorator.
+
+        :param callback: Function called (from the watcher thread) with the new service configuration.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def check(self) -> bool:
+        """
+        Reload modified files. Called periodically once started.
+
+        :return: True if service configuration was reloaded.
+        """
+        logging_stamp = _stamp(self.logging_file_path)
+        if logging_stamp != self._logging_stamp:
+            self._logging_stamp = logging_stamp
+            self._reload_logging(logging_stamp)
+
+        configuration_stamp = _stamp(self.configuration_file_path)
+        if configuration_stamp == self._configuration_stamp:
+            return False
+        self._configuration_stamp = configuration_stamp
+        if configuration_stamp is None:
+            logger.warning(
+                f"{self.configuration_file_path} was removed. Keeping previous configuration."
+            )
+            return False
+        try:
+            configuration = _load_configuration(
+                self.configuration_file_path, self.cache_folder
+            )
+        except Exception:
+            logger.exception(
+                f"Modified {self.configuration_file_path} cannot be loaded. Keeping previous configuration."
+            )
+            return False
+        if not _is_filled_mapping(configuration):
+            logger.warning(
+                f"Modified {self.configuration_file_path} is empty or not a mapping. Keeping previous configuration."
+            )
+            return False
+
+        self._configuration = configuration
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber(configuration)
+            except Exception:
+                logger.exception(f"Configuration subscriber {subscriber} failed.")
+        return True
+
+    def _reload_logging(self, logging_stamp: Optional[Tuple[int, int]]):
+        if logging_stamp is None:
+            logger.warning(
+                f"{self.logging_file_path} was removed. Keeping previous logging configuration."
+            )
+            return
+        try:
+            logging_configuration = _load_yaml(
+                self.logging_file_path, self.logging_loader, self.cache_folder
+            )
+            if not _is_filled_mapping(logging_configuration):
+                logger.warning(
+                    f"Modified {self.logging_file_path} is empty or not a mapping. Keeping previous logging configuration."
+                )
+                return
+            logging.config.dictConfig(logging_configuration)
+        except Exception:
+            logger.exception(
+                f"Modified {self.logging_file_path} cannot be loaded. Keeping previous logging configuration."
+            )
+            return
+        logger.info(f"Logging configuration file ({self.logging_file_path}) loaded.")
+
+    def start(self):
+        """Check files modification every interval seconds in a background thread."""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._watch, name="layab-configuration", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop checking files modification."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+
+def _is_filled_mapping(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value)
+
+
+def _stamp(file_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
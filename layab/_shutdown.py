@@ -0,0 +1,203 @@
+import itertools
+import logging
+import os
+import signal
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+if TYPE_CHECKING:  # Slow to import, only imported when installing handlers
+    import asyncio
+
+logger = logging.getLogger(__name__)
+
+
+class GracefulShutdown:
+    """
+    Track in-flight requests to drain them on shutdown.
+
+    Once shutdown started:
+        * Service is not ready anymore (health checks fail if layab.HealthChecks is provided with this instance).
+        * New requests are still processed for refuse_after seconds (time for load balancers to notice), then
+          refused with a 503 status code.
+        * In-flight requests are awaited (up to drain_timeout seconds), remaining ones being logged periodically.
+
+    In-flight requests are tracked by the logging middleware (or log_requests) provided with this instance.
+    """
+
+    def __init__(
+        self,
+        *,
+        refuse_after: float = 5.0,
+        drain_timeout: float = 30.0,
+        log_interval: float = 1.0,
+    ):
+        """
+        :param refuse_after: Number of seconds new requests are still accepted once shutdown started.
+        5 seconds by default.
+        :param drain_timeout: Maximum number of seconds to wait for in-flight requests once new requests are refused.
+        30 seconds by default.
+        :param log_interval: Number of seconds between two logs of remaining in-flight requests. Every second by default.
+        """
+        self.refuse_after = refuse_after
+        self.drain_timeout = drain_timeout
+        self.log_interval = log_interval
+        self._in_flight = {}
+        self._ids = itertools.count()
+        self._condition = threading.Condition()
+        self._shutdown_started: Optional[float] = None
+
+    @property
+    def draining(self) -> bool:
+        """Shutdown started, service is not ready anymore."""
+        return self._shutdown_started is not None
+
+    @property
+    def refusing(self) -> bool:
+        """New requests are refused."""
+        return (
+            self._shutdown_started is not None
+            and time.monotonic() >= self._shutdown_started + self.refuse_after
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests being processed."""
+        return len(self._in_flight)
+
+    def request_started(self, route: str) -> Optional[int]:
+        """
+        Track a new request.
+
+        :param route: Description of the request (such as method and path), logged if request does not end in time.
+        :return: Identifier to provide to request_ended, None if request must be refused.
+        """
+        if self.refusing:
+            return None
+        request_id = next(self._ids)
+        self._in_flight[request_id] = route, time.monotonic()
+        return request_id
+
+    def request_ended(self, request_id: int):
+        with self._condition:
+            self._in_flight.pop(request_id, None)
+            self._condition.notify_all()
+
+    def start(self):
+        """Start shutdown: service is not ready anymore and new requests will soon be refused."""
+        if self._shutdown_started is None:
+            self._shutdown_started = time.monotonic()
+            logger.info(
+                {"shutdown_status": "draining", "shutdown_in_flight": self.in_flight}
+            )
+
+    def wait(self) -> bool:
+        """
+        Start shutdown (if not already started) and wait until new requests are refused and in-flight requests
+        ended (or drain_timeout is reached).
+
+        :return: True if all in-flight requests ended.
+        """
+        self.start()
+        refused_at = self._shutdown_started + self.refuse_after
+        deadline = refused_at + self.drain_timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now >= refused_at and not self._in_flight:
+                    logger.info({"shutdown_status": "drained"})
+                    return True
+                if now >= deadline:
+                    logger.warning(
+                        {
+                            "shutdown_status": "timeout",
+                            "shutdown_in_flight_requests": self._remaining(now),
+                        }
+                    )
+                    return False
+                if now >= refused_at:
+                    logger.info(
+                        {
+                            "shutdown_status": "waiting",
+                            "shutdown_in_flight_requests": self._remaining(now),
+                        }
+                    )
+                self._condition.wait(
+                    min(
+                        self.log_interval,
+                        (refused_at if now < refused_at else deadline) - now,
+                    )
+                )
+
+    def install(self, signals: Iterable[int] = (signal.SIGTERM,)):
+        """
+        Drain requests when one of the signals is received, then forward the signal to the previous handler (the
+        server handler, that will stop the process). Waiting is performed in a background thread.
+
+        Call it once server signal handlers are installed (in a startup hook for instance), from the main thread.
+        Handlers registered on the running event loop (loop.add_signal_handler, as done by uvicorn) are chained the
+        same way.
+
+        :param signals: Signals starting the shutdown. SIGTERM by default.
+        """
+        import asyncio
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        for signum in signals:
+            # Loop handlers are called whatever the signal.signal handler is, so they are replaced instead
+            loop_handler = getattr(loop, "_signal_handlers", {}).get(signum)
+            if loop_handler is not None:
+                loop.add_signal_handler(
+                    signum, self._loop_signal_handler(loop, loop_handler)
+                )
+            else:
+                signal.signal(
+                    signum, self._signal_handler(signum, signal.getsignal(signum))
+                )
+
+    def _signal_handler(self, signum: int, previous: Callable) -> Callable:
+        def forward(frame):
+            self.wait()
+            if callable(previous):
+                previous(signum, frame)
+            elif previous != signal.SIG_IGN:
+                # Default handler was restored, let it terminate the process
+                os.kill(os.getpid(), signum)
+
+        def handler(received_signum, frame):
+            if self.draining:
+                return
+            self.start()
+            if not callable(previous) and previous != signal.SIG_IGN:
+                # Handlers can only be changed from the main thread
+                signal.signal(signum, signal.SIG_DFL)
+            threading.Thread(
+                target=forward, args=(frame,), name="layab-shutdown", daemon=True
+            ).start()
+
+        return handler
+
+    def _loop_signal_handler(
+        self, loop: "asyncio.AbstractEventLoop", previous: "asyncio.Handle"
+    ) -> Callable:
+        def forward():
+            self.wait()
+            # Run the server handler as the loop would have
+            loop.call_soon_threadsafe(previous._run)
+
+        def handler():
+            if self.draining:
+                return
+            self.start()
+            threading.Thread(target=forward, name="layab-shutdown", daemon=True).start()
+
+        return handler
+
+    def _remaining(self, now: float) -> list:
+        return [
+            {"route": route, "duration": now - started}
+            for route, started in list(self._in_flight.values())
+        ]
@@ -0,0 +1,264 @@
+import logging
+import time
+import traceback
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from layab._logging import current_statistics
+from layab._memory import MemoryTracker
+from layab._timing import Timings
+
+if TYPE_CHECKING:  # Optional components are only imported when used
+    from layab._metrics import Metrics
+
+
+def request_id(original_request_id: Optional[str], chained: bool = False) -> str:
+    """
+    Return the identifier of a request.
+
+    :param original_request_id: Identifier provided by the client (X-Request-Id header), if any.
+    :param chained: Append a new identifier to the one provided by the client, instead of reusing it.
+    """
+    if not original_request_id:
+        return str(uuid.uuid4())
+    return f"{original_request_id},{uuid.uuid4()}" if chained else original_request_id
+
+
+class RequestStatistics:
+    """
+    Statistics of a logged request (details, processing time, timings, memory and outcome), logged upon reception and
+    once processed.
+
+    Every log record is a new dictionary, sharing request details (never modified once logged). Records are either
+    nested ({"request": {"id": ...}}) or flat ({"request_id": ...}), according to the flat class attribute.
+    """
+
+    __slots__ = (
+        "details",
+        "route",
+        "matched",
+        "_timings",
+        "memory_tracker",
+        "memory",
+        "metrics",
+        "start",
+        "downstream",
+        "_statistics_token",
+    )
+
+    # Provided by framework integrations
+    logger = logging.getLogger(__name__)
+    flat = False
+    end_status = "end"
+
+    def __init__(
+        self,
+        *,
+        method: str,
+        path: str,
+        request_id: str,
+        args: Iterable[Tuple[str, str]],
+        headers: Iterable[Tuple[str, str]],
+        route: str,
+        path_params: Dict[str, Any] = None,
+        memory_tracker: MemoryTracker = None,
+        metrics: "Metrics" = None,
+    ):
+        """
+        :param args: Query parameters names and values (a name can be provided more than once).
+        :param headers: Request headers names and values.
+        :param route: Description of the request (such as method and URL rule), used as request context (see
+        layab.RequestContextFilter), to track memory and to count requests.
+        :param path_params: Values extracted from the path (only logged in flat records).
+        :param metrics: Count the request (per route and status code) once processed. Requests that did not match any
+        route are counted as "{method} <unmatched>", so that unknown paths cannot exhaust metrics series.
+        """
+        self.details = (
+            _flat_details(method, path, request_id, args, headers, path_params)
+            if self.flat
+            else _nested_details(method, path, request_id, args, headers)
+        )
+        self.route = route
+        # Provided by framework integrations once request was routed
+        self.matched = True
+        # Also provides request context to log records (see layab.RequestContextFilter)
+        self._statistics_token = current_statistics.set(self)
+        self.logger.info(self._record("start", []))
+        # Most requests do not measure any phase
+        self._timings: Optional[Timings] = None
+        self.downstream: Optional[Dict[str, Any]] = None
+        self.memory_tracker = memory_tracker
+        self.metrics = metrics
+        if memory_tracker:
+            self.memory = memory_tracker.start()
+        self.start = time.perf_counter()
+
+    @property
+    def request_id(self) -> str:
+        return self.details["request_id" if self.flat else "id"]
+
+    @property
+    def timings(self) -> Timings:
+        """Duration of the phases of the request, created once requested."""
+        if self._timings is None:
+            self._timings = Timings()
+        return self._timings
+
+    def add_downstream_call(
+        self, duration: float, failed: bool, rejected: bool = False, retries: int = 0
+    ):
+        """
+        Report a call to another service (see layab.client), logged as downstream (number of calls, number of failed
+        calls, number of calls rejected without being sent, number of retries and total time spent).
+        """
+        if self.downstream is None:
+            self.downstream = {
+                "calls": 0,
+                "failures": 0,
+                "rejected": 0,
+                "retries": 0,
+                "time": 0.0,
+            }
+        self.downstream["calls"] += 1
+        self.downstream["time"] += duration
+        self.downstream["retries"] += retries
+        if failed:
+            self.downstream["failures"] += 1
+        if rejected:
+            self.downstream["rejected"] += 1
+
+    def server_timing(self) -> str:
+        """Return the Server-Timing header value."""
+        return self.timings.server_timing(time.perf_counter() - self.start)
+
+    def success(self, status_code: int, **details):
+        """
+        Log the end of the request.
+
+        :param details: Additional details (such as response_bytes).
+        """
+        measures = self._measures()
+        measures.append(("status_code", status_code))
+        measures.extend(details.items())
+        # Checked here as every call adds to the processing of each request
+        if self.memory_tracker:
+            self._track_memory(measures)
+        if self.metrics:
+            self._observe(status_code, measures)
+        self.logger.info(self._record(self.end_status, measures))
+        current_statistics.reset(self._statistics_token)
+
+    def exception_occurred(self, exception: Exception, data: bytes = None, **details):
+        """
+        Log the failure of the request (must be called while handling the exception).
+
+        :param data: Request body (only logged in flat records).
+        :param details: Additional details (such as timed_out).
+        """
+        measures = self._measures()
+        measures.extend(details.items())
+        if self.memory_tracker:
+            self._track_memory(measures)
+        if self.metrics:
+            self._observe(500, measures)
+        error = {
+            "class": type(exception).__name__,
+            "msg": str(exception),
+            "traceback": traceback.format_exc(),
+        }
+        self.logger.critical(self._record("error", measures, error, data))
+        current_statistics.reset(self._statistics_token)
+
+    def _measures(self) -> List[Tuple[str, Any]]:
+        measures = [("processing_time", time.perf_counter() - self.start)]
+        if self._timings is not None and self._timings.phases:
+            measures.append(("timing", dict(self._timings.phases)))
+        if self.downstream:
+            measures.append(("downstream", dict(self.downstream)))
+        return measures
+
+    def _track_memory(self, measures: List[Tuple[str, Any]]):
+        memory = self.memory_tracker.stop(self.memory, self.route)
+        if memory:
+            measures.append(("allocated_memory", memory["allocated"]))
+            measures.append(("peak_memory", memory["peak"]))
+
+    def _observe(self, status_code: int, measures: List[Tuple[str, Any]]):
+        # Processing time is always the first measure
+        route = (
+            self.route if self.matched else f"{self.route.split(' ', 1)[0]} <unmatched>"
+        )
+        self.metrics.observe(route, status_code, measures[0][1])
+
+    def _record(
+        self,
+        status: str,
+        measures: List[Tuple[str, Any]],
+        error: dict = None,
+        data: bytes = None,
+    ) -> dict:
+        if not self.flat:
+            record = {"request": {**self.details, "status": status, **dict(measures)}}
+            if error:
+                record["error"] = error
+            return record
+
+        record = {**self.details, "request_status": status}
+        for name, value in measures:
+            if isinstance(value, dict):  # Such as timing phases
+                for key, item in value.items():
+                    record[f"request_{name}.{key}"] = item
+            else:
+                record[f"request_{name}"] = value
+        if error:
+            record["request.data"] = data
+            for name, value in error.items():
+                record[f"error.{name}"] = value
+        return record
+
+
+def _nested_details(
+    method: str,
+    path: str,
+    request_id: str,
+    args: Iterable[Tuple[str, str]],
+    headers: Iterable[Tuple[str, str]],
+) -> dict:
+    # Values of every query parameter, in order
+    args_values = {}
+    for name, value in args:
+        if name in args_values:
+            args_values[name].append(value)
+        else:
+            args_values[name] = [value]
+    return {
+        "url.path": path,
+        "method": method,
+        "id": request_id,
+        "args": args_values,
+        "headers": dict(headers),
+    }
+
+
+def _flat_details(
+    method: str,
+    path: str,
+    request_id: str,
+    args: Iterable[Tuple[str, str]],
+    headers: Iterable[Tuple[str, str]],
+    path_params: Optional[Dict[str, Any]],
+) -> dict:
+    details = {
+        "request_url.path": path,
+        "request_method": method,
+        "request_id": request_id,
+    }
+    if path_params:
+        for name, value in path_params.items():
+            details[f"request_path.{name}"] = value
+    # Last value of every query parameter
+    for name, value in args:
+        details[f"request_args.{name}"] = value
+    for name, value in headers:
+        details[f"request_headers.{name}"] = value
+    return details
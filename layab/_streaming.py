@@ -0,0 +1,92 @@
+import csv
+import zlib
+from typing import Any, Iterable, Iterator, List
+
+from layab._json import dumps
+
+
+class RowWriter:
+    """
+    Serialize rows into a buffer, provided in chunks of (at least) chunk_size characters.
+    """
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self._parts = []
+        self.size = 0
+
+    def write(self, text: str):
+        self._parts.append(text)
+        self.size += len(text)
+
+    def write_row(self, row: Any):
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        chunk = "".join(self._parts).encode()
+        self._parts = []
+        self.size = 0
+        return chunk
+
+    def next_chunk(self, rows: Iterator) -> bytes:
+        """
+        Serialize rows until a chunk is full (or there is no more rows).
+
+        :return: The chunk, empty if there is no more rows.
+        """
+        for row in rows:
+            self.write_row(row)
+            if self.size >= self.chunk_size:
+                break
+        return self.flush()
+
+    def chunks(self, rows: Iterable) -> Iterator[bytes]:
+        rows = iter(rows)
+        while True:
+            chunk = self.next_chunk(rows)
+            if not chunk:
+                return
+            yield chunk
+
+
+class NDJSONWriter(RowWriter):
+    """
+    Serialize rows as newline delimited JSON (one JSON document per line), as JSON responses are serialized.
+    """
+
+    def write_row(self, row: Any):
+        self.write(dumps(row).decode())
+        self.write("\n")
+
+
+class CSVWriter(RowWriter):
+    """
+    Serialize rows as CSV.
+    """
+
+    def __init__(self, chunk_size: int, fieldnames: List[str] = None):
+        """
+        :param fieldnames: If provided, rows are dictionaries and a header line is written first.
+        Otherwise, rows are sequences of values.
+        """
+        super().__init__(chunk_size)
+        if fieldnames:
+            self._writer = csv.DictWriter(self, fieldnames=fieldnames)
+            self._writer.writeheader()
+        else:
+            self._writer = csv.writer(self)
+
+    def write_row(self, row: Any):
+        self._writer.writerow(row)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Compress chunks as a gzip stream, without waiting for all chunks to be provided.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,43 @@
+import time
+from contextlib import contextmanager
+
+
+class Timings:
+    """
+    Duration of the phases of a request (such as db, render or downstream).
+    """
+
+    __slots__ = ("phases",)
+
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, phase: str, duration: float):
+        """
+        Add duration to phase (a phase can be measured multiple times per request).
+
+        :param phase: Name of the phase, must be a valid HTTP token to be sent in Server-Timing header.
+        :param duration: Duration in seconds.
+        """
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+    @contextmanager
+    def measure(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def server_timing(self, total: float) -> str:
+        """
+        Return Server-Timing header value.
+
+        :param total: Request processing time in seconds.
+        """
+        metrics = [
+            f"{phase};dur={duration * 1000:.3f}"
+            for phase, duration in self.phases.items()
+        ]
+        metrics.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(metrics)
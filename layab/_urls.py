@@ -0,0 +1,10 @@
+import functools
+
+
+@functools.lru_cache(maxsize=256)
+def absolute_base_path(scheme: str, netloc: str, service_path: str) -> str:
+    """
+    Return scheme://netloc/service_path.
+    Cached as the same few (scheme, host, reverse proxy entry) are used by every request.
+    """
+    return f"{scheme}://{netloc}{service_path}"
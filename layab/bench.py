@@ -0,0 +1,531 @@
+"""
+Load generation against an ASGI (Starlette) or WSGI (Flask) application, entirely on localhost.
+
+Usage:
+    python -m layab.bench my_module:app --request "GET /health" --request "3:POST /resource" --concurrency 10
+"""
+import argparse
+import asyncio
+import http.client
+import importlib
+import inspect
+import io
+import random
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+
+class BenchRequest:
+    """
+    A request of the request mix.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        *,
+        weight: int = 1,
+        headers: Dict[str, str] = None,
+        body: bytes = b"",
+    ):
+        """
+        :param method: HTTP method (GET, POST, PUT, DELETE, PATCH)
+        :param path: Server relative URL, including query string.
+        :param weight: How often this request is sent compared to the other requests of the mix.
+        :param headers: Headers to send with the request.
+        :param body: Body to send with the request.
+        """
+        self.method = method.upper()
+        self.path, _, self.query_string = path.partition("?")
+        self.url = path
+        self.weight = weight
+        self.headers = headers or {}
+        self.body = body
+        if body:
+            self.headers.setdefault("Content-Length", str(len(body)))
+
+    @classmethod
+    def parse(cls, definition: str, **kwargs) -> "BenchRequest":
+        """
+        Create a request from "[weight:]METHOD /path?query" definition.
+        """
+        weight, _, request = definition.partition(":")
+        if not weight.strip().isdigit():  # No weight provided
+            weight, request = "", definition
+        method, path = request.split(maxsplit=1)
+        return cls(method, path, weight=int(weight or 1), **kwargs)
+
+    def __str__(self):
+        return f"{self.method} {self.url}"
+
+
+class Report:
+    """
+    Outcome of a load generation.
+    """
+
+    def __init__(self, latencies: List[Tuple[str, int, float]], duration: float):
+        """
+        :param latencies: (request, status code, latency in seconds) of each sent request.
+        Status code is 0 if no response could be received.
+        :param duration: Total time in seconds.
+        """
+        self.latencies = latencies
+        self.duration = duration
+
+    @property
+    def throughput(self) -> float:
+        """Number of requests per second."""
+        return len(self.latencies) / self.duration if self.duration else 0.0
+
+    @property
+    def errors(self) -> int:
+        """Number of requests without response or with a server error response."""
+        return sum(
+            1 for _, status_code, _ in self.latencies if not 0 < status_code < 500
+        )
+
+    def status_codes(self) -> Dict[int, int]:
+        status_codes = {}
+        for _, status_code, _ in self.latencies:
+            status_codes[status_code] = status_codes.get(status_code, 0) + 1
+        return status_codes
+
+    def percentile(self, percent: float) -> float:
+        """Latency (in seconds) below which the provided percentage of requests were answered."""
+        latencies = sorted(latency for _, _, latency in self.latencies)
+        if not latencies:
+            return 0.0
+        rank = max(int(round(percent / 100 * len(latencies))) - 1, 0)
+        return latencies[min(rank, len(latencies) - 1)]
+
+    def __str__(self):
+        lines = [
+            f"requests: {len(self.latencies)} in {self.duration:.2f}s ({self.errors} errors)",
+            f"throughput: {self.throughput:.1f} requests/s",
+            "latency: "
+            + ", ".join(
+                f"p{percent}={self.percentile(percent) * 1000:.2f}ms"
+                for percent in (50, 90, 99, 100)
+            ),
+            "status codes: "
+            + ", ".join(
+                f"{status_code or 'no response'}={count}"
+                for status_code, count in sorted(self.status_codes().items())
+            ),
+        ]
+        return "\n".join(lines)
+
+
+def load_application(path: str) -> Callable:
+    """
+    Import an application from its "module:attribute" path.
+    """
+    module_name, _, attribute = path.partition(":")
+    application = importlib.import_module(module_name)
+    for name in (attribute or "app").split("."):
+        application = getattr(application, name)
+    return application
+
+
+def is_asgi(application: Callable) -> bool:
+    """
+    Return True if application is an ASGI application (WSGI applications are not coroutines).
+    """
+    return inspect.iscoroutinefunction(application) or inspect.iscoroutinefunction(
+        getattr(application, "__call__", None)
+    )
+
+
+def run(
+    application: Callable,
+    requests: List[BenchRequest],
+    *,
+    total: int = 1000,
+    concurrency: int = 10,
+    over_socket: bool = False,
+) -> Report:
+    """
+    Send requests to application and report how it performed.
+
+    :param application: ASGI or WSGI application.
+    :param requests: Request mix to send (randomly picked according to their weight).
+    :param total: Total number of requests to send.
+    :param concurrency: Number of concurrent clients.
+    :param over_socket: If the application should be served (on localhost) and requested through a socket.
+    Application is called in process by default.
+    """
+    random_requests = random.Random(0).choices(
+        requests, weights=[request.weight for request in requests], k=total
+    )
+    # Split requests between clients
+    clients_requests = [
+        random_requests[index::concurrency] for index in range(concurrency)
+    ]
+    if over_socket:
+        server = _AsgiServer if is_asgi(application) else _WsgiServer
+        with server(application) as port:
+            return _run_threads(_socket_client(port), clients_requests)
+    if is_asgi(application):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(_run_asgi(application, clients_requests))
+        finally:
+            loop.close()
+    return _run_threads(_wsgi_client(application), clients_requests)
+
+
+def _run_threads(
+    client: Callable, clients_requests: List[List[BenchRequest]]
+) -> Report:
+    latencies = []
+    threads = [
+        threading.Thread(target=client, args=(client_requests, latencies))
+        for client_requests in clients_requests
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return Report(latencies, time.perf_counter() - start)
+
+
+def _wsgi_client(application: Callable) -> Callable:
+    def client(requests: List[BenchRequest], latencies: list):
+        for request in requests:
+            environ = {
+                "REQUEST_METHOD": request.method,
+                "SCRIPT_NAME": "",
+                "PATH_INFO": request.path,
+                "QUERY_STRING": request.query_string,
+                "SERVER_NAME": "localhost",
+                "SERVER_PORT": "80",
+                "SERVER_PROTOCOL": "HTTP/1.1",
+                "REMOTE_ADDR": "127.0.0.1",
+                "HTTP_HOST": "localhost",
+                "wsgi.version": (1, 0),
+                "wsgi.url_scheme": "http",
+                "wsgi.input": io.BytesIO(request.body),
+                "wsgi.errors": sys.stderr,
+                "wsgi.multithread": True,
+                "wsgi.multiprocess": False,
+                "wsgi.run_once": False,
+            }
+            for name, value in request.headers.items():
+                name = name.upper().replace("-", "_")
+                if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                    name = f"HTTP_{name}"
+                environ[name] = value
+
+            status = []
+
+            def start_response(status_line, headers, exc_info=None):
+                status.append(int(status_line.split(maxsplit=1)[0]))
+
+            start = time.perf_counter()
+            try:
+                body = application(environ, start_response)
+                try:
+                    for _ in body:
+                        pass
+                finally:
+                    if hasattr(body, "close"):
+                        body.close()
+            except Exception:
+                status.append(0)
+            latencies.append((str(request), status[-1], time.perf_counter() - start))
+
+    return client
+
+
+async def _run_asgi(
+    application: Callable, clients_requests: List[List[BenchRequest]]
+) -> Report:
+    latencies = []
+
+    async def client(requests: List[BenchRequest]):
+        for request in requests:
+            start = time.perf_counter()
+            status_code = await _asgi_request(application, request)
+            latencies.append((str(request), status_code, time.perf_counter() - start))
+
+    async with _AsgiLifespan(application):
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[client(client_requests) for client_requests in clients_requests]
+        )
+        return Report(latencies, time.perf_counter() - start)
+
+
+async def _asgi_request(application: Callable, request: BenchRequest) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": request.method,
+        "scheme": "http",
+        "path": request.path,
+        "raw_path": request.path.encode(),
+        "root_path": "",
+        "query_string": request.query_string.encode(),
+        "headers": [(b"host", b"localhost")]
+        + [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in request.headers.items()
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    request_sent = False
+    response_complete = asyncio.Event()
+    status = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": request.body, "more_body": False}
+        # Client stays connected until the response is received
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message["type"] == "http.response.body" and not message.get(
+            "more_body", False
+        ):
+            response_complete.set()
+
+    try:
+        await application(scope, receive, send)
+    except Exception:
+        pass  # Application may raise after sending a server error response
+    return status[0] if status else 0
+
+
+class _AsgiLifespan:
+    """
+    Send lifespan startup and shutdown events (if supported by the application).
+    """
+
+    def __init__(self, application: Callable):
+        self.application = application
+        self.events = asyncio.Queue()
+        self.startup = asyncio.Event()
+        self.shutdown = asyncio.Event()
+
+    async def _receive(self):
+        return await self.events.get()
+
+    async def _send(self, message):
+        if message["type"].startswith("lifespan.startup"):
+            self.startup.set()
+        elif message["type"].startswith("lifespan.shutdown"):
+            self.shutdown.set()
+
+    async def _run(self):
+        try:
+            await self.application({"type": "lifespan"}, self._receive, self._send)
+        except Exception:
+            pass  # Lifespan is not supported by application
+        finally:
+            self.startup.set()
+            self.shutdown.set()
+
+    async def __aenter__(self):
+        self.task = asyncio.ensure_future(self._run())
+        await self.events.put({"type": "lifespan.startup"})
+        await self.startup.wait()
+
+    async def __aexit__(self, *args):
+        await self.events.put({"type": "lifespan.shutdown"})
+        await self.shutdown.wait()
+        await self.task
+
+
+def _socket_client(port: int) -> Callable:
+    def send(connection: http.client.HTTPConnection, request: BenchRequest) -> int:
+        connection.request(
+            request.method,
+            request.url,
+            body=request.body or None,
+            headers=request.headers,
+        )
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def client(requests: List[BenchRequest], latencies: list):
+        connection = _HTTPConnection("127.0.0.1", port)
+        try:
+            for request in requests:
+                start = time.perf_counter()
+                try:
+                    status_code = send(connection, request)
+                except ConnectionError:
+                    # Server closed the kept alive connection, send on a new one (as HTTP clients do)
+                    connection.close()
+                    try:
+                        status_code = send(connection, request)
+                    except (http.client.HTTPException, OSError):
+                        connection.close()
+                        status_code = 0
+                except (http.client.HTTPException, OSError):
+                    connection.close()
+                    status_code = 0
+                latencies.append(
+                    (str(request), status_code, time.perf_counter() - start)
+                )
+        finally:
+            connection.close()
+
+    return client
+
+
+class _HTTPConnection(http.client.HTTPConnection):
+    def connect(self):
+        super().connect()
+        # Do not let Nagle's algorithm and delayed acknowledgments add latency to measures
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _WsgiServer:
+    """
+    Serve a WSGI application on a random localhost port (provided when entering the context).
+    """
+
+    def __init__(self, application: Callable):
+        self.server = make_server(
+            "127.0.0.1",
+            0,
+            application,
+            server_class=_ThreadingWSGIServer,
+            handler_class=_QuietWSGIRequestHandler,
+        )
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> int:
+        self.thread.start()
+        return self.server.server_port
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class _AsgiServer:
+    """
+    Serve an ASGI application on a random localhost port (provided when entering the context).
+    Requires uvicorn.
+    """
+
+    def __init__(self, application: Callable):
+        import uvicorn
+
+        self.socket = socket.socket()
+        # Accepted connections inherit this option, avoid delaying responses sent in multiple writes
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket.bind(("127.0.0.1", 0))
+        self.server = uvicorn.Server(
+            uvicorn.Config(application, log_level="warning", access_log=False)
+        )
+        self.thread = threading.Thread(
+            target=self.server.run, kwargs={"sockets": [self.socket]}, daemon=True
+        )
+
+    def __enter__(self) -> int:
+        self.thread.start()
+        while not self.server.started and self.thread.is_alive():
+            time.sleep(0.01)
+        return self.socket.getsockname()[1]
+
+    def __exit__(self, *args):
+        self.server.should_exit = True
+        self.thread.join()
+        self.socket.close()
+
+
+def main(args: List[str] = None) -> Report:
+    parser = argparse.ArgumentParser(
+        prog="python -m layab.bench",
+        description="Load generation against an ASGI or WSGI application, on localhost.",
+    )
+    parser.add_argument(
+        "application", help='Application to load, as "module:attribute".'
+    )
+    parser.add_argument(
+        "--request",
+        action="append",
+        dest="requests",
+        metavar="[WEIGHT:]METHOD PATH",
+        help='Request of the mix (can be repeated), such as "3:GET /resource?id=1". "GET /" by default.',
+    )
+    parser.add_argument(
+        "--header",
+        action="append",
+        dest="headers",
+        default=[],
+        metavar="NAME: VALUE",
+        help="Header to send with every request (can be repeated).",
+    )
+    parser.add_argument("--body", default="", help="Body to send with every request.")
+    parser.add_argument(
+        "--total-requests",
+        type=int,
+        default=1000,
+        dest="total",
+        help="Total number of requests.",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="Number of concurrent clients."
+    )
+    parser.add_argument(
+        "--socket",
+        action="store_true",
+        help="Serve application on localhost and send requests through a socket instead of in process. "
+        "Serving an ASGI application requires uvicorn.",
+    )
+    options = parser.parse_args(args)
+
+    sys.path.insert(0, "")
+    headers = dict(
+        (part.strip() for part in header.split(":", maxsplit=1))
+        for header in options.headers
+    )
+    requests = [
+        BenchRequest.parse(
+            definition, headers=dict(headers), body=options.body.encode()
+        )
+        for definition in options.requests or ["GET /"]
+    ]
+    report = run(
+        load_application(options.application),
+        requests,
+        total=options.total,
+        concurrency=options.concurrency,
+        over_socket=options.socket,
+    )
+    print(report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""
+HTTP clients to call other services, propagating the identifier of the request being processed and reporting calls
+in its logs.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import logging
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from layab._logging import current_request_id
+from layab._statistics import RequestStatistics, current_statistics
+
+if TYPE_CHECKING:  # requests is only imported when a client is created
+    import requests
+
+logger = logging.getLogger(__name__)
+
+# Methods that can be sent again without side effects
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Status codes of responses that can be retried
+_RETRY_STATUS_CODES = {502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """
+    Request was not sent as the circuit of the host is open (the host is failing or too slow).
+    """
+
+    def __init__(self, host: str):
+        super().__init__(f"Circuit is open for {host}.")
+        self.host = host
+
+
+class _Circuit:
+    def __init__(self, window: int):
+        self.state = "closed"
+        # Outcome of the last calls: (failed, slow)
+        self.outcomes: Deque[tuple] = collections.deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probes = 0
+        self.succeeded_probes = 0
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to a host once too many of its recent calls failed (no response or 5xx status code) or were
+    too slow: requests are then rejected (raising CircuitOpenError) without reaching the host.
+
+    Once open_duration elapsed, a few probe requests are sent (half open circuit). The circuit is closed if they
+    succeed, opened again otherwise.
+
+    State is maintained per host.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 1.0,
+        slow_call_duration: float = 5.0,
+        window: int = 20,
+        minimum_calls: int = 10,
+        open_duration: float = 30.0,
+        half_open_calls: int = 3,
+    ):
+        """
+        :param failure_rate_threshold: Proportion of failed calls opening the circuit. 50% by default.
+        :param slow_call_rate_threshold: Proportion of slow calls opening the circuit. 100% by default.
+        :param slow_call_duration: Number of seconds after which a call is slow. 5 seconds by default.
+        :param window: Number of last calls used to compute failure and slow call rates. 20 by default.
+        :param minimum_calls: Minimum number of calls before the circuit can be opened. 10 by default.
+        :param open_duration: Number of seconds requests are rejected once circuit opened. 30 seconds by default.
+        :param half_open_calls: Number of probe requests sent once open_duration elapsed. 3 by default.
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.window = window
+        self.minimum_calls = minimum_calls
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def state(self, host: str) -> str:
+        """
+        Return the state of the circuit of host: closed (requests are sent), open (requests are rejected) or
+        half_open (probe requests are sent).
+        """
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None:
+                return "closed"
+            if circuit.state == "open" and self._can_probe(circuit):
+                return "half_open"
+            return circuit.state
+
+    def allow(self, host: str) -> bool:
+        """
+        Return True if a request can be sent to host. Outcome of the request must then be provided to record.
+        """
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.state == "closed":
+                return True
+            if circuit.state == "open":
+                if not self._can_probe(circuit):
+                    return False
+                self._transition(host, circuit, "half_open")
+            if circuit.probes >= self.half_open_calls:
+                return False
+            circuit.probes += 1
+            return True
+
+    def record(self, host: str, duration: float, failed: bool):
+        """
+        Provide the outcome of a request sent to host.
+        """
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None:
+                circuit = self._circuits[host] = _Circuit(self.window)
+
+            if circuit.state == "half_open":
+                if failed or slow:
+                    self._open(host, circuit)
+                    return
+                circuit.succeeded_probes += 1
+                if circuit.succeeded_probes >= self.half_open_calls:
+                    circuit.outcomes.clear()
+                    self._transition(host, circuit, "closed")
+                return
+
+            if circuit.state == "open":  # Request was sent before the circuit opened
+                return
+            circuit.outcomes.append((failed, slow))
+            calls = len(circuit.outcomes)
+            if calls < self.minimum_calls:
+                return
+            failures = sum(1 for failed, _ in circuit.outcomes if failed)
+            slow_calls = sum(1 for _, slow in circuit.outcomes if slow)
+            if (
+                failures / calls >= self.failure_rate_threshold
+                or slow_calls / calls >= self.slow_call_rate_threshold
+            ):
+                self._open(host, circuit)
+
+    def _can_probe(self, circuit: _Circuit) -> bool:
+        return time.monotonic() >= circuit.opened_at + self.open_duration
+
+    def _open(self, host: str, circuit: _Circuit):
+        circuit.opened_at = time.monotonic()
+        self._transition(host, circuit, "open")
+
+    def _transition(self, host: str, circuit: _Circuit, state: str):
+        circuit.state = state
+        circuit.probes = 0
+        circuit.succeeded_probes = 0
+        logger.warning({"circuit_host": host, "circuit_state": state})
+
+
+class RetryBudget:
+    """
+    Limit the number of retries (whatever the host), so that retries cannot overload failing services: retries cannot
+    exceed a proportion of requests (plus a minimum number of retries per second), over the last ttl seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        ratio: float = 0.2,
+        min_retries_per_second: float = 10.0,
+        ttl: float = 10.0,
+    ):
+        """
+        :param ratio: Number of retries allowed per request. 20% of requests by default.
+        :param min_retries_per_second: Retries allowed whatever the number of requests. 10 per second by default.
+        :param ttl: Number of seconds requests and retries are accounted for. 10 seconds by default.
+        """
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.ttl = ttl
+        # [second, requests, retries] of the last ttl seconds
+        self._buckets: Deque[List[int]] = collections.deque()
+        self._lock = threading.Lock()
+
+    def request(self):
+        """Account for a request."""
+        with self._lock:
+            self._bucket()[1] += 1
+
+    def try_retry(self) -> bool:
+        """
+        Return True (and account for a retry) if a retry is allowed.
+        """
+        with self._lock:
+            bucket = self._bucket()
+            requests = sum(bucket[1] for bucket in self._buckets)
+            retries = sum(bucket[2] for bucket in self._buckets)
+            balance = (
+                self.min_retries_per_second * self.ttl + self.ratio * requests - retries
+            )
+            if balance < 1:
+                return False
+            bucket[2] += 1
+            return True
+
+    def _bucket(self) -> List[int]:
+        second = int(time.monotonic())
+        while self._buckets and self._buckets[0][0] <= second - self.ttl:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        return self._buckets[-1]
+
+
+class _Call:
+    """
+    Outcome of a request (including its retries).
+    """
+
+    __slots__ = (
+        "method",
+        "url",
+        "response",
+        "exception",
+        "duration",
+        "retries",
+        "rejected",
+    )
+
+    def __init__(self, method: str, url: str):
+        self.method = method
+        self.url = url
+        self.response: Optional["requests.Response"] = None
+        self.exception: Optional[Exception] = None
+        self.duration = 0.0
+        self.retries = 0
+        self.rejected = False
+
+    @property
+    def status_code(self) -> Optional[int]:
+        return self.response.status_code if self.response is not None else None
+
+
+class Client:
+    """
+    HTTP client (based on requests) sharing a pool of connections per host.
+
+    The identifier of the request being processed (if any) is sent in the X-Request-Id header.
+    Calls are reported in the logs of the request being processed, as downstream (number of calls, number of failed
+    calls (no response or 5xx status code), number of rejected calls (open circuit), number of retries and total time
+    spent). Every call is also logged (as DEBUG).
+
+    Idempotent requests (GET, HEAD, OPTIONS, PUT and DELETE) can be retried on connection failure (or 502, 503 and
+    504 status codes), and a circuit breaker can reject requests to failing hosts.
+
+    client = Client("http://other_service")
+    response = client.get("/items", params={"name": "first"})
+    """
+
+    def __init__(
+        self,
+        base_url: str = "",
+        *,
+        timeout: float = 10.0,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        headers: Dict[str, str] = None,
+        retries: int = 0,
+        retry_backoff: float = 0.1,
+        retry_budget: RetryBudget = None,
+        circuit_breaker: CircuitBreaker = None,
+    ):
+        """
+        :param base_url: URL prepended to relative URLs. URLs are used as provided by default.
+        :param timeout: Default number of seconds to wait for the server (connection or response). 10 seconds by default.
+        :param pool_connections: Number of hosts to keep a connections pool for. 10 by default.
+        :param pool_maxsize: Number of connections kept open per host. 10 by default.
+        :param pool_block: Wait for a pooled connection to be available instead of opening a new (non pooled)
+        connection when pool_maxsize connections are already in use. Open new connections by default.
+        :param headers: Headers sent with every request.
+        :param retries: Maximum number of retries of an idempotent request. Not retried by default.
+        :param retry_backoff: Number of seconds to wait before the first retry, doubled for every retry (with jitter).
+        0.1 second by default.
+        :param retry_budget: Limit retries of this client (and of any other client provided with the same budget).
+        Retries are only limited by the number of retries by default.
+        :param circuit_breaker: Reject requests to failing hosts (raising CircuitOpenError). Requests are always sent
+        by default.
+        """
+        import requests.adapters
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_budget = retry_budget
+        self.circuit_breaker = circuit_breaker
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def request(self, method: str, url: str, **kwargs) -> "requests.Response":
+        """
+        Send a request.
+
+        :param method: HTTP method (GET, POST, PUT, DELETE, PATCH, ...)
+        :param url: URL (relative to base_url if provided).
+        :param kwargs: Parameters of requests.request (such as params, json, headers or timeout).
+        """
+        call = self._send(method, url, current_request_id(), kwargs)
+        return _report(current_statistics.get(), call)
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> "requests.Response":
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> "requests.Response":
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> "requests.Response":
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> "requests.Response":
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _send(
+        self, method: str, url: str, request_id: Optional[str], kwargs: dict
+    ) -> _Call:
+        if self.base_url and not url.startswith(("http://", "https://")):
+            url = f"{self.base_url}/{url.lstrip('/')}"
+        if request_id:
+            headers = kwargs.get("headers") or {}
+            if "X-Request-Id" not in headers:
+                kwargs["headers"] = {**headers, "X-Request-Id": request_id}
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        retries = self.retries if method.upper() in _IDEMPOTENT_METHODS else 0
+        if self.retry_budget:
+            self.retry_budget.request()
+
+        call = _Call(method, url)
+        start = time.perf_counter()
+        while True:
+            self._attempt(call, host, kwargs)
+            if (
+                call.rejected
+                or call.retries >= retries
+                or not _retryable(call)
+                or (self.retry_budget and not self.retry_budget.try_retry())
+            ):
+                break
+            if call.response is not None:
+                call.response.close()
+            time.sleep(self.retry_backoff * 2 ** call.retries * random.uniform(0.5, 1))
+            call.retries += 1
+        call.duration = time.perf_counter() - start
+        return call
+
+    def _attempt(self, call: _Call, host: str, kwargs: dict):
+        if self.circuit_breaker and not self.circuit_breaker.allow(host):
+            call.response, call.exception = None, CircuitOpenError(host)
+            call.rejected = True
+            return
+
+        start = time.perf_counter()
+        try:
+            call.response, call.exception = (
+                self.session.request(call.method, call.url, **kwargs),
+                None,
+            )
+        except Exception as e:
+            call.response, call.exception = None, e
+        if self.circuit_breaker:
+            self.circuit_breaker.record(
+                host, time.perf_counter() - start, failed=_failed(call.status_code)
+            )
+
+
+class AsyncClient:
+    """
+    Asynchronous interface to a Client: requests are sent in threads, sharing the client pool of connections.
+
+    client = AsyncClient(Client("http://other_service"))
+    response = await client.get("/items", params={"name": "first"})
+    """
+
+    def __init__(self, client: Client, *, max_workers: int = None):
+        """
+        :param client: Client sending the requests.
+        :param max_workers: Maximum number of requests sent concurrently. Client pool_maxsize by default.
+        """
+        self.client = client
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers or client.pool_maxsize, thread_name_prefix="layab-client"
+        )
+
+    async def request(self, method: str, url: str, **kwargs) -> "requests.Response":
+        """
+        Send a request.
+
+        :param method: HTTP method (GET, POST, PUT, DELETE, PATCH, ...)
+        :param url: URL (relative to client base_url if provided).
+        :param kwargs: Parameters of requests.request (such as params, json, headers or timeout).
+        """
+        # Request context is not available in executor threads
+        send = functools.partial(
+            self.client._send, method, url, current_request_id(), kwargs
+        )
+        call = await asyncio.get_event_loop().run_in_executor(self._executor, send)
+        return _report(current_statistics.get(), call)
+
+    async def get(self, url: str, **kwargs) -> "requests.Response":
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> "requests.Response":
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> "requests.Response":
+        return await self.request("PUT", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> "requests.Response":
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> "requests.Response":
+        return await self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        """Wait for requests being sent. Client is not closed."""
+        self._executor.shutdown()
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+
+def _failed(status_code: Optional[int]) -> bool:
+    return status_code is None or status_code >= 500
+
+
+def _retryable(call: _Call) -> bool:
+    return call.exception is not None or call.status_code in _RETRY_STATUS_CODES
+
+
+def _report(
+    statistics: Optional[RequestStatistics], call: _Call
+) -> "requests.Response":
+    status_code = call.status_code
+    if statistics is not None:
+        statistics.add_downstream_call(
+            call.duration,
+            failed=_failed(status_code),
+            rejected=call.rejected,
+            retries=call.retries,
+        )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            {
+                "downstream_method": call.method,
+                "downstream_url": call.url,
+                "downstream_status_code": status_code,
+                "downstream_processing_time": call.duration,
+                "downstream_retries": call.retries,
+                "downstream_rejected": call.rejected,
+            }
+        )
+    if call.exception is not None:
+        raise call.exception
+    return call.response
@@ -1,32 +1,124 @@
-import copy
+import contextlib
+import json
 import logging
-import uuid
-from typing import List, Any
-import time
-import traceback
+import os
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Any,
+    Callable,
+    ContextManager,
+    Iterable,
+    Iterator,
+    Optional,
+)
 import functools
-from urllib.parse import urlparse
 
 import flask
 import flask_restx
 import werkzeug
-from werkzeug.middleware.proxy_fix import ProxyFix
+
+from layab._logging import current_request_id
+from layab._memory import MemoryTracker
+from layab._statistics import RequestStatistics, request_id
+from layab._shutdown import GracefulShutdown
+from layab._urls import absolute_base_path
+
+if TYPE_CHECKING:  # Optional components are only imported when used
+    from layab._health import HealthChecks
+    from layab._metrics import Metrics
+    from layab._openapi import OpenAPIDocument
 
 
 logger = logging.getLogger(__name__)
 
 
 class Api(flask_restx.Api):
+    """
+    flask_restx.Api serving the OpenAPI definition (swagger.json) serialized and compressed once, with an ETag.
+    """
+
     def __init__(self, *args, **kwargs):
+        """
+        :param info: Additional OpenAPI information (such as {"x-server-environment": "production"}).
+        :param schema_file: Path to the OpenAPI definition written by write_schema. If the file exists, the definition
+        is served from it instead of being generated. Generated by default.
+        """
         self.extra_info = kwargs.pop("info", {})
+        self.schema_file = kwargs.pop("schema_file", None)
+        self._document: Optional["OpenAPIDocument"] = None
         super().__init__(*args, **kwargs)
 
     @werkzeug.utils.cached_property
     def __schema__(self):
+        if self.schema_file and os.path.isfile(self.schema_file):
+            with open(self.schema_file, "rb") as schema_file:
+                return json.load(schema_file)
+        return self._generated_schema()
+
+    def _generated_schema(self) -> dict:
         schema = super().__schema__
         schema.setdefault("info", {}).update(self.extra_info)
         return schema
 
+    def write_schema(self, file_path: str):
+        """
+        Write the OpenAPI definition, to be provided as schema_file (at build time for instance).
+        Must be called within a request context: with app.test_request_context(): api.write_schema("swagger.json")
+        """
+        from layab._json import dumps
+
+        body = dumps(self._generated_schema())
+        with open(file_path, "wb") as schema_file:
+            schema_file.write(body)
+
+    def _register_specs(self, app_or_blueprint):
+        if self._add_specs:
+            endpoint = "specs"
+            self._register_view(
+                app_or_blueprint,
+                _SwaggerView,
+                self.default_namespace,
+                "/swagger.json",
+                endpoint=endpoint,
+                resource_class_args=(self,),
+            )
+            self.endpoints.add(endpoint)
+
+    def _openapi_document(self) -> Optional["OpenAPIDocument"]:
+        """
+        Return the serialized OpenAPI definition. None if definition cannot be generated.
+        """
+        if self._document is None:
+            if self.schema_file and os.path.isfile(self.schema_file):
+                with open(self.schema_file, "rb") as schema_file:
+                    body = schema_file.read()
+            elif "error" in self.__schema__:
+                return None
+            else:
+                from layab._json import dumps
+
+                body = dumps(self.__schema__)
+
+            from layab._openapi import OpenAPIDocument
+
+            self._document = OpenAPIDocument(body)
+        return self._document
+
+
+class _SwaggerView(flask_restx.Resource):
+    """Send the serialized OpenAPI definition, handling compression and conditional requests."""
+
+    def get(self):
+        document = self.api._openapi_document()
+        if document is None:
+            return self.api.__schema__, 500
+        status, body, headers = document.response(
+            flask.request.headers.get("Accept-Encoding"),
+            flask.request.headers.get("If-None-Match"),
+        )
+        return flask.Response(body, status=status, headers=headers)
+
 
 def enrich_flask(
     application: flask.Flask,
@@ -34,7 +126,15 @@ def enrich_flask(
     cors: bool = True,
     compress_mimetypes: List[str] = None,
     reverse_proxy: bool = True,
+    request_logging: bool = False,
 ):
+    """
+    :param cors: Allow cross origin requests. Allowed by default.
+    :param compress_mimetypes: Compress responses of those mime types. Not compressed by default.
+    :param reverse_proxy: Handle requests passing by a reverse proxy. Handled by default.
+    :param request_logging: Log every request thanks to LoggingMiddleware (with default parameters). Use
+    LoggingMiddleware (or log_requests) yourself to provide parameters. Not logged by default.
+    """
     if cors:
         import flask_cors
 
@@ -46,54 +146,89 @@ def enrich_flask(
         application.config["COMPRESS_MIMETYPES"] = compress_mimetypes
         flask_compress.Compress(application)
 
+    # Requests logged by LoggingMiddleware (whoever installed it) are exposed the same way log_requests does
+    application.before_request(_expose_statistics)
+
+    if request_logging:
+        # Installed before ProxyFix so that logged requests are the ones seen by the application
+        application.wsgi_app = LoggingMiddleware(application.wsgi_app)
+
     if reverse_proxy:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+
         application.wsgi_app = ProxyFix(
             application.wsgi_app, x_proto=1, x_host=1, x_prefix=1
         )
 
 
-class _Statistics:
-    def __init__(self, request: flask.Request):
-        request_id = request.headers.get("X-Request-Id", str(uuid.uuid4()))
-        # Store the request ID so that it can be accessed to use in application logs
-        flask.g.request_id = request_id
-        args = {arg: [] for arg in request.args}
-        for arg, value in request.args.items(multi=True):
-            args[arg].append(value)
-
-        self.stats = {
-            "request": {
-                "url.path": request.path,
-                "method": request.method,
-                "id": request_id,
-                "args": args,
-                "headers": dict(request.headers),
-                "status": "start",
-            },
-        }
-        logger.info(copy.deepcopy(self.stats))
-        self.start = time.perf_counter()
-
-    def response(self, response: Any):
-        self.stats["request"]["processing_time"] = time.perf_counter() - self.start
-        self.stats["request"]["status"] = "end"
-        self.stats["request"]["status_code"] = (
-            response.status_code if isinstance(response, flask.Response) else 200
+def _expose_statistics():
+    """
+    Provide identifier and timings of the request logged by LoggingMiddleware as flask.g.request_id and flask.g.timings.
+    """
+    statistics = flask.request.environ.get("layab.statistics")
+    if statistics is not None:
+        flask.g.request_id = statistics.request_id
+        flask.g.timings = statistics.timings
+
+
+class _Statistics(RequestStatistics):
+    __slots__ = ()
+
+    logger = logger
+
+    def __init__(
+        self,
+        request: werkzeug.wrappers.Request,
+        memory_tracker: MemoryTracker = None,
+        metrics: "Metrics" = None,
+    ):
+        # URL rule is not known yet when logged by LoggingMiddleware
+        url_rule = getattr(request, "url_rule", None)
+        rule = url_rule.rule if url_rule else request.path
+        super().__init__(
+            method=request.method,
+            path=request.path,
+            request_id=request_id(request.headers.get("X-Request-Id")),
+            args=request.args.items(multi=True),
+            headers=request.headers.items(),
+            route=f"{request.method} {rule}",
+            memory_tracker=memory_tracker,
+            metrics=metrics,
         )
-        logger.info(self.stats)
+        self.matched = url_rule is not None
 
-    def exception_occurred(self, exception: Exception):
-        self.stats["request"]["processing_time"] = time.perf_counter() - self.start
-        self.stats["request"]["status"] = "error"
-        self.stats["error"] = {
-            "class": type(exception).__name__,
-            "msg": str(exception),
-            "traceback": traceback.format_exc(),
-        }
-        logger.critical(self.stats)
+    def routed(self, environ: dict):
+        """
+        Use the URL rule of the request (once matched by flask) as route, instead of its path.
+        """
+        if self.memory_tracker or self.metrics:
+            url_rule = getattr(environ.get("werkzeug.request"), "url_rule", None)
+            if url_rule is not None:
+                self.route = f"{self.route.split(' ', 1)[0]} {url_rule.rule}"
+                self.matched = True
 
+    def add_server_timing(self, response: flask.Response) -> flask.Response:
+        response.headers.add("Server-Timing", self.server_timing())
+        return response
 
-def log_requests(skip_paths: List[str] = None):
+
+def log_requests(
+    skip_paths: List[str] = None,
+    memory_tracker: MemoryTracker = None,
+    server_timing: bool = False,
+    graceful_shutdown: GracefulShutdown = None,
+    metrics: "Metrics" = None,
+):
+    """
+    Log requests handled by flask_restx resources, upon reception and return (failure or success).
+
+    :param skip_paths: Paths that should not be logged.
+    :param memory_tracker: Measure memory allocated by each logged request. Memory is not measured by default.
+    :param server_timing: Send the timings of each logged request in a Server-Timing response header. Not sent by default.
+    :param graceful_shutdown: Track logged requests to drain them on shutdown (refusing them with a 503 status code
+    once shutdown requires it). Not tracked by default.
+    :param metrics: Count logged requests (per route and status code), see layab.Metrics. Not counted by default.
+    """
     skip_paths = skip_paths or []
 
     def _log_request_details(func):
@@ -102,32 +237,223 @@ def log_requests(skip_paths: List[str] = None):
             if not flask.has_request_context() or (flask.request.path in skip_paths):
                 return func(*func_args, **func_kwargs)
 
-            statistics = _Statistics(flask.request)
+            if graceful_shutdown is None:
+                return _log_request(func, func_args, func_kwargs)
+
+            in_flight = graceful_shutdown.request_started(
+                f"{flask.request.method} {flask.request.path}"
+            )
+            if in_flight is None:
+                return _shutting_down_response()
             try:
-                ret = func(*func_args, **func_kwargs)
-                statistics.response(ret)
-                return ret
-            except Exception as e:
-                statistics.exception_occurred(e)
-                raise
+                return _log_request(func, func_args, func_kwargs)
+            finally:
+                graceful_shutdown.request_ended(in_flight)
 
         return wrapper
 
+    def _log_request(func, func_args, func_kwargs):
+        # Avoid going through the proxy for every request attribute
+        statistics = _Statistics(
+            flask.request._get_current_object(), memory_tracker, metrics
+        )
+        # Store the request ID and timings so that application can use them
+        flask.g.request_id = statistics.request_id
+        flask.g.timings = statistics.timings
+        if server_timing:
+            flask.after_this_request(statistics.add_server_timing)
+        try:
+            ret = func(*func_args, **func_kwargs)
+            statistics.success(_status_code(ret))
+            return ret
+        except Exception as e:
+            statistics.exception_occurred(e)
+            raise
+
     flask_restx.Resource.method_decorators.append(_log_request_details)
 
 
+def _status_code(response: Any) -> int:
+    if isinstance(response, werkzeug.wrappers.Response):
+        return response.status_code
+    # flask_restx resources can return (data, status code) or (data, status code, headers)
+    if isinstance(response, tuple) and len(response) > 1:
+        if isinstance(response[1], int):
+            return response[1]
+    return 200
+
+
+def _shutting_down_response() -> flask.Response:
+    return flask.Response(
+        "Service is shutting down.",
+        status=503,
+        headers={"Connection": "close", "Retry-After": "1"},
+        content_type="text/plain",
+    )
+
+
+class LoggingMiddleware:
+    """
+    WSGI middleware logging requests upon reception and once the response was sent (failure or success), using the
+    same records as log_requests.
+
+    Contrary to log_requests, every request is logged (including plain Flask routes and requests failing before
+    reaching a resource), with the status code that was actually sent, the number of bytes of the response body
+    (response_bytes) and the time spent sending it.
+
+    application.wsgi_app = LoggingMiddleware(application.wsgi_app)
+
+    Once the application was enriched (see enrich_flask), identifier and timings of the request are available as
+    flask.g.request_id and flask.g.timings (as with log_requests).
+    """
+
+    def __init__(
+        self,
+        wsgi_app: Callable,
+        skip_paths: List[str] = None,
+        memory_tracker: MemoryTracker = None,
+        server_timing: bool = False,
+        graceful_shutdown: GracefulShutdown = None,
+        metrics: "Metrics" = None,
+    ):
+        """
+        :param wsgi_app: WSGI application (such as flask.Flask.wsgi_app).
+        :param skip_paths: Paths that should not be logged.
+        :param memory_tracker: Measure memory allocated by each logged request. Memory is not measured by default.
+        :param server_timing: Send the timings of each logged request in a Server-Timing response header. Not sent by default.
+        :param graceful_shutdown: Track logged requests to drain them on shutdown (refusing them with a 503 status code
+        once shutdown requires it). Not tracked by default.
+        :param metrics: Count logged requests (per route and status code), see layab.Metrics. Not counted by default.
+        """
+        self.wsgi_app = wsgi_app
+        self.skip_paths = skip_paths or []
+        self.memory_tracker = memory_tracker
+        self.server_timing = server_timing
+        self.graceful_shutdown = graceful_shutdown
+        self.metrics = metrics
+
+    def __call__(self, environ: dict, start_response: Callable) -> Iterable[bytes]:
+        request = werkzeug.wrappers.Request(environ, populate_request=False)
+        if request.path in self.skip_paths:
+            return self.wsgi_app(environ, start_response)
+
+        in_flight = None
+        if self.graceful_shutdown is not None:
+            in_flight = self.graceful_shutdown.request_started(
+                f"{request.method} {request.path}"
+            )
+            if in_flight is None:
+                return _shutting_down_response()(environ, start_response)
+
+        statistics = _Statistics(request, self.memory_tracker, self.metrics)
+        # Store the statistics so that application can measure phases of the request
+        environ["layab.statistics"] = statistics
+        body = _LoggedBody(statistics, environ, self.graceful_shutdown, in_flight)
+
+        def _start_response(status: str, headers: list, exc_info=None):
+            body.status_code = int(status.split(" ", 1)[0])
+            if self.server_timing:
+                headers = headers + [("Server-Timing", statistics.server_timing())]
+            return start_response(status, headers, exc_info)
+
+        try:
+            body.body = self.wsgi_app(environ, _start_response)
+        except Exception as e:
+            body.end(e)
+            raise
+        return body
+
+
+class _LoggedBody:
+    """
+    Response body counting sent bytes, logging the request once closed (by the WSGI server).
+    """
+
+    def __init__(
+        self,
+        statistics: _Statistics,
+        environ: dict,
+        graceful_shutdown: Optional[GracefulShutdown],
+        in_flight: Optional[int],
+    ):
+        self.statistics = statistics
+        self.environ = environ
+        self.graceful_shutdown = graceful_shutdown
+        self.in_flight = in_flight
+        self.body: Iterable[bytes] = ()
+        self.status_code: Optional[int] = None
+        self.sent = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            for chunk in self.body:
+                self.sent += len(chunk)
+                yield chunk
+        except Exception as e:
+            self.end(e)
+            raise
+
+    def close(self):
+        try:
+            if hasattr(self.body, "close"):
+                self.body.close()
+        finally:
+            self.end()
+
+    def end(self, exception: Exception = None):
+        statistics, self.statistics = self.statistics, None
+        if statistics is None:  # Already logged
+            return
+        statistics.routed(self.environ)
+        if exception is None:
+            statistics.success(self.status_code, response_bytes=self.sent)
+        else:
+            statistics.exception_occurred(exception)
+        if self.in_flight is not None:
+            self.graceful_shutdown.request_ended(self.in_flight)
+
+
+def timing(phase: str) -> ContextManager:
+    """
+    Measure the time spent in a phase of the current request (database, rendering, downstream call, ...).
+    Durations are logged with the request (and sent in Server-Timing header if requested).
+
+    with timing("db"):
+        query_database()
+
+    :param phase: Name of the phase. Time spent in a phase entered several times is summed.
+    """
+    timings = flask.g.get("timings") if flask.has_app_context() else None
+    if timings is None and flask.has_request_context():
+        statistics = flask.request.environ.get("layab.statistics")
+        timings = statistics.timings if statistics else None
+    return timings.measure(phase) if timings else contextlib.nullcontext()
+
+
 def _base_path() -> str:
     """
     Return service base path (handle the fact that client may be behind a reverse proxy).
     """
-    if "X-Original-Request-Uri" in flask.request.headers:
-        service_path = (
-            "/"
-            + flask.request.headers["X-Original-Request-Uri"].split("/", maxsplit=2)[1]
+    headers = flask.request.headers
+    original_request_uri = headers.get("X-Original-Request-Uri")
+    if original_request_uri is not None:
+        return absolute_base_path(
+            flask.request.scheme,
+            headers["Host"],
+            "/" + original_request_uri.split("/", maxsplit=2)[1],
         )
-        return f'{flask.request.scheme}://{flask.request.headers["Host"]}{service_path}'
-    parsed = urlparse(flask.request.base_url)
-    return f"{parsed.scheme}://{parsed.netloc}"
+    return absolute_base_path(flask.request.scheme, flask.request.host, "")
+
+
+def url_for(endpoint: str, **values) -> str:
+    """
+    Return absolute URL of endpoint (handle the fact that client may be behind a reverse proxy).
+    Base paths are cached, use it instead of flask.url_for(_external=True) in responses linking to many resources.
+
+    :param endpoint: Endpoint of the URL (same as flask.url_for).
+    :param values: Variable arguments of the URL rule (same as flask.url_for).
+    """
+    return f"{_base_path()}{flask.url_for(endpoint, **values)}"
 
 
 def location_response(url: str) -> flask.Response:
@@ -143,3 +469,215 @@ def location_response(url: str) -> flask.Response:
         headers={"location": f"{_base_path()}{url}"},
         content_type="text/plain",
     )
+
+
+def json_response(
+    content: Any, status: int = 200, headers: dict = None
+) -> flask.Response:
+    """
+    Create a JSON response serialized with orjson (if installed, standard library is used otherwise).
+    Datetimes, dates, times, UUIDs, dataclasses, enums and numpy like arrays are handled.
+
+    :param content: Content to serialize. Already serialized content (bytes or memoryview) is sent as is.
+    :param status: HTTP status code. 200 by default.
+    :param headers: Additional response headers.
+    :return: JSON response.
+    """
+    if isinstance(content, memoryview):
+        # Send memoryview as a single chunk to avoid copying it
+        headers = {**(headers or {}), "Content-Length": str(content.nbytes)}
+        content = [content]
+    elif not isinstance(content, bytes):
+        from layab._json import dumps
+
+        content = dumps(content)
+    return flask.Response(
+        content, status=status, headers=headers, mimetype="application/json"
+    )
+
+
+def ndjson_response(
+    rows: Iterable, *, chunk_size: int = 64 * 1024, compress: bool = True
+) -> flask.Response:
+    """
+    Create a response streaming rows as newline delimited JSON, using constant memory.
+
+    :param rows: Rows to send (any JSON serializable value).
+    :param chunk_size: Rows are sent in chunks of at least this number of characters. 64KiB by default.
+    :param compress: Compress the stream if client accepts gzip (rather than letting flask_compress load the whole
+    response in memory to compress it). Compressed by default.
+    :return: Streamed response.
+    """
+    from layab._streaming import NDJSONWriter
+
+    return _streamed_response(
+        NDJSONWriter(chunk_size).chunks(rows), "application/x-ndjson", compress
+    )
+
+
+def csv_response(
+    rows: Iterable,
+    *,
+    fieldnames: List[str] = None,
+    chunk_size: int = 64 * 1024,
+    compress: bool = True,
+) -> flask.Response:
+    """
+    Create a response streaming rows as CSV, using constant memory.
+
+    :param rows: Rows to send (sequences of values, or dictionaries if fieldnames are provided).
+    :param fieldnames: If provided, a header line is sent first and rows are dictionaries.
+    :param chunk_size: Rows are sent in chunks of at least this number of characters. 64KiB by default.
+    :param compress: Compress the stream if client accepts gzip (rather than letting flask_compress load the whole
+    response in memory to compress it). Compressed by default.
+    :return: Streamed response.
+    """
+    from layab._streaming import CSVWriter
+
+    return _streamed_response(
+        CSVWriter(chunk_size, fieldnames).chunks(rows), "text/csv", compress
+    )
+
+
+def _streamed_response(
+    chunks: Iterator[bytes], mimetype: str, compress: bool
+) -> flask.Response:
+    headers = {}
+    if compress and "gzip" in flask.request.accept_encodings:
+        from layab._streaming import gzip_chunks
+
+        chunks = gzip_chunks(chunks)
+        headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+    return flask.Response(
+        flask.stream_with_context(chunks), mimetype=mimetype, headers=headers
+    )
+
+
+class BatchResource(flask_restx.Resource):
+    """
+    Resource executing multiple sub-requests in one HTTP call.
+
+    Sub-requests are dispatched through the whole application (including WSGI middleware) without network round
+    trips. They are independent and run concurrently (in threads). Each sub-request inherits the batch request
+    headers (such as Authorization) and is logged with the batch request id.
+
+    api.add_resource(BatchResource, "/batch")
+
+    Request body is a JSON list of sub-requests:
+        [{"method": "GET", "path": "/items?page=2", "headers": {"Accept": "application/json"}, "body": {...}}]
+    Response is a 207 (Multi-Status) JSON list of responses (in the same order):
+        [{"status": 200, "headers": {"content-type": "application/json"}, "body": {...}}]
+
+    Subclass it to change max_concurrency (maximum number of sub-requests processed at the same time) or
+    max_requests (maximum number of sub-requests in a batch).
+    """
+
+    max_concurrency = 10
+    max_requests = 100
+
+    def post(self):
+        import concurrent.futures
+
+        from layab._batch import inherited_headers, parse_batch
+
+        try:
+            if flask.request.environ.get("layab.sub_request"):
+                # Would get around max_requests and max_concurrency
+                raise ValueError("Batch requests cannot be nested.")
+            sub_requests = parse_batch(
+                flask.request.get_json(force=True), self.max_requests
+            )
+        except ValueError as e:
+            flask_restx.abort(400, str(e))
+
+        headers = inherited_headers(flask.request.headers.items())
+        parent_request_id = current_request_id() or flask.request.headers.get(
+            "X-Request-Id"
+        )
+        if parent_request_id:
+            headers["x-request-id"] = parent_request_id
+        application = flask.current_app._get_current_object()
+        base_url = flask.request.url_root
+
+        def process(sub_request: dict) -> dict:
+            return _sub_request(application, base_url, headers, sub_request)
+
+        if not sub_requests:
+            return [], 207
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.max_concurrency, len(sub_requests))
+        ) as executor:
+            return list(executor.map(process, sub_requests)), 207
+
+
+def _sub_request(
+    application: flask.Flask, base_url: str, headers: dict, sub_request: dict
+) -> dict:
+    import werkzeug.test
+
+    from layab._batch import sub_response
+
+    environ = werkzeug.test.EnvironBuilder(
+        path=sub_request["path"],
+        base_url=base_url,
+        query_string=sub_request["query_string"],
+        method=sub_request["method"],
+        headers={**headers, **sub_request["headers"]},
+        data=sub_request["body"],
+        environ_overrides={"layab.sub_request": True},
+    ).get_environ()
+    try:
+        app_iter, status, response_headers = werkzeug.test.run_wsgi_app(
+            application.wsgi_app, environ, buffered=True
+        )
+    except Exception:
+        # Keep the behavior of a WSGI server
+        logger.exception(f"Sub-request {sub_request['path']} failed.")
+        return {"status": 500, "headers": {}, "body": "Internal Server Error"}
+    return sub_response(
+        int(status.split(" ", maxsplit=1)[0]),
+        response_headers.to_wsgi_list(),
+        b"".join(app_iter),
+    )
+
+
+class HealthResource(flask_restx.Resource):
+    """
+    Resource providing the health of the service (using application/health+json format).
+    Status code is 200 if service is healthy (pass or warn), 503 otherwise.
+
+    Checks are only run when cached health expired, see layab.HealthChecks.
+
+    api.add_resource(HealthResource, "/health", resource_class_kwargs={"health_checks": health_checks})
+    """
+
+    def __init__(self, *args, health_checks: "HealthChecks", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_checks = health_checks
+
+    def get(self):
+        from layab._json import dumps
+
+        health = self.health_checks.health_sync()
+        return flask.Response(
+            dumps(health),
+            status=self.health_checks.status_code(health),
+            mimetype="application/health+json",
+        )
+
+
+class MetricsResource(flask_restx.Resource):
+    """
+    Resource providing the metrics of every worker (using Prometheus text exposition format), see layab.Metrics.
+
+    api.add_resource(MetricsResource, "/metrics", resource_class_kwargs={"metrics": metrics})
+    """
+
+    def __init__(self, *args, metrics: "Metrics", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics
+
+    def get(self):
+        return flask.Response(
+            self.metrics.exposition(), mimetype="text/plain; version=0.0.4"
+        )
@@ -1,23 +1,79 @@
+import asyncio
+import contextlib
+import contextvars
+import gzip
+import io
+import math
+import os
 import time
 import traceback
 import logging
-import uuid
-from typing import List
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    ContextManager,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import parse_qsl
 
+from starlette.concurrency import run_in_threadpool
+from starlette.convertors import Convertor
 from starlette.middleware import Middleware
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.requests import Request
-from starlette.responses import Response
-from starlette.types import ASGIApp
+from starlette.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from starlette.routing import (
+    BaseRoute,
+    Match,
+    Mount,
+    NoMatchFound,
+    Route,
+    compile_path,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from layab._logging import current_request_id
+from layab._memory import MemoryTracker
+from layab._statistics import RequestStatistics, current_statistics, request_id
+from layab._shutdown import GracefulShutdown
+from layab._urls import absolute_base_path
+
+if TYPE_CHECKING:  # Optional components are only imported when used
+    from layab._health import HealthChecks
+    from layab._metrics import Metrics
+    from layab._openapi import OpenAPIDocument
+    from layab._streaming import RowWriter
 
 
 logger = logging.getLogger(__name__)
 
+# time.monotonic value after which the current request should not be processed anymore (None if there is no deadline)
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
 
 def middleware(
-    *, cors: bool = True, compress: bool = False, reverse_proxy: bool = True
+    *,
+    cors: bool = True,
+    compress: bool = False,
+    reverse_proxy: bool = True,
+    fused: bool = False,
+    memory_tracker: MemoryTracker = None,
+    server_timing: bool = False,
+    graceful_shutdown: GracefulShutdown = None,
+    metrics: "Metrics" = None,
 ) -> List[Middleware]:
     """
     Create a default Starlette middleware stack.
@@ -25,10 +81,39 @@ def middleware(
     :param cors: If CORS (Cross Resource) should be enabled. Activated by default.
     :param compress: If responses should be compressed. No compression by default.
     :param reverse_proxy: If server should handle reverse-proxy configuration. Enabled by default.
+    :param fused: If the stack should be provided as a single FusedMiddleware, reducing per-request overhead.
+    Separate middleware by default.
+    :param memory_tracker: Measure memory allocated by each logged request. Memory is not measured by default.
+    :param server_timing: If Server-Timing header should be sent with logged requests timings. Not sent by default.
+    :param graceful_shutdown: Track logged requests to drain them on shutdown. Not tracked by default.
+    :param metrics: Count logged requests (per route and status code), see layab.Metrics. Not counted by default.
     :return: all created middleware
     """
-    middleware = [Middleware(LoggingMiddleware, skip_paths=["/health"])]
+    logging_options = {"skip_paths": ["/health"]}
+    if memory_tracker:
+        logging_options["memory_tracker"] = memory_tracker
+    if server_timing:
+        logging_options["server_timing"] = server_timing
+    if graceful_shutdown:
+        logging_options["graceful_shutdown"] = graceful_shutdown
+    if metrics:
+        logging_options["metrics"] = metrics
+
+    if fused:
+        return [
+            Middleware(
+                FusedMiddleware,
+                cors=cors,
+                compress=compress,
+                reverse_proxy=reverse_proxy,
+                **logging_options,
+            )
+        ]
+
+    middleware = [Middleware(LoggingMiddleware, **logging_options)]
     if cors:
+        from starlette.middleware.cors import CORSMiddleware
+
         middleware.append(
             Middleware(
                 CORSMiddleware,
@@ -64,17 +149,38 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             - request_status: success
             - request_processing_time: The time it took to process the request
             - request_status_code: The HTTP status code of the response
+            - request_timing.*: The time it took to process each phase (see layab.starlette.timing)
+            - request_allocated_memory: Bytes still allocated after processing the request (if memory is tracked)
+            - request_peak_memory: Maximum bytes allocated while processing the request (if memory is tracked)
+            - request_timed_out: If request processing deadline was reached (if DeadlineMiddleware is used)
         * Upon failure (if an exception is raised) the following additional attributes will be log:
             - request_status: error
             - request.data: The request body
             - error.class: exception class name
             - error.msg: str representation of the exception instance
             - error.traceback: exception trace
+
+    If a graceful_shutdown is provided, logged requests are tracked and refused (with a 503 status code) once
+    shutdown requires it.
+
+    If metrics are provided, logged requests are counted per route and status code (see layab.Metrics).
     """
 
-    def __init__(self, app: ASGIApp, skip_paths: List[str] = None):
+    def __init__(
+        self,
+        app: ASGIApp,
+        skip_paths: List[str] = None,
+        memory_tracker: MemoryTracker = None,
+        server_timing: bool = False,
+        graceful_shutdown: GracefulShutdown = None,
+        metrics: "Metrics" = None,
+    ):
         super().__init__(app)
         self.skip_paths = skip_paths or []
+        self.memory_tracker = memory_tracker
+        self.server_timing = server_timing
+        self.graceful_shutdown = graceful_shutdown
+        self.metrics = metrics
 
     async def dispatch(
         self, request: Request, call_next: RequestResponseEndpoint
@@ -82,75 +188,260 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         if request.url.path in self.skip_paths:
             return await call_next(request)
 
-        statistics = _Statistics(request)
+        if self.graceful_shutdown is None:
+            return await self._dispatch(request, call_next)
+
+        in_flight = self.graceful_shutdown.request_started(
+            f"{request.method} {request.url.path}"
+        )
+        if in_flight is None:
+            return _shutting_down_response()
+        try:
+            return await self._dispatch(request, call_next)
+        finally:
+            self.graceful_shutdown.request_ended(in_flight)
+
+    async def _dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        statistics = _Statistics(request.scope, self.memory_tracker, self.metrics)
         try:
             response = await call_next(request)
         except Exception as e:
-            await statistics.exception_occurred(e)
+            statistics.exception_occurred(e, await request.body())
             raise
 
-        statistics.success(response)
+        statistics.success(response.status_code)
+        if self.server_timing:
+            response.headers.append("Server-Timing", statistics.server_timing())
         return response
 
 
-class _Statistics:
-    def __init__(self, request: Request):
-        self.request = request
-        original_request_id = request.headers.get("X-Request-Id")
-        request_id = (
-            f"{original_request_id},{uuid.uuid4()}"
-            if original_request_id
-            else str(uuid.uuid4())
-        )
-        self.stats = {
-            "request_url.path": request.url.path,
-            "request_method": request.method,
-            "request_id": request_id,
-        }
-        self.stats.update(
-            {
-                f"request_path.{param_name}": param_value
-                for param_name, param_value in request.path_params.items()
-            }
-        )
-        self.stats.update(
-            {
-                f"request_args.{param_name}": (
-                    param_value[0] if len(param_value) == 1 else param_value
+def _shutting_down_response() -> Response:
+    return PlainTextResponse(
+        "Service is shutting down.",
+        status_code=503,
+        headers={"Connection": "close", "Retry-After": "1"},
+    )
+
+
+class DeadlineMiddleware:
+    """
+    Cancel request processing (and respond with 504 Gateway Timeout if response was not started) once its deadline
+    is reached.
+
+    Deadline is computed when request is received, based on the number of seconds provided in a header.
+    Server side timeout (if any) is used when header is not provided, or if header value is greater.
+
+    Remaining time can be retrieved thanks to layab.starlette.remaining_time (to shorten outbound calls timeouts).
+
+    Note that synchronous endpoints (executed in a thread pool) will keep running until they finish,
+    but their response will not be awaited.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        default_timeout: float = None,
+        timeouts: Dict[str, float] = None,
+        header: str = "X-Request-Timeout",
+    ):
+        """
+        :param default_timeout: Maximum number of seconds to process a request. No server side timeout by default.
+        :param timeouts: Maximum number of seconds to process a request per route path (overriding default_timeout),
+        such as {"/items/{item_id}": 2.5}. Path parameters can have a type ({item_id:int}).
+        :param header: Header containing the maximum number of seconds client is willing to wait for a response.
+        X-Request-Timeout by default.
+        """
+        self.app = app
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        # Deadline is computed before routing, paths with parameters are matched as routes would
+        self._templates = [
+            (compile_path(path)[0], timeout)
+            for path, timeout in self.timeouts.items()
+            if "{" in path
+        ]
+        self.header = header.lower().encode("latin-1")
+
+    def _server_timeout(self, path: str) -> Optional[float]:
+        timeout = self.timeouts.get(path)
+        if timeout is not None:
+            return timeout
+        for path_regex, timeout in self._templates:
+            if path_regex.match(path):
+                return timeout
+        return self.default_timeout
+
+    def _timeout(self, scope: Scope) -> Optional[float]:
+        timeout = self._server_timeout(scope.get("root_path", "") + scope["path"])
+        for header_name, header_value in scope["headers"]:
+            if header_name == self.header:
+                try:
+                    client_timeout = float(header_value)
+                    if not math.isfinite(client_timeout) or client_timeout < 0:
+                        raise ValueError()
+                except ValueError:
+                    logger.warning(
+                        f"Invalid {self.header.decode()} header value: {header_value.decode('latin-1')}. "
+                        "Considering as not provided."
+                    )
+                    break
+                return (
+                    client_timeout if timeout is None else min(timeout, client_timeout)
                 )
-                for param_name, param_value in request.query_params.items()
-            }
-        )
-        self.stats.update(
-            {
-                f"request_headers.{header_name}": header_value
-                for header_name, header_value in request.headers.items()
-            }
-        )
-        logger.info({**self.stats, "request_status": "start"})
-        self.start = time.perf_counter()
-
-    def success(self, response: Response):
-        self.stats.update(
-            {
-                "request_processing_time": time.perf_counter() - self.start,
-                "request_status": "success",
-                "request_status_code": response.status_code,
-            }
-        )
-        logger.info(self.stats)
-
-    async def exception_occurred(self, exception: Exception):
-        self.stats.update(
-            {
-                "request.data": await self.request.body(),
-                "error.class": type(exception).__name__,
-                "error.msg": str(exception),
-                "error.traceback": traceback.format_exc(),
-                "request_status": "error",
-            }
+        return timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        timeout = self._timeout(scope) if scope["type"] == "http" else None
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = time.monotonic() + timeout
+        # Used by _Statistics to report if request timed out
+        scope["timed_out"] = False
+        response_started = False
+
+        async def send_and_track(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        token = request_deadline.set(deadline)
+        try:
+            await asyncio.wait_for(self.app(scope, receive, send_and_track), timeout)
+        except asyncio.TimeoutError:
+            if time.monotonic() < deadline:
+                raise  # Not related to the deadline
+
+            scope["timed_out"] = True
+            if not response_started:
+                response = PlainTextResponse(
+                    "Request deadline exceeded.", status_code=504
+                )
+                await response(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """
+    Return the number of seconds left to process the current request (0 if deadline is already reached).
+    None if current request does not have any deadline (see DeadlineMiddleware).
+    """
+    deadline = request_deadline.get()
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+class _Statistics(RequestStatistics):
+    __slots__ = ("scope", "path")
+
+    logger = logger
+    flat = True
+    end_status = "success"
+
+    def __init__(
+        self,
+        scope: Scope,
+        memory_tracker: MemoryTracker = None,
+        metrics: "Metrics" = None,
+    ):
+        self.scope = scope
+        # Routing updates path of mounted applications
+        self.path = scope["path"]
+        headers = {
+            header_name.decode("latin-1"): header_value.decode("latin-1")
+            for header_name, header_value in scope["headers"]
+        }
+        path = scope.get("root_path", "") + scope["path"]
+        super().__init__(
+            method=scope["method"],
+            path=path,
+            request_id=request_id(headers.get("x-request-id"), chained=True),
+            args=parse_qsl(
+                scope["query_string"].decode("latin-1"), keep_blank_values=True
+            ),
+            headers=headers.items(),
+            route=f"{scope['method']} {path}",
+            path_params=scope.get("path_params"),
+            memory_tracker=memory_tracker,
+            metrics=metrics,
         )
-        logger.critical(self.stats)
+
+    def success(self, status_code: int):
+        super().success(status_code, **self._end())
+
+    def exception_occurred(self, exception: Exception, body: bytes):
+        super().exception_occurred(exception, body, **self._end())
+
+    def _end(self) -> dict:
+        """
+        Return details only known once the request was processed.
+        """
+        if self.memory_tracker or self.metrics:
+            # Endpoint is only known once request was routed
+            self.matched = self.scope.get("endpoint") is not None
+            if self.matched:
+                template = _route_template(self.scope, self.path)
+                if template is not None:
+                    self.route = f'{self.scope["method"]} {template}'
+        if "timed_out" in self.scope:
+            return {"timed_out": self.scope["timed_out"]}
+        return {}
+
+
+def timing(phase: str) -> ContextManager:
+    """
+    Measure the time spent in a phase of the current request (such as db, render or downstream).
+    Durations are logged (and sent in Server-Timing header if requested).
+
+    with timing("db"):
+        query_database()
+
+    :param phase: Name of the phase, must be a valid HTTP token to be sent in Server-Timing header.
+    """
+    statistics = current_statistics.get()
+    if statistics is None:
+        return contextlib.nullcontext()
+    return statistics.timings.measure(phase)
+
+
+def _route_template(scope: Scope, path: str) -> Optional[str]:
+    """
+    Return the path template (such as /items/{item_id}) of the route that handled the request, if any.
+    """
+    router = scope.get("router")
+    if router is None:
+        return None
+    return _matching_template(router.routes, {**scope, "path": path})
+
+
+def _matching_template(routes: List[BaseRoute], scope: Scope) -> Optional[str]:
+    """
+    Match routes the same way the router does: first full match, or first partial match (method not allowed).
+    """
+    partial = None
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return _template(route, {**scope, **child_scope})
+        if match == Match.PARTIAL and partial is None:
+            partial = route, {**scope, **child_scope}
+    return _template(*partial) if partial else None
+
+
+def _template(route: BaseRoute, scope: Scope) -> Optional[str]:
+    routes = getattr(route, "routes", None)
+    if not routes:
+        return getattr(route, "path", None)
+    template = _matching_template(routes, scope)
+    if template is None:
+        return None
+    # Host routes have no path
+    return getattr(route, "path", "") + template
 
 
 # Original: https://github.com/encode/uvicorn/blob/master/uvicorn/middleware/proxy_headers.py
@@ -161,27 +452,315 @@ class ProxyHeadersMiddleware:
 
     async def __call__(self, scope, receive, send):
         if scope["type"] in ("http", "websocket"):
-            headers = dict(scope["headers"])
-
-            if b"x-forwarded-proto" in headers:
-                # Determine if the incoming request was http or https based on
-                # the X-Forwarded-Proto header.
-                x_forwarded_proto = headers[b"x-forwarded-proto"].decode("ascii")
-                scope["scheme"] = x_forwarded_proto.strip()
-
-            if b"x-forwarded-for" in headers:
-                # Determine the client address from the last trusted IP in the
-                # X-Forwarded-For header. We've lost the connecting client's port
-                # information by now, so only include the host.
-                x_forwarded_for = headers[b"x-forwarded-for"].decode("ascii")
-                host = x_forwarded_for.split(",")[-1].strip()
-                port = 0
-                scope["client"] = (host, port)
+            _resolve_proxy_headers(scope, dict(scope["headers"]))
 
         return await self.app(scope, receive, send)
 
 
-# TODO Check if we can use request.url_for with the Proxy middleware
+def _resolve_proxy_headers(scope: Scope, headers: dict):
+    """
+    Update scope scheme and client according to X-Forwarded-Proto and X-Forwarded-For headers.
+
+    :param headers: Raw request headers (lower cased bytes names to bytes values).
+    """
+    if b"x-forwarded-proto" in headers:
+        # Determine if the incoming request was http or https based on
+        # the X-Forwarded-Proto header.
+        x_forwarded_proto = headers[b"x-forwarded-proto"].decode("ascii")
+        scope["scheme"] = x_forwarded_proto.strip()
+
+    if b"x-forwarded-for" in headers:
+        # Determine the client address from the last trusted IP in the
+        # X-Forwarded-For header. We've lost the connecting client's port
+        # information by now, so only include the host.
+        x_forwarded_for = headers[b"x-forwarded-for"].decode("ascii")
+        host = x_forwarded_for.split(",")[-1].strip()
+        port = 0
+        scope["client"] = (host, port)
+
+
+class FusedMiddleware:
+    """
+    Provide the behaviour of the default middleware stack (LoggingMiddleware, CORSMiddleware, GZipMiddleware and
+    ProxyHeadersMiddleware) as a single ASGI middleware.
+
+    Scope is inspected once and a single send wrapper is used per request, instead of one per middleware.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        cors: bool = True,
+        compress: bool = False,
+        reverse_proxy: bool = True,
+        skip_paths: List[str] = None,
+        minimum_size: int = 500,
+        memory_tracker: MemoryTracker = None,
+        server_timing: bool = False,
+        graceful_shutdown: GracefulShutdown = None,
+        metrics: "Metrics" = None,
+    ):
+        """
+        :param cors: If CORS (Cross Resource) should be enabled (allowing all origins, methods and headers).
+        :param compress: If responses should be GZip compressed (when client accepts it).
+        :param reverse_proxy: If server should handle reverse-proxy headers.
+        :param skip_paths: Paths that should not be logged.
+        :param minimum_size: Responses smaller than this size (in bytes) will not be compressed.
+        :param memory_tracker: Measure memory allocated by each logged request.
+        :param server_timing: If Server-Timing header should be sent with logged requests timings.
+        :param graceful_shutdown: Track logged requests to drain them on shutdown.
+        :param metrics: Count logged requests (per route and status code).
+        """
+        self.app = app
+        self.compress = compress
+        self.reverse_proxy = reverse_proxy
+        self.skip_paths = frozenset(skip_paths or [])
+        self.minimum_size = minimum_size
+        self.memory_tracker = memory_tracker
+        self.server_timing = server_timing
+        self.graceful_shutdown = graceful_shutdown
+        self.metrics = metrics
+        self.cors = None
+        if cors:
+            from starlette.middleware.cors import CORSMiddleware
+
+            self.cors = CORSMiddleware(
+                app, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]
+            )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if self.reverse_proxy:
+            _resolve_proxy_headers(scope, headers)
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("root_path", "") + scope["path"]
+        statistics = in_flight = None
+        if path not in self.skip_paths:
+            # Tracked within this coroutine, so that untracked requests are not slowed down by an extra one
+            if self.graceful_shutdown is not None:
+                in_flight = self.graceful_shutdown.request_started(
+                    f"{scope['method']} {path}"
+                )
+                if in_flight is None:
+                    await _shutting_down_response()(scope, receive, send)
+                    return
+            statistics = _Statistics(scope, self.memory_tracker, self.metrics)
+        responder = _FusedResponder(self, headers, send, statistics)
+        try:
+            if (
+                responder.origin is not None
+                and scope["method"] == "OPTIONS"
+                and b"access-control-request-method" in headers
+            ):
+                response = self.cors.preflight_response(
+                    request_headers=Headers(scope=scope)
+                )
+                # Preflight response is neither compressed nor sent with simple CORS headers
+                await response(scope, receive, send)
+                responder.status_code = response.status_code
+            elif statistics is None:
+                await self.app(scope, receive, responder.send)
+            else:
+                await self.app(scope, responder.recording(receive), responder.send)
+        except Exception as e:
+            if statistics is not None:
+                statistics.exception_occurred(e, await responder.body(receive))
+            raise
+        else:
+            if statistics is not None:
+                statistics.success(responder.status_code)
+        finally:
+            if in_flight is not None:
+                self.graceful_shutdown.request_ended(in_flight)
+
+
+class _FusedResponder:
+    """
+    Per request state of FusedMiddleware: CORS headers, Server-Timing header, GZip compression and response status
+    code.
+    """
+
+    __slots__ = (
+        "middleware",
+        "statistics",
+        "original_send",
+        "origin",
+        "has_cookie",
+        "gzip",
+        "status_code",
+        "received",
+        "more_body",
+    )
+
+    def __init__(
+        self,
+        middleware: FusedMiddleware,
+        headers: dict,
+        send: Send,
+        statistics: Optional[_Statistics],
+    ):
+        self.middleware = middleware
+        self.statistics = statistics
+        self.original_send = send
+        self.origin = headers.get(b"origin") if middleware.cors is not None else None
+        self.has_cookie = b"cookie" in headers
+        self.gzip = (
+            _GZipResponder(send, middleware.minimum_size)
+            if middleware.compress and b"gzip" in headers.get(b"accept-encoding", b"")
+            else None
+        )
+        self.status_code = None
+        self.received = []
+        self.more_body = True
+
+    def recording(self, receive: Receive) -> Receive:
+        """Return a receive callable keeping the received request body (to be logged in case of failure)."""
+
+        async def receive_and_record() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                self.received.append(message.get("body", b""))
+                self.more_body = message.get("more_body", False)
+            return message
+
+        return receive_and_record
+
+    async def body(self, receive: Receive) -> bytes:
+        """Return the full request body, reading what was not received by the application yet."""
+        while self.more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            self.received.append(message.get("body", b""))
+            self.more_body = message.get("more_body", False)
+        return b"".join(self.received)
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.status_code = message["status"]
+            if self.origin is not None:
+                self._add_cors_headers(message)
+            if self.middleware.server_timing and self.statistics is not None:
+                message.setdefault("headers", []).append(
+                    (b"server-timing", self.statistics.server_timing().encode())
+                )
+            if self.gzip is not None:
+                await self.gzip.send(message)
+                return
+        elif message_type == "http.response.body" and self.gzip is not None:
+            await self.gzip.send(message)
+            return
+
+        await self.original_send(message)
+
+    def _add_cors_headers(self, message: Message):
+        headers = MutableHeaders(raw=message.setdefault("headers", []))
+        headers.update(self.middleware.cors.simple_headers)
+        # If request includes any cookie headers, then we must respond with the specific origin instead of '*'.
+        if self.has_cookie:
+            headers["Access-Control-Allow-Origin"] = self.origin.decode("latin-1")
+
+
+class GZipMiddleware:
+    """
+    GZip compress responses (when client accepts it), as starlette GZipMiddleware does, except for responses that are
+    already encoded (such as the precompressed definition sent by OpenAPIEndpoint).
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500):
+        """
+        :param minimum_size: Responses smaller than this size (in bytes) will not be compressed.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and b"gzip" in dict(scope["headers"]).get(
+            b"accept-encoding", b""
+        ):
+            send = _GZipResponder(send, self.minimum_size).send
+        await self.app(scope, receive, send)
+
+
+class _GZipResponder:
+    """
+    Per request GZip compression of the response.
+    """
+
+    __slots__ = (
+        "original_send",
+        "minimum_size",
+        "initial_message",
+        "started",
+        "gzip_buffer",
+        "gzip_file",
+    )
+
+    def __init__(self, send: Send, minimum_size: int):
+        self.original_send = send
+        self.minimum_size = minimum_size
+        self.initial_message = None
+        self.started = False
+        self.gzip_buffer = None
+        self.gzip_file = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Don't send the initial message until we've determined if compression applies.
+            self.initial_message = message
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.initial_message.setdefault("headers", []))
+            if "content-encoding" in headers or (
+                len(body) < self.minimum_size and not more_body
+            ):
+                # Don't apply GZip to already encoded or small outgoing responses.
+                await self.original_send(self.initial_message)
+                await self.original_send(message)
+                return
+
+            self.gzip_buffer = io.BytesIO()
+            self.gzip_file = gzip.GzipFile(mode="wb", fileobj=self.gzip_buffer)
+            headers["Content-Encoding"] = "gzip"
+            headers.add_vary_header("Accept-Encoding")
+            self.gzip_file.write(body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                self.gzip_file.close()
+                headers["Content-Length"] = str(self.gzip_buffer.tell())
+            message["body"] = self.gzip_buffer.getvalue()
+            self.gzip_buffer.seek(0)
+            self.gzip_buffer.truncate()
+            await self.original_send(self.initial_message)
+            await self.original_send(message)
+        elif self.gzip_file is not None:
+            # Remaining body in streaming GZip response.
+            self.gzip_file.write(body)
+            if not more_body:
+                self.gzip_file.close()
+            message["body"] = self.gzip_buffer.getvalue()
+            self.gzip_buffer.seek(0)
+            self.gzip_buffer.truncate()
+            await self.original_send(message)
+        else:
+            await self.original_send(message)
+
+
 def _base_path(request: Request) -> str:
     """
     Return service base path (handle the fact that client may be behind a reverse proxy).
@@ -193,12 +772,110 @@ def _base_path(request: Request) -> str:
 
     In case X-Original-Request-Uri is not in headers, scheme://hostname or scheme://host:port will be used.
     """
-    if "X-Original-Request-Uri" in request.headers:
-        service_path = (
-            "/" + request.headers["X-Original-Request-Uri"].split("/", maxsplit=2)[1]
+    headers = request.headers
+    scheme = request.scope.get("scheme", "http")
+    original_request_uri = headers.get("X-Original-Request-Uri")
+    if original_request_uri is not None:
+        return absolute_base_path(
+            scheme,
+            headers["Host"],
+            "/" + original_request_uri.split("/", maxsplit=2)[1],
+        )
+    return absolute_base_path(scheme, _netloc(request.scope, headers), "")
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443, "ws": 80, "wss": 443}
+
+
+def _netloc(scope: Scope, headers: Headers) -> str:
+    """
+    Return host (and port if not the default one) the request was sent to (same as request.base_url.netloc).
+    """
+    host = headers.get("host")
+    if host is not None:
+        return host
+    server = scope.get("server")
+    if server is None:
+        return ""
+    host, port = server
+    if port == _DEFAULT_PORTS.get(scope.get("scheme", "http")):
+        return host
+    return f"{host}:{port}"
+
+
+class URLBuilder:
+    """
+    Build absolute URLs to named routes (handle the fact that client may be behind a reverse proxy).
+
+    Route templates are compiled once (on first use of a route name) and base paths are cached.
+    Use it instead of request.url_for in responses linking to many resources (pagination, HAL links, ...).
+
+    urls = URLBuilder(app)
+    urls.url_for(request, "get_item", item_id=42)
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        :param app: Starlette application (or Router) containing the named routes.
+        """
+        self.app = app
+        self._templates: Dict[str, Tuple[str, Dict[str, Convertor]]] = {}
+
+    def url_for(self, request: Request, name: str, **path_params) -> str:
+        """
+        Return absolute URL of the named route.
+
+        :param request: Request being processed, used to compute the base path.
+        :param name: Name of the route (prefixed by the name of the mount, if any, separated by ":").
+        :param path_params: Value of every path parameter of the route.
+        :raises NoMatchFound: if there is no route with this name and path parameters.
+        """
+        template = self._templates.get(name)
+        if template is None:
+            # Routes might have been added since last compilation
+            self._templates = _route_templates(self.app.routes)
+            template = self._templates.get(name)
+        if template is None or path_params.keys() != template[1].keys():
+            raise NoMatchFound()
+        path_format, param_convertors = template
+        path = path_format.format(
+            **{
+                param_name: param_convertors[param_name].to_string(param_value)
+                for param_name, param_value in path_params.items()
+            }
         )
-        return f'{request.url.scheme}://{request.headers["Host"]}{service_path}'
-    return f"{request.base_url.scheme}://{request.base_url.netloc}"
+        return f"{_base_path(request)}{path}"
+
+
+def _route_templates(
+    routes: List[BaseRoute],
+    name_prefix: str = "",
+    path_prefix: str = "",
+    prefix_convertors: Dict[str, Convertor] = None,
+) -> Dict[str, Tuple[str, Dict[str, Convertor]]]:
+    """
+    Return path format and parameters convertors of every named route (including mounted ones).
+    """
+    templates = {}
+    for route in routes:
+        if isinstance(route, Route):
+            templates.setdefault(
+                f"{name_prefix}{route.name}",
+                (
+                    f"{path_prefix}{route.path_format}",
+                    {**(prefix_convertors or {}), **route.param_convertors},
+                ),
+            )
+        elif isinstance(route, Mount) and route.routes:
+            _, mount_format, mount_convertors = compile_path(route.path)
+            for name, template in _route_templates(
+                route.routes,
+                f"{name_prefix}{route.name}:" if route.name else name_prefix,
+                f"{path_prefix}{mount_format}",
+                {**(prefix_convertors or {}), **mount_convertors},
+            ).items():
+                templates.setdefault(name, template)
+    return templates
 
 
 class LocationResponse(Response):
@@ -216,3 +893,330 @@ class LocationResponse(Response):
         )
         kwargs.setdefault("media_type", "text/plain")
         Response.__init__(self, *args, **kwargs)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response serialized with orjson (if installed, standard library is used otherwise).
+    Datetimes, dates, times, UUIDs, dataclasses, enums and numpy like arrays are handled.
+    Already serialized content (bytes or memoryview) is sent as is, without being copied.
+    """
+
+    def render(self, content: Any) -> Union[bytes, memoryview]:
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, memoryview):
+            # Content-Length is computed from the number of items, provide a view of bytes (without copying)
+            return content.cast("B")
+        from layab._json import dumps
+
+        return dumps(content)
+
+
+class _RowsStreamingResponse(StreamingResponse):
+    def __init__(
+        self,
+        rows: Union[Iterable, AsyncIterable],
+        writer: "RowWriter",
+        *args,
+        **kwargs,
+    ) -> None:
+        StreamingResponse.__init__(self, _chunks(rows, writer), *args, **kwargs)
+
+
+async def _chunks(
+    rows: Union[Iterable, AsyncIterable], writer: "RowWriter"
+) -> AsyncIterator[bytes]:
+    """
+    Serialize rows in chunks. Next chunk is only serialized once the previous one was sent.
+    """
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            writer.write_row(row)
+            if writer.size >= writer.chunk_size:
+                yield writer.flush()
+        chunk = writer.flush()
+        if chunk:
+            yield chunk
+    else:
+        # Synchronous rows may block (database cursor, file), only switch to a thread once per chunk
+        rows = iter(rows)
+        while True:
+            chunk = await run_in_threadpool(writer.next_chunk, rows)
+            if not chunk:
+                return
+            yield chunk
+
+
+class NDJSONStreamingResponse(_RowsStreamingResponse):
+    """
+    Response streaming rows (from a sync or async iterable) as newline delimited JSON, using constant memory.
+    Rows are sent in chunks of at least chunk_size characters (64KiB by default).
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(
+        self,
+        rows: Union[Iterable, AsyncIterable],
+        *args,
+        chunk_size: int = 64 * 1024,
+        **kwargs,
+    ) -> None:
+        from layab._streaming import NDJSONWriter
+
+        _RowsStreamingResponse.__init__(
+            self, rows, NDJSONWriter(chunk_size), *args, **kwargs
+        )
+
+
+class CSVStreamingResponse(_RowsStreamingResponse):
+    """
+    Response streaming rows (from a sync or async iterable) as CSV, using constant memory.
+    Rows are sequences of values, or dictionaries if fieldnames are provided (a header line is then sent first).
+    Rows are sent in chunks of at least chunk_size characters (64KiB by default).
+    """
+
+    media_type = "text/csv"
+
+    def __init__(
+        self,
+        rows: Union[Iterable, AsyncIterable],
+        *args,
+        fieldnames: List[str] = None,
+        chunk_size: int = 64 * 1024,
+        **kwargs,
+    ) -> None:
+        from layab._streaming import CSVWriter
+
+        _RowsStreamingResponse.__init__(
+            self, rows, CSVWriter(chunk_size, fieldnames), *args, **kwargs
+        )
+
+
+class BatchEndpoint:
+    """
+    Endpoint executing multiple sub-requests in one HTTP call.
+
+    Sub-requests are dispatched through the whole application (including middleware) without network round trips.
+    They are independent and run concurrently. Each sub-request inherits the batch request headers (such as
+    Authorization) and is logged with the batch request id as parent request id.
+
+    app.add_route("/batch", BatchEndpoint(), methods=["POST"])
+
+    Request body is a JSON list of sub-requests:
+        [{"method": "GET", "path": "/items?page=2", "headers": {"Accept": "application/json"}, "body": {...}}]
+    Response is a 207 (Multi-Status) JSON list of responses (in the same order):
+        [{"status": 200, "headers": {"content-type": "application/json"}, "body": {...}}]
+    """
+
+    def __init__(self, *, max_concurrency: int = 10, max_requests: int = 100):
+        """
+        :param max_concurrency: Maximum number of sub-requests processed at the same time. 10 by default.
+        :param max_requests: Maximum number of sub-requests in a batch. 100 by default.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_requests = max_requests
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        from layab._batch import inherited_headers, parse_batch
+
+        request = Request(scope, receive)
+        try:
+            if scope.get("layab.sub_request"):
+                # Would get around max_requests and max_concurrency
+                raise ValueError("Batch requests cannot be nested.")
+            sub_requests = parse_batch(await request.json(), self.max_requests)
+        except ValueError as e:  # JSONDecodeError is a ValueError
+            response = PlainTextResponse(str(e), status_code=400)
+        else:
+            headers = inherited_headers(request.headers.items())
+            parent_request_id = current_request_id() or request.headers.get(
+                "x-request-id"
+            )
+            if parent_request_id:
+                headers["x-request-id"] = parent_request_id
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def process(sub_request: dict) -> dict:
+                async with semaphore:
+                    return await _sub_request(scope, headers, sub_request)
+
+            response = JSONResponse(
+                await asyncio.gather(*map(process, sub_requests)), status_code=207
+            )
+        await response(scope, receive, send)
+
+
+async def _sub_request(scope: Scope, headers: dict, sub_request: dict) -> dict:
+    from layab._batch import sub_response
+
+    sub_scope = {
+        key: scope[key]
+        for key in ("type", "http_version", "scheme", "server", "client", "root_path")
+        if key in scope
+    }
+    sub_scope.update(
+        {
+            "method": sub_request["method"],
+            "path": sub_request["path"],
+            "raw_path": sub_request["path"].encode(),
+            "query_string": sub_request["query_string"].encode(),
+            "headers": [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in {**headers, **sub_request["headers"]}.items()
+            ],
+            "layab.sub_request": True,
+        }
+    )
+    request_sent = False
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": sub_request["body"]}
+        return {"type": "http.disconnect"}
+
+    status_code = 500
+    response_headers = []
+    body = bytearray()
+
+    async def send(message: Message) -> None:
+        nonlocal status_code, response_headers
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers = [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in message.get("headers", [])
+            ]
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    try:
+        await scope["app"](sub_scope, receive, send)
+    except Exception:
+        # Keep the sent response (if any), as the server would do
+        logger.exception(f"Sub-request {sub_request['path']} failed.")
+        if not response_headers:
+            return {"status": 500, "headers": {}, "body": "Internal Server Error"}
+    return sub_response(status_code, response_headers, bytes(body))
+
+
+class HealthEndpoint:
+    """
+    Endpoint providing the health of the service (using application/health+json format).
+    Status code is 200 if service is healthy (pass or warn), 503 otherwise.
+
+    Checks are only run when cached health expired, see layab.HealthChecks.
+
+    app.add_route("/health", HealthEndpoint(health_checks), methods=["GET"])
+    """
+
+    def __init__(self, health_checks: "HealthChecks"):
+        self.health_checks = health_checks
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        health = await self.health_checks.health()
+        response = FastJSONResponse(
+            health,
+            status_code=self.health_checks.status_code(health),
+            media_type="application/health+json",
+        )
+        await response(scope, receive, send)
+
+
+class MetricsEndpoint:
+    """
+    Endpoint providing the metrics of every worker (using Prometheus text exposition format), see layab.Metrics.
+
+    app.add_route("/metrics", MetricsEndpoint(metrics), methods=["GET"])
+    """
+
+    def __init__(self, metrics: "Metrics"):
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Metrics files of every worker are read
+        exposition = await run_in_threadpool(self.metrics.exposition)
+        response = PlainTextResponse(exposition, media_type="text/plain; version=0.0.4")
+        await response(scope, receive, send)
+
+
+class OpenAPIEndpoint:
+    """
+    Endpoint providing the OpenAPI definition of the application, generated from routes docstrings
+    (see https://www.starlette.io/schemas/).
+
+    Definition is generated and serialized once, then sent compressed (gzip, or brotli if installed) with an ETag.
+
+    openapi = OpenAPIEndpoint({"openapi": "3.0.0", "info": {"title": "My API.", "version": "1.0.0"}})
+    app.add_route("/openapi.json", openapi, methods=["GET"], include_in_schema=False)
+    """
+
+    def __init__(self, base_schema: dict, *, schema_file: str = None):
+        """
+        :param base_schema: OpenAPI definition without paths. info.x-server-environment is set to the current
+        environment (see layab.get_environment) if not provided.
+        :param schema_file: Path to the OpenAPI definition written by write_schema. If the file exists, the definition
+        is served from it instead of being generated. Generated by default.
+        """
+        self.base_schema = base_schema
+        self.schema_file = schema_file
+        self._document: Optional["OpenAPIDocument"] = None
+
+    def schema(self, routes: List[BaseRoute]) -> dict:
+        """
+        Generate the OpenAPI definition.
+
+        :param routes: Documented routes (such as app.routes).
+        """
+        from starlette.schemas import SchemaGenerator
+        from layab._configuration import get_environment
+
+        info = {
+            "x-server-environment": get_environment(),
+            **self.base_schema.get("info", {}),
+        }
+        return SchemaGenerator({**self.base_schema, "info": info}).get_schema(routes)
+
+    def generate(self, routes: List[BaseRoute]):
+        """
+        Generate and serialize the OpenAPI definition (if not already done), to avoid doing it on first request.
+
+        app.add_event_handler("startup", lambda: openapi.generate(app.routes))
+
+        :param routes: Documented routes (such as app.routes).
+        """
+        if self._document is None:
+            from layab._json import dumps
+            from layab._openapi import OpenAPIDocument
+
+            if self.schema_file and os.path.isfile(self.schema_file):
+                with open(self.schema_file, "rb") as schema_file:
+                    body = schema_file.read()
+            else:
+                body = dumps(self.schema(routes))
+            self._document = OpenAPIDocument(body)
+
+    def write_schema(self, routes: List[BaseRoute], file_path: str):
+        """
+        Write the OpenAPI definition, to be provided as schema_file (at build time for instance).
+
+        :param routes: Documented routes (such as app.routes).
+        """
+        from layab._json import dumps
+
+        body = dumps(self.schema(routes))
+        with open(file_path, "wb") as schema_file:
+            schema_file.write(body)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self._document is None:
+            self.generate(scope["app"].routes)
+        headers = Headers(scope=scope)
+        status_code, body, response_headers = self._document.response(
+            headers.get("accept-encoding"), headers.get("if-none-match")
+        )
+        response = Response(body, status_code=status_code, headers=response_headers)
+        await response(scope, receive, send)
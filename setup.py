@@ -27,7 +27,6 @@ setup(
         "Natural Language :: English",
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
@@ -44,15 +43,31 @@ setup(
             # Used to manage testing of a Starlette application
             "starlette==0.13.*",
             "requests==2.*",
+            # Used to test layab.bench over a socket
+            "uvicorn==0.*",
             # Used to manage testing of a Flask-RestX api
             "flask-restx==0.2.*",
             "flask-cors==3.*",
             "flask-compress==1.*",
+            # Used to test JSON serialization
+            "orjson==3.*",
             # Used to check coverage
             "pytest-cov==2.*",
-        ]
+        ],
+        "orjson": [
+            # Used to serialize JSON responses faster
+            "orjson==3.*",
+        ],
+        "client": [
+            # Used to call other services
+            "requests==2.*",
+        ],
+        "brotli": [
+            # Used to provide brotli compressed OpenAPI definitions
+            "brotli==1.*",
+        ],
     },
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     project_urls={
         "GitHub": "https://github.com/Colin-b/layab",
         "Changelog": "https://github.com/Colin-b/layab/blob/master/CHANGELOG.md",
@@ -0,0 +1,26 @@
+from layab._batch import inherited_headers, parse_batch
+
+
+def test_inherited_headers():
+    assert (
+        inherited_headers(
+            [
+                ("Authorization", "Bearer token"),
+                ("Accept-Encoding", "gzip, br"),
+                ("Content-Type", "application/json"),
+                ("Content-Length", "42"),
+                ("Transfer-Encoding", "chunked"),
+                ("Connection", "keep-alive, X-Hop"),
+                ("X-Hop", "value"),
+            ]
+        )
+        == {"authorization": "Bearer token", "accept-encoding": "identity"}
+    )
+
+
+def test_sub_request_hop_by_hop_headers_are_not_forwarded():
+    (sub_request,) = parse_batch(
+        [{"path": "/items", "headers": {"Accept-Encoding": "gzip", "X-Custom": "1"}}],
+        max_requests=1,
+    )
+    assert sub_request["headers"] == {"x-custom": "1"}
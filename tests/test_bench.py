@@ -0,0 +1,120 @@
+import flask
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+
+import layab.bench
+import layab.starlette
+
+
+starlette_app = Starlette(middleware=layab.starlette.middleware())
+
+
+@starlette_app.route("/ok", methods=["GET", "POST"])
+async def ok(request):
+    return PlainTextResponse(str(len(await request.body())))
+
+
+@starlette_app.route("/failure")
+async def failure(request):
+    raise Exception("Error message")
+
+
+flask_app = flask.Flask(__name__)
+
+
+@flask_app.route("/ok", methods=["GET", "POST"])
+def flask_ok():
+    return str(len(flask.request.get_data()))
+
+
+@flask_app.route("/failure")
+def flask_failure():
+    raise Exception("Error message")
+
+
+def test_parse_request_without_weight():
+    request = layab.bench.BenchRequest.parse("get /ok?a=b:c")
+    assert request.weight == 1
+    assert request.method == "GET"
+    assert request.path == "/ok"
+    assert request.query_string == "a=b:c"
+    assert str(request) == "GET /ok?a=b:c"
+
+
+def test_parse_request_with_weight():
+    request = layab.bench.BenchRequest.parse("3:POST /ok", body=b"abc")
+    assert request.weight == 3
+    assert request.method == "POST"
+    assert request.headers == {"Content-Length": "3"}
+
+
+def test_is_asgi():
+    assert layab.bench.is_asgi(starlette_app)
+    assert not layab.bench.is_asgi(flask_app)
+
+
+def _requests():
+    return [
+        layab.bench.BenchRequest.parse("3:GET /ok"),
+        layab.bench.BenchRequest("POST", "/ok", body=b"abc"),
+        layab.bench.BenchRequest("GET", "/missing"),
+        layab.bench.BenchRequest("GET", "/failure"),
+    ]
+
+
+def test_starlette_in_process():
+    report = layab.bench.run(starlette_app, _requests(), total=60, concurrency=4)
+    assert len(report.latencies) == 60
+    assert set(report.status_codes()) == {200, 404, 500}
+    assert report.errors == report.status_codes()[500]
+    assert report.throughput > 0
+    assert 0 < report.percentile(50) <= report.percentile(99)
+
+
+def test_starlette_over_socket():
+    report = layab.bench.run(
+        starlette_app, _requests(), total=60, concurrency=4, over_socket=True
+    )
+    assert len(report.latencies) == 60
+    assert set(report.status_codes()) == {200, 404, 500}
+    assert report.errors == report.status_codes()[500]
+
+
+def test_flask_in_process():
+    report = layab.bench.run(flask_app, _requests(), total=60, concurrency=4)
+    assert len(report.latencies) == 60
+    assert set(report.status_codes()) == {200, 404, 500}
+
+
+def test_flask_over_socket():
+    report = layab.bench.run(
+        flask_app, _requests(), total=60, concurrency=4, over_socket=True
+    )
+    assert len(report.latencies) == 60
+    assert set(report.status_codes()) == {200, 404, 500}
+
+
+def test_command_line(capsys):
+    report = layab.bench.main(
+        [
+            "tests.test_bench:flask_app",
+            "--request",
+            "GET /ok",
+            "--header",
+            "X-Request-Id: bench",
+            "--total-requests",
+            "10",
+            "--concurrency",
+            "2",
+        ]
+    )
+    assert report.status_codes() == {200: 10}
+    output = capsys.readouterr().out
+    assert "requests: 10 in" in output
+    assert "status codes: 200=10" in output
+
+
+def test_empty_report():
+    report = layab.bench.Report([], 0)
+    assert report.throughput == 0
+    assert report.percentile(50) == 0
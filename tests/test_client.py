@@ -0,0 +1,261 @@
+import collections
+import http.server
+import json
+import logging
+import socket
+import threading
+
+import flask
+import flask_restx
+import pytest
+import requests
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.testclient import TestClient
+
+import layab.client
+import layab.flask_restx
+import layab.starlette
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    # Number of received requests per path
+    received = collections.Counter()
+
+    def do_GET(self):
+        self.received[self.path] += 1
+        status = 500 if self.path == "/failure" else 200
+        # /unavailable/{n} fails the first n times
+        if self.path.startswith("/unavailable/"):
+            failures = int(self.path.rsplit("/", 1)[1])
+            if self.received[self.path] <= failures:
+                status = 503
+        body = json.dumps(
+            {"path": self.path, "request_id": self.headers.get("X-Request-Id")}
+        ).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stand_in():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def unused_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_request_outside_of_a_request(stand_in):
+    with layab.client.Client(stand_in) as client:
+        response = client.get("/items?name=first")
+    assert response.json() == {"path": "/items?name=first", "request_id": None}
+
+
+def test_absolute_url_and_provided_request_id(stand_in):
+    with layab.client.Client("http://unused") as client:
+        response = client.get(f"{stand_in}/items", headers={"X-Request-Id": "provided"})
+    assert response.json() == {"path": "/items", "request_id": "provided"}
+
+
+def test_starlette_request_id_and_downstream_calls(stand_in, caplog):
+    caplog.set_level(logging.INFO)
+    client = layab.client.AsyncClient(layab.client.Client(stand_in))
+    app = Starlette(middleware=layab.starlette.middleware())
+
+    @app.route("/calls")
+    async def calls(request):
+        first = await client.get("/first")
+        await client.get("/failure")
+        return PlainTextResponse(first.json()["request_id"])
+
+    response = TestClient(app).get("/calls")
+    client.close()
+    end = caplog.records[-1].msg
+    assert response.text == end["request_id"]
+    assert end["request_downstream.calls"] == 2
+    assert end["request_downstream.failures"] == 1
+    assert end["request_downstream.time"] > 0
+
+
+def test_flask_request_id_and_downstream_calls(stand_in, caplog):
+    caplog.set_level(logging.INFO)
+    client = layab.client.Client(stand_in)
+    app = flask.Flask(__name__)
+    layab.flask_restx.log_requests()
+    api = flask_restx.Api(app)
+
+    @api.route("/calls")
+    class Calls(flask_restx.Resource):
+        def get(self):
+            return client.get("/first").json()
+
+    try:
+        with app.test_client() as test_client:
+            response = test_client.get("/calls", headers={"X-Request-Id": "1-2-3"})
+    finally:
+        flask_restx.Resource.method_decorators.clear()
+    assert response.json == {"path": "/first", "request_id": "1-2-3"}
+    downstream = caplog.records[-1].msg["request"]["downstream"]
+    assert downstream["calls"] == 1
+    assert downstream["failures"] == 0
+
+
+def test_connection_failure_is_reported(unused_url, caplog):
+    caplog.set_level(logging.INFO)
+    client = layab.client.Client(unused_url, timeout=1)
+    app = Starlette(middleware=layab.starlette.middleware())
+
+    @app.route("/calls")
+    def calls(request):
+        with pytest.raises(requests.ConnectionError):
+            client.get("/unreachable")
+        return PlainTextResponse("")
+
+    TestClient(app).get("/calls")
+    end = caplog.records[-1].msg
+    assert end["request_downstream.calls"] == 1
+    assert end["request_downstream.failures"] == 1
+
+
+def test_calls_are_logged(stand_in, caplog):
+    caplog.set_level(logging.DEBUG, logger="layab.client")
+    layab.client.Client(stand_in).get("/first")
+    call = caplog.records[-1].msg
+    assert call["downstream_method"] == "GET"
+    assert call["downstream_url"] == f"{stand_in}/first"
+    assert call["downstream_status_code"] == 200
+    assert call["downstream_processing_time"] > 0
+
+
+def test_idempotent_request_is_retried(stand_in, caplog):
+    caplog.set_level(logging.INFO)
+    client = layab.client.Client(stand_in, retries=3, retry_backoff=0)
+    app = Starlette(middleware=layab.starlette.middleware())
+
+    @app.route("/calls")
+    async def calls(request):
+        return PlainTextResponse(str(client.get("/unavailable/2").status_code))
+
+    response = TestClient(app).get("/calls")
+    client.close()
+    assert response.text == "200"
+    end = caplog.records[-1].msg
+    assert end["request_downstream.calls"] == 1
+    assert end["request_downstream.retries"] == 2
+    assert end["request_downstream.failures"] == 0
+
+
+def test_retries_are_limited(stand_in):
+    with layab.client.Client(stand_in, retries=1, retry_backoff=0) as client:
+        assert client.get("/unavailable/6").status_code == 503
+    assert StandInHandler.received["/unavailable/6"] == 2
+
+
+def test_non_idempotent_request_is_not_retried(stand_in):
+    with layab.client.Client(stand_in, retries=3, retry_backoff=0) as client:
+        assert client.post("/unavailable/5").status_code == 503
+    assert StandInHandler.received["/unavailable/5"] == 1
+
+
+def test_retry_budget_limits_retries(stand_in):
+    budget = layab.client.RetryBudget(ratio=0, min_retries_per_second=0.2, ttl=10)
+    with layab.client.Client(
+        stand_in, retries=3, retry_backoff=0, retry_budget=budget
+    ) as client:
+        assert client.get("/unavailable/10").status_code == 503
+        assert client.get("/unavailable/10").status_code == 503
+    # First request was retried twice (budget of 0.2 * 10 retries), second one never
+    assert StandInHandler.received["/unavailable/10"] == 4
+
+
+def test_retry_budget_grows_with_requests():
+    budget = layab.client.RetryBudget(ratio=0.5, min_retries_per_second=0, ttl=10)
+    assert not budget.try_retry()
+    budget.request()
+    budget.request()
+    assert budget.try_retry()
+    assert not budget.try_retry()
+
+
+def test_circuit_opens_and_rejects_requests(stand_in, caplog):
+    caplog.set_level(logging.INFO)
+    breaker = layab.client.CircuitBreaker(minimum_calls=2, window=2, open_duration=60)
+    client = layab.client.Client(stand_in, circuit_breaker=breaker)
+    app = Starlette(middleware=layab.starlette.middleware())
+
+    @app.route("/calls")
+    async def calls(request):
+        client.get("/failure")
+        client.get("/failure")
+        try:
+            client.get("/failure")
+        except layab.client.CircuitOpenError as e:
+            return PlainTextResponse(e.host)
+
+    response = TestClient(app).get("/calls")
+    client.close()
+    host = stand_in.split("//")[1]
+    assert response.text == host
+    assert breaker.state(host) == "open"
+    assert breaker.state("other") == "closed"
+    end = caplog.records[-1].msg
+    assert end["request_downstream.calls"] == 3
+    assert end["request_downstream.failures"] == 3
+    assert end["request_downstream.rejected"] == 1
+    assert {"circuit_host": host, "circuit_state": "open"} in [
+        record.msg for record in caplog.records
+    ]
+
+
+def test_circuit_opens_on_slow_calls():
+    breaker = layab.client.CircuitBreaker(
+        minimum_calls=2, window=2, slow_call_duration=1, slow_call_rate_threshold=0.5
+    )
+    breaker.record("host", 0.1, failed=False)
+    assert breaker.state("host") == "closed"
+    breaker.record("host", 2, failed=False)
+    assert breaker.state("host") == "open"
+    assert not breaker.allow("host")
+
+
+def test_half_open_circuit_is_closed_once_probes_succeed():
+    breaker = layab.client.CircuitBreaker(
+        minimum_calls=1, window=1, open_duration=0, half_open_calls=2
+    )
+    breaker.record("host", 0.1, failed=True)
+    assert breaker.state("host") == "half_open"
+    assert breaker.allow("host")
+    assert breaker.allow("host")
+    # Only half_open_calls probes are sent
+    assert not breaker.allow("host")
+    breaker.record("host", 0.1, failed=False)
+    breaker.record("host", 0.1, failed=False)
+    assert breaker.state("host") == "closed"
+
+
+def test_half_open_circuit_is_opened_again_on_failure():
+    breaker = layab.client.CircuitBreaker(minimum_calls=1, window=1, open_duration=0)
+    breaker.record("host", 0.1, failed=True)
+    assert breaker.allow("host")
+    breaker.open_duration = 60
+    breaker.record("host", 0.1, failed=True)
+    assert breaker.state("host") == "open"
+    assert not breaker.allow("host")
@@ -1,4 +1,9 @@
+import gzip
+import json
+
 import flask
+
+import layab._json
 from layab.flask_restx import Api
 
 
@@ -32,3 +37,66 @@ def test_api():
         "swagger": "2.0",
         "tags": [],
     }
+
+
+def _api_app(**kwargs) -> flask.Flask:
+    app = flask.Flask(__name__)
+    Api(app, title="My API.", version="1.0.0", **kwargs)
+    return app
+
+
+def test_schema_is_sent_with_etag():
+    with _api_app().test_client() as client:
+        response = client.get("/swagger.json")
+        assert response.status_code == 200
+        assert response.content_type == "application/json"
+        assert response.headers["Cache-Control"] == "no-cache"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        etag = response.headers["ETag"]
+        assert etag.startswith('"')
+        assert response.json["info"]["title"] == "My API."
+
+        response = client.get("/swagger.json", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.data == b""
+        assert response.headers["ETag"] == etag
+
+        response = client.get("/swagger.json", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+
+
+def test_compressed_schema():
+    with _api_app().test_client() as client:
+        identity = client.get("/swagger.json")
+        response = client.get("/swagger.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] != identity.headers["ETag"]
+    assert gzip.decompress(response.data) == identity.data
+
+
+def test_schema_is_serialized_once(monkeypatch):
+    app = _api_app()
+    with app.test_client() as client:
+        first = client.get("/swagger.json").data
+
+        def fail(content):
+            raise AssertionError("Schema should not be serialized again")
+
+        monkeypatch.setattr(layab._json, "dumps", fail)
+        assert client.get("/swagger.json").data == first
+
+
+def test_schema_written_at_build_time(tmp_path):
+    schema_file = str(tmp_path / "swagger.json")
+    app = flask.Flask(__name__)
+    api = Api(app, title="My API.", version="1.0.0", schema_file=schema_file)
+    with app.test_request_context():
+        api.write_schema(schema_file)
+    with open(schema_file) as written:
+        assert json.load(written)["info"]["title"] == "My API."
+
+    with open(schema_file, "w") as written:
+        json.dump({"swagger": "2.0", "info": {"title": "From file."}}, written)
+    with _api_app(schema_file=schema_file).test_client() as client:
+        response = client.get("/swagger.json")
+    assert response.json == {"swagger": "2.0", "info": {"title": "From file."}}
@@ -0,0 +1,147 @@
+import gzip
+import json
+import logging
+
+import flask
+import flask_restx
+import pytest
+
+import layab.flask_restx
+
+
+@pytest.fixture
+def client():
+    app = flask.Flask(__name__)
+    layab.flask_restx.log_requests()
+    api = flask_restx.Api(app)
+
+    class Batch(layab.flask_restx.BatchResource):
+        max_requests = 3
+
+    api.add_resource(Batch, "/batch")
+
+    @api.route("/items/<int:item_id>")
+    class Item(flask_restx.Resource):
+        def get(self, item_id):
+            return {
+                "id": item_id,
+                "args": flask.request.args.to_dict(),
+                "authorization": flask.request.headers.get("Authorization"),
+            }
+
+        def put(self, item_id):
+            return {"id": item_id, "body": flask.request.json}, 201
+
+    @api.route("/failure")
+    class Failure(flask_restx.Resource):
+        def get(self):
+            raise Exception("Error message")
+
+    @app.route("/text")
+    def text():
+        return "text"
+
+    try:
+        with app.test_client() as client:
+            yield client
+    finally:
+        flask_restx.Resource.method_decorators.clear()
+
+
+def test_batch(client):
+    response = client.post(
+        "/batch",
+        json=[
+            {"path": "/items/1?page=2"},
+            {"method": "PUT", "path": "/items/2", "body": {"name": "test"}},
+            {"path": "/text"},
+        ],
+        headers={"Authorization": "Bearer token"},
+    )
+    assert response.status_code == 207
+    first, second, third = response.json
+    assert first["status"] == 200
+    assert first["headers"]["content-type"] == "application/json"
+    assert first["body"] == {
+        "id": 1,
+        "args": {"page": "2"},
+        "authorization": "Bearer token",
+    }
+    assert second["status"] == 201
+    assert second["body"] == {"id": 2, "body": {"name": "test"}}
+    assert third["body"] == "text"
+
+
+def test_batch_failure_and_unknown_path(client):
+    response = client.post("/batch", json=[{"path": "/failure"}, {"path": "/unknown"}])
+    assert response.status_code == 207
+    assert [sub_response["status"] for sub_response in response.json] == [500, 404]
+
+
+def test_sub_requests_are_logged_with_parent_request_id(client, caplog):
+    caplog.set_level(logging.INFO)
+    client.post(
+        "/batch", json=[{"path": "/items/1"}], headers={"X-Request-Id": "original"}
+    )
+    request_ids = [
+        eval(message)["request"]["id"]
+        for message in caplog.messages
+        if message.startswith("{")
+    ]
+    assert request_ids == ["original"] * 4
+
+
+def test_invalid_batch(client):
+    response = client.post("/batch", json=[{"path": "/text"}] * 4)
+    assert response.status_code == 400
+    assert response.json["message"] == "Batch cannot contain more than 3 sub-requests."
+
+
+def test_empty_batch(client):
+    response = client.post("/batch", json=[])
+    assert response.status_code == 207
+    assert response.json == []
+
+
+def test_sub_responses_are_not_compressed():
+    app = flask.Flask(__name__)
+    layab.flask_restx.enrich_flask(
+        app, compress_mimetypes=["application/json"], reverse_proxy=False
+    )
+    api = flask_restx.Api(app)
+    api.add_resource(layab.flask_restx.BatchResource, "/batch")
+
+    @api.route("/items")
+    class Items(flask_restx.Resource):
+        def get(self):
+            return [{"id": item_id} for item_id in range(200)]
+
+    with app.test_client() as client:
+        response = client.post(
+            "/batch",
+            json=[{"path": "/items", "headers": {"Accept-Encoding": "gzip"}}],
+            headers={"Accept-Encoding": "gzip, deflate, br"},
+        )
+    assert response.status_code == 207
+    assert response.headers["Content-Encoding"] == "gzip"
+    (sub_response,) = json.loads(gzip.decompress(response.data))
+    assert sub_response["status"] == 200
+    assert "content-encoding" not in sub_response["headers"]
+    assert sub_response["body"] == [{"id": item_id} for item_id in range(200)]
+
+
+def test_invalid_sub_request_header(client):
+    response = client.post(
+        "/batch", json=[{"path": "/text", "headers": {"X-Euro": "\u20ac"}}]
+    )
+    assert response.status_code == 400
+    assert response.json["message"] == "Sub-request 0 header 'x-euro' is not valid."
+
+
+def test_batch_cannot_be_nested(client):
+    response = client.post(
+        "/batch", json=[{"method": "POST", "path": "/batch", "body": []}]
+    )
+    assert response.status_code == 207
+    assert response.json[0]["status"] == 400
+    assert response.json[0]["body"]["message"] == "Batch requests cannot be nested."
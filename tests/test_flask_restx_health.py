@@ -0,0 +1,41 @@
+import flask
+import flask_restx
+
+import layab.flask_restx
+
+
+def test_health_resource():
+    health_checks = layab.HealthChecks()
+    health_checks.add("database", lambda: "pass")
+    health_checks.add("cache", lambda: "warn")
+    app = flask.Flask(__name__)
+    api = flask_restx.Api(app)
+    api.add_resource(
+        layab.flask_restx.HealthResource,
+        "/health",
+        resource_class_kwargs={"health_checks": health_checks},
+    )
+
+    with app.test_client() as client:
+        response = client.get("/health")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/health+json"
+    assert response.json["status"] == "warn"
+    assert response.json["checks"]["database"][0]["status"] == "pass"
+
+
+def test_unhealthy_resource():
+    health_checks = layab.HealthChecks()
+    health_checks.add("database", lambda: "fail")
+    app = flask.Flask(__name__)
+    api = flask_restx.Api(app)
+    api.add_resource(
+        layab.flask_restx.HealthResource,
+        "/health",
+        resource_class_kwargs={"health_checks": health_checks},
+    )
+
+    with app.test_client() as client:
+        response = client.get("/health")
+    assert response.status_code == 503
+    assert response.json["status"] == "fail"
@@ -4,6 +4,8 @@ import flask
 import flask_restx
 import pytest
 
+import layab
+import layab._statistics
 import layab.flask_restx
 
 
@@ -68,7 +70,7 @@ def mock_uuid(monkeypatch):
         def uuid4():
             return "1-2-3-4-5"
 
-    monkeypatch.setattr(layab.flask_restx, "uuid", UUIDMock)
+    monkeypatch.setattr(layab._statistics, "uuid", UUIDMock)
 
 
 def test_log_get_request_details(client, caplog, mock_uuid):
@@ -114,6 +116,31 @@ def test_log_get_request_details(client, caplog, mock_uuid):
     }
 
 
+def test_logged_records_are_not_modified(client, caplog, mock_uuid):
+    caplog.set_level(logging.INFO)
+    client.get("/logging?param1=1")
+    start, end = caplog.records[0].msg, caplog.records[1].msg
+    assert start["request"]["status"] == "start"
+    assert list(start["request"]) == [
+        "url.path",
+        "method",
+        "id",
+        "args",
+        "headers",
+        "status",
+    ]
+    assert list(end["request"]) == [
+        "url.path",
+        "method",
+        "id",
+        "args",
+        "headers",
+        "status",
+        "processing_time",
+        "status_code",
+    ]
+
+
 def test_log_delete_request_details(client, caplog, mock_uuid):
     caplog.set_level(logging.INFO)
     response = client.delete("/logging")
@@ -419,3 +446,126 @@ def test_skip_log_put_request(client, caplog):
     assert response.status_code == 200
     assert response.data == b""
     assert len(caplog.messages) == 0
+
+
+def test_log_memory(caplog):
+    app = flask.Flask(__name__)
+    layab.flask_restx.log_requests(memory_tracker=layab.MemoryTracker("rss"))
+    api = flask_restx.Api(app)
+
+    @api.route("/logging")
+    class Logging(flask_restx.Resource):
+        def get(self):
+            return flask.Response(b"")
+
+    caplog.set_level(logging.INFO)
+    try:
+        with app.test_client() as client:
+            response = client.get("/logging")
+    finally:
+        flask_restx.Resource.method_decorators.clear()
+    assert response.status_code == 200
+    end_message = eval(caplog.messages[1])
+    assert isinstance(end_message["request"]["allocated_memory"], int)
+    assert end_message["request"]["peak_memory"] >= 0
+
+
+def test_log_timing(caplog):
+    app = flask.Flask(__name__)
+    layab.flask_restx.log_requests(server_timing=True)
+    api = flask_restx.Api(app)
+
+    @api.route("/logging")
+    class Logging(flask_restx.Resource):
+        def get(self):
+            with layab.flask_restx.timing("db"):
+                pass
+            return flask.Response(b"")
+
+    caplog.set_level(logging.INFO)
+    try:
+        with app.test_client() as client:
+            response = client.get("/logging")
+    finally:
+        flask_restx.Resource.method_decorators.clear()
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert ", total;dur=" in response.headers["Server-Timing"]
+    end_message = eval(caplog.messages[1])
+    assert end_message["request"]["timing"]["db"] >= 0
+    assert "timing" not in eval(caplog.messages[0])["request"]
+
+
+def test_timing_outside_of_request():
+    with layab.flask_restx.timing("db"):
+        pass
+
+
+def test_request_context_in_application_logs(caplog, mock_uuid):
+    app = flask.Flask(__name__)
+    layab.flask_restx.log_requests()
+    api = flask_restx.Api(app)
+
+    @api.route("/logging/<int:item>")
+    class Logging(flask_restx.Resource):
+        def get(self, item):
+            logging.getLogger("application").info(layab.current_request_id())
+            return flask.Response(b"")
+
+    caplog.set_level(logging.INFO)
+    caplog.handler.addFilter(layab.RequestContextFilter())
+    try:
+        with app.test_client() as client:
+            response = client.get("/logging/1")
+    finally:
+        flask_restx.Resource.method_decorators.clear()
+    assert response.status_code == 200
+    assert [record.request_id for record in caplog.records] == ["1-2-3-4-5"] * 3
+    assert [record.request_route for record in caplog.records] == [
+        "GET /logging/<int:item>"
+    ] * 3
+    assert caplog.messages[1] == "1-2-3-4-5"
+    assert layab.current_request_id() is None
+
+
+def test_graceful_shutdown():
+    graceful_shutdown = layab.GracefulShutdown(refuse_after=0)
+    app = flask.Flask(__name__)
+    layab.flask_restx.log_requests(graceful_shutdown=graceful_shutdown)
+    api = flask_restx.Api(app)
+
+    @api.route("/logging")
+    class Logging(flask_restx.Resource):
+        def get(self):
+            assert graceful_shutdown.in_flight == 1
+            return flask.Response(b"")
+
+    try:
+        with app.test_client() as client:
+            assert client.get("/logging").status_code == 200
+            assert graceful_shutdown.in_flight == 0
+            graceful_shutdown.start()
+            response = client.get("/logging")
+    finally:
+        flask_restx.Resource.method_decorators.clear()
+    assert response.status_code == 503
+    assert response.data == b"Service is shutting down."
+
+
+def test_log_status_code_returned_by_resource(caplog):
+    caplog.set_level(logging.INFO)
+    app = flask.Flask(__name__)
+    layab.flask_restx.log_requests()
+    api = flask_restx.Api(app)
+
+    @api.route("/created")
+    class Created(flask_restx.Resource):
+        def post(self):
+            return {"created": True}, 201
+
+    try:
+        with app.test_client() as client:
+            assert client.post("/created").status_code == 201
+    finally:
+        flask_restx.Resource.method_decorators.clear()
+    assert caplog.records[1].msg["request"]["status_code"] == 201
@@ -0,0 +1,184 @@
+import logging
+import time
+
+import flask
+import flask_restx
+import pytest
+
+import layab
+import layab.flask_restx
+
+
+def _app(**kwargs) -> flask.Flask:
+    app = flask.Flask(__name__)
+    app.wsgi_app = layab.flask_restx.LoggingMiddleware(app.wsgi_app, **kwargs)
+
+    @app.route("/plain")
+    def plain():
+        with layab.flask_restx.timing("db"):
+            pass
+        return "plain"
+
+    @app.route("/streamed")
+    def streamed():
+        def generate():
+            yield "first"
+            time.sleep(0.1)
+            yield "second"
+
+        return flask.Response(generate())
+
+    @app.route("/failing_stream")
+    def failing_stream():
+        def generate():
+            yield "first"
+            raise Exception("Error message")
+
+        return flask.Response(generate())
+
+    return app
+
+
+def test_plain_route_is_logged(caplog):
+    caplog.set_level(logging.INFO)
+    # Buffered, so that the response is closed (as WSGI servers do)
+    with _app().test_client() as client:
+        response = client.get(
+            "/plain?param1=1&param1=2",
+            headers={"X-Request-Id": "1-2-3-4-5"},
+            buffered=True,
+        )
+    assert response.data == b"plain"
+    assert len(caplog.records) == 2
+    assert caplog.records[0].msg == {
+        "request": {
+            "url.path": "/plain",
+            "method": "GET",
+            "id": "1-2-3-4-5",
+            "args": {"param1": ["1", "2"]},
+            "headers": {
+                "Host": "localhost",
+                "User-Agent": "werkzeug/1.0.1",
+                "X-Request-Id": "1-2-3-4-5",
+            },
+            "status": "start",
+        }
+    }
+    end = caplog.records[1].msg["request"]
+    assert end.pop("processing_time") > 0
+    assert end.pop("timing")["db"] >= 0
+    assert end == {
+        "url.path": "/plain",
+        "method": "GET",
+        "id": "1-2-3-4-5",
+        "args": {"param1": ["1", "2"]},
+        "headers": {
+            "Host": "localhost",
+            "User-Agent": "werkzeug/1.0.1",
+            "X-Request-Id": "1-2-3-4-5",
+        },
+        "status": "end",
+        "status_code": 200,
+        "response_bytes": 5,
+    }
+
+
+def test_unknown_route_is_logged_with_actual_status(caplog):
+    caplog.set_level(logging.INFO)
+    with _app().test_client() as client:
+        response = client.get("/unknown", buffered=True)
+    assert response.status_code == 404
+    end = caplog.records[1].msg["request"]
+    assert end["status"] == "end"
+    assert end["status_code"] == 404
+    assert end["response_bytes"] == len(response.data)
+
+
+def test_streamed_body_is_measured(caplog):
+    caplog.set_level(logging.INFO)
+    with _app().test_client() as client:
+        response = client.get("/streamed", buffered=False)
+        chunks = iter(response.response)
+        assert next(chunks) == b"first"
+        # Request is not logged before the response is sent
+        assert len(caplog.records) == 1
+        assert list(chunks) == [b"second"]
+        response.close()
+    assert len(caplog.records) == 2
+    end = caplog.records[1].msg["request"]
+    assert end["processing_time"] >= 0.1
+    assert end["response_bytes"] == 11
+
+
+def test_failure_while_streaming_is_logged(caplog):
+    caplog.set_level(logging.INFO)
+    with _app().test_client() as client:
+        with pytest.raises(Exception, match="Error message"):
+            client.get("/failing_stream", buffered=True)
+    assert len(caplog.records) == 2
+    error = caplog.records[1].msg
+    assert error["request"]["status"] == "error"
+    assert error["error"]["class"] == "Exception"
+    assert error["error"]["msg"] == "Error message"
+
+
+def test_skipped_path(caplog):
+    caplog.set_level(logging.INFO)
+    with _app(skip_paths=["/plain"]).test_client() as client:
+        assert client.get("/plain", buffered=True).data == b"plain"
+    assert not caplog.records
+
+
+def test_server_timing():
+    with _app(server_timing=True).test_client() as client:
+        response = client.get("/plain", buffered=True)
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+
+def test_graceful_shutdown(caplog):
+    graceful_shutdown = layab.GracefulShutdown(refuse_after=0)
+    with _app(graceful_shutdown=graceful_shutdown).test_client() as client:
+        assert client.get("/plain", buffered=True).status_code == 200
+        assert graceful_shutdown.in_flight == 0
+        graceful_shutdown.start()
+        response = client.get("/plain", buffered=True)
+    assert response.status_code == 503
+    assert response.headers["Connection"] == "close"
+
+
+def test_enrich_flask_request_logging(caplog):
+    caplog.set_level(logging.INFO)
+    app = flask.Flask(__name__)
+    layab.flask_restx.enrich_flask(app, request_logging=True)
+    api = flask_restx.Api(app)
+
+    @api.route("/resource")
+    class Resource(flask_restx.Resource):
+        def post(self):
+            return {"created": True}, 201
+
+    with app.test_client() as client:
+        response = client.post("/resource", buffered=True)
+    assert response.status_code == 201
+    assert caplog.records[-1].msg["request"]["status_code"] == 201
+
+
+def test_enrich_flask_exposes_logged_request(caplog):
+    caplog.set_level(logging.INFO)
+    app = flask.Flask(__name__)
+    layab.flask_restx.enrich_flask(app, request_logging=True)
+    api = flask_restx.Api(app)
+
+    @api.route("/resource")
+    class Resource(flask_restx.Resource):
+        def get(self):
+            with flask.g.timings.measure("db"):
+                pass
+            return {"request_id": flask.g.request_id}
+
+    with app.test_client() as client:
+        response = client.get(
+            "/resource", headers={"X-Request-Id": "test"}, buffered=True
+        )
+    assert response.json == {"request_id": "test"}
+    assert caplog.records[-1].msg["request"]["timing"]["db"] >= 0
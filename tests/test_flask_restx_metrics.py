@@ -0,0 +1,59 @@
+import flask
+import flask_restx
+
+import layab.flask_restx
+
+
+def _app(metrics: layab.Metrics) -> flask.Flask:
+    app = flask.Flask(__name__)
+    app.wsgi_app = layab.flask_restx.LoggingMiddleware(app.wsgi_app, metrics=metrics)
+    api = flask_restx.Api(app)
+
+    @api.route("/items/<int:item_id>")
+    class Item(flask_restx.Resource):
+        def get(self, item_id):
+            return {"item_id": item_id}
+
+    api.add_resource(
+        layab.flask_restx.MetricsResource,
+        "/metrics",
+        resource_class_kwargs={"metrics": metrics},
+    )
+    return app
+
+
+def test_requests_are_counted_per_path(tmp_path):
+    metrics = layab.Metrics(str(tmp_path))
+    with _app(metrics).test_client() as client:
+        client.get("/items/1", buffered=True)
+        client.get("/items/2", buffered=True)
+        client.get("/unknown", buffered=True)
+
+    collected = metrics.collect()
+    assert collected[("GET /items/<int:item_id>", 200)]["count"] == 2
+    assert collected[("GET <unmatched>", 404)]["count"] == 1
+
+
+def test_unmatched_requests_cannot_exhaust_series(tmp_path):
+    metrics = layab.Metrics(str(tmp_path), max_series=2)
+    with _app(metrics).test_client() as client:
+        for index in range(6):
+            client.get(f"/scan{index}", buffered=True)
+        client.get("/items/1", buffered=True)
+
+    assert metrics.collect()[("GET <unmatched>", 404)]["count"] == 6
+    assert metrics.collect()[("GET /items/<int:item_id>", 200)]["count"] == 1
+
+
+def test_metrics_resource(tmp_path):
+    metrics = layab.Metrics(str(tmp_path))
+    with _app(metrics).test_client() as client:
+        client.get("/items/1", buffered=True)
+        response = client.get("/metrics", buffered=True)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_request_duration_seconds_count{route="GET /items/<int:item_id>",status_code="200"} 1'
+        in response.get_data(as_text=True).splitlines()
+    )
@@ -1,3 +1,6 @@
+import array
+import datetime
+
 import flask
 import pytest
 
@@ -37,3 +40,88 @@ def test_standard_post_response_with_reverse_proxy(client):
         response.headers["location"]
         == "http://localhost/reverse/standard_responses?id=42"
     )
+
+
+@pytest.fixture
+def url_client():
+    app = flask.Flask(__name__)
+
+    @app.route("/items/<int:item_id>")
+    def get_item(item_id):
+        return ""
+
+    @app.route("/links")
+    def links():
+        return flask.jsonify(
+            {
+                "item": layab.flask_restx.url_for("get_item", item_id=42),
+                "page": layab.flask_restx.url_for("links", page=2),
+            }
+        )
+
+    with app.test_client() as client:
+        yield client
+
+
+def test_url_for_without_reverse_proxy(url_client):
+    response = url_client.get("/links")
+    assert response.json == {
+        "item": "http://localhost/items/42",
+        "page": "http://localhost/links?page=2",
+    }
+
+
+def test_url_for_with_reverse_proxy(url_client):
+    response = url_client.get(
+        "/links",
+        headers={"X-Original-Request-Uri": "/reverse/links", "Host": "my_host:8080"},
+    )
+    assert response.json == {
+        "item": "http://my_host:8080/reverse/items/42",
+        "page": "http://my_host:8080/reverse/links?page=2",
+    }
+
+
+def test_json_response():
+    app = flask.Flask(__name__)
+
+    @app.route("/json")
+    def json_content():
+        return layab.flask_restx.json_response(
+            {"date": datetime.date(2020, 10, 9)}, status=202
+        )
+
+    @app.route("/bytes")
+    def bytes_content():
+        return layab.flask_restx.json_response(b'{"already":"serialized"}')
+
+    @app.route("/memoryview")
+    def memoryview_content():
+        return layab.flask_restx.json_response(
+            memoryview(b'{"already":"serialized"}'), headers={"X-Custom": "value"}
+        )
+
+    with app.test_client() as client:
+        response = client.get("/json")
+        assert response.status_code == 202
+        assert response.headers["Content-Type"] == "application/json"
+        assert response.json == {"date": "2020-10-09"}
+        assert client.get("/bytes").json == {"already": "serialized"}
+        response = client.get("/memoryview")
+        assert response.headers["Content-Length"] == "24"
+        assert response.headers["X-Custom"] == "value"
+        assert response.json == {"already": "serialized"}
+
+
+def test_json_response_memoryview_of_multi_bytes_items():
+    content = array.array("i", b'{"already":"serialized"}')
+    app = flask.Flask(__name__)
+
+    @app.route("/ints")
+    def ints_content():
+        return layab.flask_restx.json_response(memoryview(content))
+
+    with app.test_client() as client:
+        response = client.get("/ints")
+    assert response.headers["Content-Length"] == "24"
+    assert response.json == {"already": "serialized"}
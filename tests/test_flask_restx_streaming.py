@@ -0,0 +1,68 @@
+import gzip
+import json
+
+import flask
+import flask_compress
+import pytest
+
+import layab.flask_restx
+
+
+@pytest.fixture
+def client():
+    app = flask.Flask(__name__)
+    app.config["COMPRESS_MIMETYPES"] = ["text/csv", "application/x-ndjson"]
+    flask_compress.Compress(app)
+
+    @app.route("/ndjson")
+    def ndjson():
+        return layab.flask_restx.ndjson_response(
+            ({"id": index} for index in range(1000)), chunk_size=100
+        )
+
+    @app.route("/csv")
+    def csv():
+        return layab.flask_restx.csv_response(
+            ({"id": index, "arg": flask.request.args["arg"]} for index in range(3)),
+            fieldnames=["id", "arg"],
+        )
+
+    @app.route("/flask_compress")
+    def compressed_by_flask_compress():
+        return layab.flask_restx.csv_response([[1, 2]], compress=False)
+
+    with app.test_client() as client:
+        yield client
+
+
+def test_ndjson(client):
+    response = client.get("/ndjson", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    assert "Content-Encoding" not in response.headers
+    assert [json.loads(line) for line in response.data.splitlines()] == [
+        {"id": index} for index in range(1000)
+    ]
+
+
+def test_ndjson_compressed(client):
+    response = client.get("/ndjson", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert [
+        json.loads(line) for line in gzip.decompress(response.data).splitlines()
+    ] == [{"id": index} for index in range(1000)]
+
+
+def test_csv_rows_access_request_context(client):
+    response = client.get("/csv?arg=value", headers={"Accept-Encoding": "identity"})
+    assert response.headers["Content-Type"] == "text/csv; charset=utf-8"
+    assert response.data == b"id,arg\r\n0,value\r\n1,value\r\n2,value\r\n"
+
+
+def test_csv_compressed_by_flask_compress(client):
+    response = client.get("/flask_compress", headers={"Accept-Encoding": "gzip"})
+    # Compressed by flask_compress (Content-Length is not sent by every flask_compress version)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == b"1,2\r\n"
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+
+import layab
+
+
+def test_healthy_without_checks():
+    assert layab.HealthChecks().health_sync() == {"status": "pass", "checks": {}}
+
+
+def test_worst_status_is_provided():
+    health_checks = layab.HealthChecks(release_id="1.0.0")
+    health_checks.add("first", lambda: "pass")
+    health_checks.add("second", lambda: ("warn", {"observedValue": 42}))
+    health = health_checks.health_sync()
+    assert health["status"] == "warn"
+    assert health["releaseId"] == "1.0.0"
+    assert health["checks"]["first"][0]["status"] == "pass"
+    assert health["checks"]["second"][0]["status"] == "warn"
+    assert health["checks"]["second"][0]["observedValue"] == 42
+    assert health["checks"]["second"][0]["time"]
+
+
+def test_failures():
+    health_checks = layab.HealthChecks(timeout=0.05)
+
+    @health_checks.add("exception")
+    def exception():
+        raise ConnectionError("Database is down")
+
+    @health_checks.add("invalid")
+    def invalid():
+        return "ok"
+
+    @health_checks.add("timeout")
+    def timeout():
+        time.sleep(0.5)
+        return "pass"
+
+    health_checks.add("pass", lambda: "pass")
+
+    start = time.perf_counter()
+    health = health_checks.health_sync()
+    assert time.perf_counter() - start < 0.4
+    assert health["status"] == "fail"
+    assert health["checks"]["exception"][0]["output"] == (
+        "ConnectionError: Database is down"
+    )
+    assert health["checks"]["invalid"][0]["output"] == "ok is not a valid status."
+    assert health["checks"]["timeout"][0]["output"] == (
+        "Check timed out after 0.05 seconds."
+    )
+    assert health["checks"]["pass"][0]["status"] == "pass"
+
+
+def test_sync_checks_are_cached_and_concurrent():
+    calls = []
+    health_checks = layab.HealthChecks(ttl=60)
+
+    @health_checks.add("first")
+    def first():
+        calls.append("first")
+        time.sleep(0.1)
+        return "pass"
+
+    @health_checks.add("second")
+    async def second():
+        calls.append("second")
+        await asyncio.sleep(0.1)
+        return "pass"
+
+    start = time.perf_counter()
+    probes = [threading.Thread(target=health_checks.health_sync) for _ in range(5)]
+    for probe in probes:
+        probe.start()
+    for probe in probes:
+        probe.join()
+    assert time.perf_counter() - start < 0.19
+    assert sorted(calls) == ["first", "second"]
+    assert health_checks.health_sync()["status"] == "pass"
+    assert len(calls) == 2
+
+
+def test_async_checks_are_cached_and_concurrent():
+    calls = []
+    health_checks = layab.HealthChecks(ttl=60, timeout=0.05)
+
+    @health_checks.add("first")
+    async def first():
+        calls.append("first")
+        await asyncio.sleep(0.01)
+        return "pass"
+
+    @health_checks.add("second")
+    def second():
+        calls.append("second")
+        return "warn"
+
+    @health_checks.add("timeout")
+    async def timeout():
+        await asyncio.sleep(1)
+
+    async def probes():
+        return await asyncio.gather(*(health_checks.health() for _ in range(5)))
+
+    loop = asyncio.new_event_loop()
+    try:
+        results = loop.run_until_complete(probes())
+        assert sorted(calls) == ["first", "second"]
+        assert all(health is results[0] for health in results)
+        assert results[0]["status"] == "fail"
+        assert results[0]["checks"]["timeout"][0]["output"] == (
+            "Check timed out after 0.05 seconds."
+        )
+        assert loop.run_until_complete(health_checks.health()) is results[0]
+    finally:
+        loop.close()
+
+
+def test_cache_expiry():
+    calls = []
+    health_checks = layab.HealthChecks(ttl=0)
+    health_checks.add("check", lambda: calls.append("check") or "pass")
+    health_checks.health_sync()
+    health_checks.health_sync()
+    assert calls == ["check", "check"]
@@ -0,0 +1,60 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# Module: (framework imported beforehand, maximum number of imported modules, modules that must not be imported)
+BUDGETS = {
+    "layab": (None, 15, ["yaml", "asyncio", "tracemalloc"]),
+    "layab.starlette": (
+        "starlette.applications",
+        15,
+        [
+            "yaml",
+            "starlette.middleware.cors",
+            "starlette.middleware.gzip",
+            "orjson",
+            "csv",
+        ],
+    ),
+    "layab.flask_restx": (
+        "flask_restx",
+        15,
+        ["yaml", "werkzeug.middleware.proxy_fix", "asyncio", "orjson", "csv"],
+    ),
+}
+IMPORT = """
+import json, sys
+if {framework!r}:
+    __import__({framework!r})
+before = set(sys.modules)
+__import__({module!r})
+print(json.dumps({{"imported": sorted(set(sys.modules) - before), "loaded": sorted(sys.modules)}}))
+"""
+
+
+def _import(module: str, framework: str) -> dict:
+    code = IMPORT.format(module=module, framework=framework)
+    return json.loads(
+        subprocess.run(
+            [sys.executable, "-c", code], check=True, capture_output=True
+        ).stdout
+    )
+
+
+@pytest.mark.parametrize("module", BUDGETS)
+def test_import_budget(module):
+    framework, maximum_modules, forbidden_modules = BUDGETS[module]
+    modules = _import(module, framework)
+    assert not set(forbidden_modules) & set(modules["loaded"])
+    assert len(modules["imported"]) <= maximum_modules, modules["imported"]
+
+
+def test_lazy_attributes():
+    import layab
+
+    assert layab.load is layab._configuration.load
+    assert "HealthChecks" in dir(layab)
+    with pytest.raises(AttributeError):
+        layab.unknown
@@ -0,0 +1,61 @@
+import dataclasses
+import datetime
+import enum
+import json
+import uuid
+
+import pytest
+
+import layab._json
+
+
+@pytest.fixture(params=["orjson", "json"])
+def serializer(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(layab._json, "orjson", None)
+
+
+@dataclasses.dataclass
+class Item:
+    name: str
+    created: datetime.date
+
+
+class Color(enum.Enum):
+    red = "red"
+
+
+class ArrayLike:
+    def tolist(self):
+        return [1, 2]
+
+
+def test_dumps(serializer):
+    content = {
+        "datetime": datetime.datetime(2020, 10, 9, 12, 30, 5),
+        "date": datetime.date(2020, 10, 9),
+        "uuid": uuid.UUID("a8098c1a-f86e-11da-bd1a-00112444be1e"),
+        "item": Item("é", datetime.date(2020, 10, 9)),
+        "color": Color.red,
+        "array": ArrayLike(),
+        1: None,
+    }
+    serialized = layab._json.dumps(content)
+    assert isinstance(serialized, bytes)
+    assert json.loads(serialized) == {
+        "datetime": "2020-10-09T12:30:05",
+        "date": "2020-10-09",
+        "uuid": "a8098c1a-f86e-11da-bd1a-00112444be1e",
+        "item": {"name": "é", "created": "2020-10-09"},
+        "color": "red",
+        "array": [1, 2],
+        "1": None,
+    }
+    assert b" " not in serialized
+
+
+def test_dumps_unsupported_type(serializer):
+    with pytest.raises(TypeError):
+        layab._json.dumps({"value": object()})
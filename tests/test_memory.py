@@ -0,0 +1,76 @@
+import logging
+import tracemalloc
+
+import pytest
+
+import layab
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError) as exception_info:
+        layab.MemoryTracker("invalid")
+    assert (
+        str(exception_info.value)
+        == "invalid is not a valid memory tracking mode. Valid modes are tracemalloc and rss."
+    )
+
+
+def test_tracemalloc_measure():
+    tracker = layab.MemoryTracker()
+    measure = tracker.start()
+    assert tracemalloc.is_tracing()
+    allocated = [bytearray(1024) for _ in range(100)]
+    memory = tracker.stop(measure, "GET /route")
+    assert not tracemalloc.is_tracing()
+    assert memory["allocated"] >= 100 * 1024
+    assert memory["peak"] >= memory["allocated"]
+    assert allocated
+
+
+def test_tracemalloc_is_not_stopped_if_started_by_someone_else():
+    tracemalloc.start()
+    try:
+        tracker = layab.MemoryTracker()
+        tracker.stop(tracker.start(), "GET /route")
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_tracemalloc_is_stopped_once_all_requests_are_measured():
+    tracker = layab.MemoryTracker()
+    first = tracker.start()
+    second = tracker.start()
+    tracker.stop(first, "GET /route")
+    assert tracemalloc.is_tracing()
+    tracker.stop(second, "GET /route")
+    assert not tracemalloc.is_tracing()
+
+
+def test_rss_measure():
+    tracker = layab.MemoryTracker("rss")
+    measure = tracker.start()
+    memory = tracker.stop(measure, "GET /route")
+    assert not tracemalloc.is_tracing()
+    assert isinstance(memory["allocated"], int)
+    assert memory["peak"] >= 0
+
+
+def test_not_sampled():
+    tracker = layab.MemoryTracker(sample_rate=0)
+    measure = tracker.start()
+    assert measure is None
+    assert tracker.stop(measure, "GET /route") is None
+
+
+def test_top_routes_report(caplog):
+    caplog.set_level(logging.INFO)
+    tracker = layab.MemoryTracker(report_interval=0, top=1)
+    kept = []
+    measure = tracker.start()
+    kept.append(bytearray(10240))
+    tracker.stop(measure, "GET /allocating")
+    assert eval(caplog.messages[-1])["memory_top_routes"][0]["route"] == (
+        "GET /allocating"
+    )
+    assert eval(caplog.messages[-1])["memory_top_routes"][0]["requests"] == 1
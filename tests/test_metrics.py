@@ -0,0 +1,99 @@
+import logging
+import os
+
+import pytest
+
+import layab
+
+
+def test_requests_are_counted_per_route_and_status_code(tmp_path):
+    metrics = layab.Metrics(str(tmp_path), buckets=[0.1, 1])
+    metrics.observe("GET /items", 200, 0.05)
+    metrics.observe("GET /items", 200, 0.5)
+    metrics.observe("GET /items", 200, 5)
+    metrics.observe("GET /items", 404, 0.01)
+
+    assert metrics.collect() == {
+        ("GET /items", 200): {"count": 3, "sum": 5.55, "buckets": [1, 2]},
+        ("GET /items", 404): {"count": 1, "sum": 0.01, "buckets": [1, 1]},
+    }
+
+
+def test_nothing_collected(tmp_path):
+    assert layab.Metrics(str(tmp_path / "missing")).collect() == {}
+
+
+def test_exposition(tmp_path):
+    metrics = layab.Metrics(str(tmp_path), buckets=[0.1, 1])
+    metrics.observe('GET /"quoted"', 200, 0.5)
+
+    assert metrics.exposition() == (
+        "# HELP http_request_duration_seconds Processing time of HTTP requests.\n"
+        "# TYPE http_request_duration_seconds histogram\n"
+        'http_request_duration_seconds_bucket{route="GET /\\"quoted\\"",status_code="200",le="0.1"} 0\n'
+        'http_request_duration_seconds_bucket{route="GET /\\"quoted\\"",status_code="200",le="1"} 1\n'
+        'http_request_duration_seconds_bucket{route="GET /\\"quoted\\"",status_code="200",le="+Inf"} 1\n'
+        'http_request_duration_seconds_sum{route="GET /\\"quoted\\"",status_code="200"} 0.5\n'
+        'http_request_duration_seconds_count{route="GET /\\"quoted\\"",status_code="200"} 1\n'
+    )
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+def test_metrics_of_every_worker_are_merged(tmp_path):
+    metrics = layab.Metrics(str(tmp_path), buckets=[0.1, 1])
+    metrics.observe("GET /items", 200, 0.05)
+
+    workers = []
+    for _ in range(2):
+        pid = os.fork()
+        if pid == 0:  # Worker
+            try:
+                metrics.observe("GET /items", 200, 0.5)
+                metrics.observe("POST /items", 201, 0.05)
+            finally:
+                os._exit(0)
+        workers.append(pid)
+    for pid in workers:
+        os.waitpid(pid, 0)
+
+    assert len(os.listdir(tmp_path)) == 3
+    assert metrics.collect() == {
+        ("GET /items", 200): {"count": 3, "sum": 1.05, "buckets": [1, 3]},
+        ("POST /items", 201): {"count": 2, "sum": 0.1, "buckets": [2, 2]},
+    }
+
+
+def test_clear(tmp_path):
+    metrics = layab.Metrics(str(tmp_path))
+    metrics.observe("GET /items", 200, 0.05)
+    metrics.clear()
+    assert metrics.collect() == {}
+
+    metrics.observe("GET /items", 200, 0.05)
+    assert metrics.collect()[("GET /items", 200)]["count"] == 1
+
+
+def test_series_are_limited(tmp_path, caplog):
+    metrics = layab.Metrics(str(tmp_path), max_series=1)
+    metrics.observe("GET /items", 200, 0.05)
+    metrics.observe("GET /items", 500, 0.05)
+    metrics.observe("GET /items", 500, 0.05)
+
+    assert list(metrics.collect()) == [("GET /items", 200)]
+    assert [record.levelno for record in caplog.records] == [logging.WARNING]
+
+
+def test_long_route_is_truncated(tmp_path):
+    metrics = layab.Metrics(str(tmp_path))
+    route = "GET /" + "é" * 300
+    metrics.observe(route, 200, 0.05)
+    metrics.observe(route, 200, 0.05)
+
+    (((truncated_route, status_code), series),) = metrics.collect().items()
+    assert route.startswith(truncated_route)
+    assert series["count"] == 2
+
+
+def test_metrics_written_with_other_buckets_are_ignored(tmp_path):
+    layab.Metrics(str(tmp_path), buckets=[1]).observe("GET /items", 200, 0.05)
+    assert layab.Metrics(str(tmp_path), buckets=[1, 2]).collect() == {}
@@ -0,0 +1,52 @@
+import gzip
+
+import pytest
+
+from layab._openapi import OpenAPIDocument
+
+BODY = b'{"swagger":"2.0"}'
+
+
+def test_identity_sent_if_no_encoding_is_accepted():
+    status, body, headers = OpenAPIDocument(BODY).response()
+    assert status == 200
+    assert body == BODY
+    assert "Content-Encoding" not in headers
+    assert headers["Content-Type"] == "application/json"
+
+
+def test_refused_encoding_is_not_sent():
+    status, body, headers = OpenAPIDocument(BODY).response("br;q=0, gzip;q=0")
+    assert body == BODY
+    assert "Content-Encoding" not in headers
+
+
+def test_gzip():
+    status, body, headers = OpenAPIDocument(BODY).response("deflate, gzip;q=0.5")
+    assert headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == BODY
+
+
+def test_brotli():
+    brotli = pytest.importorskip("brotli")
+    status, body, headers = OpenAPIDocument(BODY).response("gzip, br")
+    assert headers["Content-Encoding"] == "br"
+    assert brotli.decompress(body) == BODY
+
+
+def test_not_modified_whatever_the_representation():
+    document = OpenAPIDocument(BODY)
+    _, _, gzip_headers = document.response("gzip")
+    status, body, headers = document.response(
+        None, f'"other", W/{gzip_headers["ETag"]}'
+    )
+    assert status == 304
+    assert body == b""
+    assert "Content-Type" not in headers
+    assert document.response(None, "*")[0] == 304
+
+
+def test_etag_changes_with_content():
+    first = OpenAPIDocument(BODY).response()[2]["ETag"]
+    assert OpenAPIDocument(BODY).response()[2]["ETag"] == first
+    assert OpenAPIDocument(b'{"swagger":"3.0"}').response()[2]["ETag"] != first
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+import layab
+
+
+def test_requests_are_refused_after_delay():
+    graceful_shutdown = layab.GracefulShutdown(refuse_after=0.05)
+    assert not graceful_shutdown.draining
+    in_flight = graceful_shutdown.request_started("GET /")
+    assert graceful_shutdown.in_flight == 1
+    graceful_shutdown.start()
+    assert graceful_shutdown.draining
+    assert not graceful_shutdown.refusing
+    graceful_shutdown.request_ended(graceful_shutdown.request_started("GET /"))
+    time.sleep(0.05)
+    assert graceful_shutdown.refusing
+    assert graceful_shutdown.request_started("GET /") is None
+    graceful_shutdown.request_ended(in_flight)
+    assert graceful_shutdown.in_flight == 0
+
+
+def test_wait_for_in_flight_requests(caplog):
+    caplog.set_level(logging.INFO)
+    graceful_shutdown = layab.GracefulShutdown(refuse_after=0, log_interval=0.01)
+    in_flight = graceful_shutdown.request_started("GET /slow")
+    threading.Timer(0.05, graceful_shutdown.request_ended, (in_flight,)).start()
+    assert graceful_shutdown.wait()
+    messages = [eval(message) for message in caplog.messages]
+    assert messages[0] == {"shutdown_status": "draining", "shutdown_in_flight": 1}
+    assert messages[1]["shutdown_status"] == "waiting"
+    assert messages[1]["shutdown_in_flight_requests"][0]["route"] == "GET /slow"
+    assert messages[-1] == {"shutdown_status": "drained"}
+
+
+def test_wait_timeout(caplog):
+    caplog.set_level(logging.INFO)
+    graceful_shutdown = layab.GracefulShutdown(refuse_after=0, drain_timeout=0.02)
+    graceful_shutdown.request_started("GET /slow")
+    assert not graceful_shutdown.wait()
+    message = eval(caplog.messages[-1])
+    assert message["shutdown_status"] == "timeout"
+    assert message["shutdown_in_flight_requests"][0]["route"] == "GET /slow"
+    assert message["shutdown_in_flight_requests"][0]["duration"] >= 0.02
+
+
+def test_signal_is_forwarded_once_drained():
+    received = threading.Event()
+    previous = signal.signal(signal.SIGUSR1, lambda signum, frame: received.set())
+    try:
+        graceful_shutdown = layab.GracefulShutdown(refuse_after=0.02)
+        graceful_shutdown.install([signal.SIGUSR1])
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert graceful_shutdown.draining
+        assert not received.is_set()
+        assert received.wait(1)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+
+def test_health_fails_once_shutdown_started():
+    graceful_shutdown = layab.GracefulShutdown()
+    health_checks = layab.HealthChecks(graceful_shutdown=graceful_shutdown)
+    health_checks.add("database", lambda: "pass")
+    assert health_checks.health_sync()["status"] == "pass"
+    graceful_shutdown.start()
+    health = health_checks.health_sync()
+    assert health["status"] == "fail"
+    assert health["checks"]["shutdown"][0]["output"] == "Service is shutting down."
+
+
+def test_event_loop_signal_handler_is_chained_once_drained():
+    graceful_shutdown = layab.GracefulShutdown(refuse_after=0.02, log_interval=0.01)
+    in_flight = graceful_shutdown.request_started("GET /slow")
+    loop = asyncio.new_event_loop()
+
+    async def serve():
+        # As servers handling signals thanks to the event loop do (such as uvicorn)
+        exited = asyncio.Event()
+        loop.add_signal_handler(signal.SIGUSR1, exited.set)
+        graceful_shutdown.install([signal.SIGUSR1])
+        os.kill(os.getpid(), signal.SIGUSR1)
+        await asyncio.sleep(0.1)
+        assert graceful_shutdown.draining
+        assert not exited.is_set()
+        graceful_shutdown.request_ended(in_flight)
+        await asyncio.wait_for(exited.wait(), 1)
+
+    try:
+        loop.run_until_complete(serve())
+    finally:
+        loop.remove_signal_handler(signal.SIGUSR1)
+        loop.close()
+
+
+def test_uvicorn_drains_requests_on_sigterm(tmp_path):
+    pytest.importorskip("uvicorn")
+    (tmp_path / "shutdown_app.py").write_text(
+        """
+import layab
+from layab.starlette import middleware
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+
+graceful_shutdown = layab.GracefulShutdown(refuse_after=1, drain_timeout=5)
+app = Starlette(
+    middleware=middleware(graceful_shutdown=graceful_shutdown),
+    on_startup=[graceful_shutdown.install],
+)
+app.add_route("/ok", lambda request: PlainTextResponse("ok"))
+"""
+    )
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        port = free_socket.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "shutdown_app:app", "--port", str(port)],
+        cwd=str(tmp_path),
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join([str(tmp_path), os.getcwd()]),
+        },
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/ok"
+        for _ in range(100):
+            try:
+                assert requests.get(url).text == "ok"
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        else:
+            pytest.fail("uvicorn did not start")
+
+        server.send_signal(signal.SIGTERM)
+        signaled = time.monotonic()
+        time.sleep(0.2)
+        # Still served until refuse_after is reached, then the server stops
+        assert requests.get(url).status_code == 200
+        server.wait(10)
+        assert time.monotonic() - signaled >= 1
+    finally:
+        server.kill()
+        server.wait()
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.testclient import TestClient
+
+import layab._statistics
+import layab.starlette
+
+
+@pytest.fixture
+def client():
+    app = Starlette(
+        middleware=[Middleware(layab.starlette.LoggingMiddleware)],
+    )
+    app.add_route(
+        "/batch", layab.starlette.BatchEndpoint(max_requests=3), methods=["POST"]
+    )
+
+    @app.route("/items/{item_id:int}", methods=["GET", "PUT"])
+    async def item(request):
+        return JSONResponse(
+            {
+                "id": request.path_params["item_id"],
+                "method": request.method,
+                "args": dict(request.query_params),
+                "authorization": request.headers.get("authorization"),
+                "body": await request.json() if request.method == "PUT" else None,
+            }
+        )
+
+    @app.route("/text")
+    def text(request):
+        return PlainTextResponse("text", headers={"X-Custom": "value"})
+
+    @app.route("/failure")
+    def failure(request):
+        raise Exception("Error message")
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def mock_uuid(monkeypatch):
+    class UUIDMock:
+        @staticmethod
+        def uuid4():
+            return "1-2-3-4-5"
+
+    monkeypatch.setattr(layab._statistics, "uuid", UUIDMock)
+
+
+def test_batch(client):
+    response = client.post(
+        "/batch",
+        json=[
+            {"path": "/items/1?page=2"},
+            {"method": "put", "path": "/items/2", "body": {"name": "test"}},
+            {"path": "/text"},
+        ],
+        headers={"Authorization": "Bearer token"},
+    )
+    assert response.status_code == 207
+    first, second, third = response.json()
+    assert first["status"] == 200
+    assert first["headers"]["content-type"] == "application/json"
+    assert first["body"] == {
+        "id": 1,
+        "method": "GET",
+        "args": {"page": "2"},
+        "authorization": "Bearer token",
+        "body": None,
+    }
+    assert second["body"] == {
+        "id": 2,
+        "method": "PUT",
+        "args": {},
+        "authorization": "Bearer token",
+        "body": {"name": "test"},
+    }
+    assert third["status"] == 200
+    assert third["headers"]["x-custom"] == "value"
+    assert third["body"] == "text"
+
+
+def test_batch_failure_and_unknown_path(client):
+    response = client.post("/batch", json=[{"path": "/failure"}, {"path": "/unknown"}])
+    assert response.status_code == 207
+    assert [sub_response["status"] for sub_response in response.json()] == [500, 404]
+    assert response.json()[0]["body"] == "Internal Server Error"
+
+
+def test_sub_requests_are_logged_with_parent_request_id(client, caplog, mock_uuid):
+    caplog.set_level(logging.INFO)
+    client.post(
+        "/batch", json=[{"path": "/items/1"}], headers={"X-Request-Id": "original"}
+    )
+    request_ids = [
+        eval(message)["request_id"]
+        for message in caplog.messages
+        if message.startswith("{")
+    ]
+    assert request_ids == [
+        "original,1-2-3-4-5",
+        "original,1-2-3-4-5,1-2-3-4-5",
+        "original,1-2-3-4-5,1-2-3-4-5",
+        "original,1-2-3-4-5",
+    ]
+
+
+@pytest.mark.parametrize(
+    "batch, message",
+    [
+        ({"path": "/items/1"}, "Batch must be a list of sub-requests."),
+        ([{"path": "/text"}] * 4, "Batch cannot contain more than 3 sub-requests."),
+        ([{"method": "GET"}], "Sub-request 0 must be an object with a path."),
+        ([{"path": "text"}], "Sub-request 0 path must start with /."),
+        (
+            [{"path": "/text", "headers": []}],
+            "Sub-request 0 headers must be an object.",
+        ),
+        (
+            [{"path": "/text", "headers": {"X-Euro": "\u20ac"}}],
+            "Sub-request 0 header 'x-euro' is not valid.",
+        ),
+        (
+            [{"path": "/text", "headers": {"X-Split": "a\r\nX-Injected: b"}}],
+            "Sub-request 0 header 'x-split' is not valid.",
+        ),
+        (
+            [{"path": "/text", "headers": {"X Space": "a"}}],
+            "Sub-request 0 header 'x space' is not valid.",
+        ),
+    ],
+)
+def test_invalid_batch(client, batch, message):
+    response = client.post("/batch", json=batch)
+    assert response.status_code == 400
+    assert response.text == message
+
+
+def test_batch_concurrency_is_capped():
+    in_flight = 0
+    max_in_flight = 0
+    app = Starlette()
+    app.add_route(
+        "/batch", layab.starlette.BatchEndpoint(max_concurrency=2), methods=["POST"]
+    )
+
+    @app.route("/slow")
+    async def slow(request):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(in_flight, max_in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return PlainTextResponse("")
+
+    response = TestClient(app).post("/batch", json=[{"path": "/slow"}] * 5)
+    assert [sub_response["status"] for sub_response in response.json()] == [200] * 5
+    assert max_in_flight == 2
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_sub_responses_are_not_compressed(fused):
+    app = Starlette(middleware=layab.starlette.middleware(compress=True, fused=fused))
+    app.add_route("/batch", layab.starlette.BatchEndpoint(), methods=["POST"])
+
+    @app.route("/items")
+    async def items(request):
+        return JSONResponse([{"id": item_id} for item_id in range(200)])
+
+    response = TestClient(app).post(
+        "/batch",
+        json=[{"path": "/items", "headers": {"Accept-Encoding": "gzip"}}],
+        headers={"Accept-Encoding": "gzip, deflate, br", "Connection": "keep-alive"},
+    )
+    assert response.status_code == 207
+    assert response.headers["content-encoding"] == "gzip"
+    (sub_response,) = response.json()
+    assert sub_response["status"] == 200
+    assert "content-encoding" not in sub_response["headers"]
+    assert sub_response["body"] == [{"id": item_id} for item_id in range(200)]
+
+
+def test_undecodable_sub_response():
+    app = Starlette()
+    app.add_route("/batch", layab.starlette.BatchEndpoint(), methods=["POST"])
+
+    @app.route("/encoded")
+    async def encoded(request):
+        return Response(
+            b"\x1f\x8b", headers={"Content-Encoding": "gzip"}, media_type="text/plain"
+        )
+
+    @app.route("/invalid")
+    async def invalid(request):
+        return Response(b"\xff", media_type="application/json")
+
+    response = TestClient(app).post(
+        "/batch", json=[{"path": "/encoded"}, {"path": "/invalid"}, {"path": "/items"}]
+    )
+    assert response.status_code == 207
+    assert response.json() == [
+        {
+            "status": 502,
+            "headers": {},
+            "body": "Sub-response cannot be decoded (gzip encoded).",
+        },
+        {
+            "status": 502,
+            "headers": {},
+            "body": "Sub-response cannot be decoded (not valid JSON).",
+        },
+        {
+            "status": 404,
+            "headers": {
+                "content-length": "9",
+                "content-type": "text/plain; charset=utf-8",
+            },
+            "body": "Not Found",
+        },
+    ]
+
+
+def test_batch_cannot_be_nested(client):
+    response = client.post(
+        "/batch", json=[{"method": "POST", "path": "/batch", "body": []}]
+    )
+    assert response.status_code == 207
+    assert response.json() == [
+        {
+            "status": 400,
+            "headers": {
+                "content-length": "32",
+                "content-type": "text/plain; charset=utf-8",
+            },
+            "body": "Batch requests cannot be nested.",
+        }
+    ]
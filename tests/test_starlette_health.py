@@ -0,0 +1,33 @@
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+import layab.starlette
+
+
+def test_health_endpoint():
+    health_checks = layab.HealthChecks(release_id="1.0.0")
+    health_checks.add("database", lambda: "pass")
+    app = Starlette()
+    app.add_route(
+        "/health", layab.starlette.HealthEndpoint(health_checks), methods=["GET"]
+    )
+
+    response = TestClient(app).get("/health")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/health+json"
+    assert response.json()["status"] == "pass"
+    assert response.json()["releaseId"] == "1.0.0"
+    assert response.json()["checks"]["database"][0]["status"] == "pass"
+
+
+def test_unhealthy_endpoint():
+    health_checks = layab.HealthChecks()
+    health_checks.add("database", lambda: "fail")
+    app = Starlette()
+    app.add_route(
+        "/health", layab.starlette.HealthEndpoint(health_checks), methods=["GET"]
+    )
+
+    response = TestClient(app).get("/health")
+    assert response.status_code == 503
+    assert response.json()["status"] == "fail"
@@ -0,0 +1,90 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+import layab.starlette
+
+
+def item(request):
+    return PlainTextResponse("item")
+
+
+def failure(request):
+    raise Exception("failure")
+
+
+def _app(metrics: layab.Metrics, **middleware) -> Starlette:
+    app = Starlette(
+        middleware=layab.starlette.middleware(metrics=metrics, **middleware)
+    )
+    app.add_route("/items/{item_id}", item)
+    app.add_route("/failure", failure)
+    app.add_route("/metrics", layab.starlette.MetricsEndpoint(metrics), methods=["GET"])
+    return app
+
+
+def test_requests_are_counted_per_endpoint(tmp_path):
+    metrics = layab.Metrics(str(tmp_path))
+    client = TestClient(_app(metrics), raise_server_exceptions=False)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/failure")
+
+    collected = metrics.collect()
+    assert collected[("GET /items/{item_id}", 200)]["count"] == 2
+    assert collected[("GET /failure", 500)]["count"] == 1
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_unmatched_requests_cannot_exhaust_series(tmp_path, fused):
+    metrics = layab.Metrics(str(tmp_path), max_series=2)
+    client = TestClient(_app(metrics, fused=fused))
+    for index in range(6):
+        client.get(f"/scan{index}")
+    client.get("/items/1")
+
+    collected = metrics.collect()
+    assert collected[("GET <unmatched>", 404)]["count"] == 6
+    assert collected[("GET /items/{item_id}", 200)]["count"] == 1
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_mounted_routes_are_counted_per_path_template(tmp_path, fused):
+    metrics = layab.Metrics(str(tmp_path))
+    app = Starlette(
+        middleware=layab.starlette.middleware(metrics=metrics, fused=fused),
+        routes=[Mount("/api", routes=[Route("/items/{item_id}", item)])],
+    )
+    client = TestClient(app)
+    client.get("/api/items/1")
+    client.post("/api/items/2")
+
+    collected = metrics.collect()
+    assert collected[("GET /api/items/{item_id}", 200)]["count"] == 1
+    assert collected[("POST /api/items/{item_id}", 405)]["count"] == 1
+
+
+def test_fused_middleware(tmp_path):
+    metrics = layab.Metrics(str(tmp_path))
+    client = TestClient(_app(metrics, fused=True))
+    client.get("/items/1")
+
+    series = metrics.collect()[("GET /items/{item_id}", 200)]
+    assert series["count"] == 1
+    assert series["buckets"] == [1] * len(metrics.buckets)
+
+
+def test_metrics_endpoint(tmp_path):
+    metrics = layab.Metrics(str(tmp_path))
+    client = TestClient(_app(metrics))
+    client.get("/items/1")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_request_duration_seconds_count{route="GET /items/{item_id}",status_code="200"} 1'
+        in response.text.splitlines()
+    )
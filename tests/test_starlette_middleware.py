@@ -1,6 +1,6 @@
 from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.gzip import GZipMiddleware
 
+import layab
 import layab.starlette
 
 
@@ -29,7 +29,7 @@ def test_compress_middleware():
     )
     assert len(middleware) == 2
     assert middleware[0].cls == layab.starlette.LoggingMiddleware
-    assert middleware[1].cls == GZipMiddleware
+    assert middleware[1].cls == layab.starlette.GZipMiddleware
     assert middleware[1].options == {}
 
 
@@ -39,3 +39,28 @@ def test_reverse_proxy_middleware():
     assert middleware[0].cls == layab.starlette.LoggingMiddleware
     assert middleware[1].cls == layab.starlette.ProxyHeadersMiddleware
     assert middleware[1].options == {}
+
+
+def test_fused_middleware():
+    middleware = layab.starlette.middleware(compress=True, fused=True)
+    assert len(middleware) == 1
+    assert middleware[0].cls == layab.starlette.FusedMiddleware
+    assert middleware[0].options == {
+        "cors": True,
+        "compress": True,
+        "reverse_proxy": True,
+        "skip_paths": ["/health"],
+    }
+
+
+def test_memory_tracking_middleware():
+    memory_tracker = layab.MemoryTracker()
+    middleware = layab.starlette.middleware(
+        cors=False, reverse_proxy=False, memory_tracker=memory_tracker
+    )
+    assert len(middleware) == 1
+    assert middleware[0].cls == layab.starlette.LoggingMiddleware
+    assert middleware[0].options == {
+        "skip_paths": ["/health"],
+        "memory_tracker": memory_tracker,
+    }
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from starlette.testclient import TestClient
+
+import layab.starlette
+
+
+def _client(**options):
+    app = Starlette(
+        middleware=[
+            Middleware(layab.starlette.LoggingMiddleware),
+            Middleware(layab.starlette.DeadlineMiddleware, **options),
+        ]
+    )
+
+    @app.route("/slow")
+    async def slow(request):
+        await asyncio.sleep(float(request.query_params.get("duration", 5)))
+        return JSONResponse({"remaining": layab.starlette.remaining_time()})
+
+    @app.route("/items/{item_id:int}")
+    async def item(request):
+        return JSONResponse({"remaining": layab.starlette.remaining_time()})
+
+    @app.route("/remaining")
+    async def remaining(request):
+        return JSONResponse({"remaining": layab.starlette.remaining_time()})
+
+    @app.route("/sync_remaining")
+    def sync_remaining(request):
+        return JSONResponse({"remaining": layab.starlette.remaining_time()})
+
+    @app.route("/timeout_error")
+    async def timeout_error(request):
+        raise asyncio.TimeoutError()
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_no_deadline():
+    client = _client()
+    response = client.get("/remaining")
+    assert response.json() == {"remaining": None}
+
+
+def test_default_timeout_reached(caplog):
+    caplog.set_level(logging.INFO)
+    client = _client(default_timeout=0.05)
+    response = client.get("/slow")
+    assert response.status_code == 504
+    assert response.text == "Request deadline exceeded."
+    end_message = eval(caplog.messages[-1])
+    assert end_message["request_status_code"] == 504
+    assert end_message["request_timed_out"] is True
+
+
+def test_default_timeout_not_reached(caplog):
+    caplog.set_level(logging.INFO)
+    client = _client(default_timeout=5)
+    response = client.get("/slow?duration=0")
+    assert response.status_code == 200
+    assert 0 < response.json()["remaining"] <= 5
+    end_message = eval(caplog.messages[-1])
+    assert end_message["request_status_code"] == 200
+    assert end_message["request_timed_out"] is False
+
+
+def test_timed_out_not_logged_without_deadline(caplog):
+    caplog.set_level(logging.INFO)
+    client = _client()
+    client.get("/remaining")
+    assert "request_timed_out" not in eval(caplog.messages[-1])
+
+
+def test_header_shortens_default_timeout():
+    client = _client(default_timeout=5)
+    response = client.get("/slow", headers={"X-Request-Timeout": "0.05"})
+    assert response.status_code == 504
+
+
+def test_header_cannot_extend_default_timeout():
+    client = _client(default_timeout=1)
+    response = client.get("/remaining", headers={"X-Request-Timeout": "10"})
+    assert 0 < response.json()["remaining"] <= 1
+
+
+def test_header_without_default_timeout():
+    client = _client()
+    response = client.get("/slow", headers={"X-Request-Timeout": "0.05"})
+    assert response.status_code == 504
+
+
+def test_custom_header():
+    client = _client(header="X-Deadline")
+    response = client.get("/remaining", headers={"X-Deadline": "10"})
+    assert 0 < response.json()["remaining"] <= 10
+
+
+def test_invalid_header_is_ignored(caplog):
+    client = _client(default_timeout=2)
+    response = client.get("/remaining", headers={"X-Request-Timeout": "invalid"})
+    assert 0 < response.json()["remaining"] <= 2
+    assert (
+        "Invalid x-request-timeout header value: invalid. Considering as not provided."
+        in caplog.messages
+    )
+
+
+@pytest.mark.parametrize("value", ["nan", "-1", "inf"])
+def test_out_of_range_header_is_ignored(value, caplog):
+    client = _client(default_timeout=2)
+    response = client.get("/remaining", headers={"X-Request-Timeout": value})
+    assert response.status_code == 200
+    assert 0 < response.json()["remaining"] <= 2
+    assert (
+        f"Invalid x-request-timeout header value: {value}. Considering as not provided."
+        in caplog.messages
+    )
+
+
+def test_path_timeout():
+    client = _client(default_timeout=10, timeouts={"/slow": 0.05})
+    assert client.get("/slow").status_code == 504
+    assert 0 < client.get("/remaining").json()["remaining"] <= 10
+
+
+def test_route_with_path_parameters_timeout():
+    client = _client(default_timeout=10, timeouts={"/items/{item_id:int}": 2})
+    assert 0 < client.get("/items/1").json()["remaining"] <= 2
+    assert 2 < client.get("/remaining").json()["remaining"] <= 10
+
+
+def test_remaining_time_in_sync_endpoint():
+    client = _client(default_timeout=5)
+    response = client.get("/sync_remaining")
+    assert 0 < response.json()["remaining"] <= 5
+
+
+def test_endpoint_timeout_error_is_not_a_deadline(caplog):
+    caplog.set_level(logging.INFO)
+    client = _client(default_timeout=5)
+    response = client.get("/timeout_error")
+    assert response.status_code == 500
+    end_message = eval(caplog.messages[-1])
+    assert end_message["error.class"] == "TimeoutError"
+    assert end_message["request_timed_out"] is False
+
+
+def test_remaining_time_outside_of_request():
+    assert layab.starlette.remaining_time() is None
@@ -0,0 +1,275 @@
+import logging
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.testclient import TestClient
+
+import layab._statistics
+import layab.starlette
+
+
+@pytest.fixture
+def client():
+    app = Starlette(middleware=layab.starlette.middleware(compress=True, fused=True))
+
+    @app.route("/logging", methods=["GET", "POST"])
+    def logging_endpoint(request):
+        return PlainTextResponse("")
+
+    @app.route("/logging_failure", methods=["GET", "POST"])
+    def logging_failure(request):
+        raise Exception("Error message")
+
+    @app.route("/health")
+    def health(request):
+        return PlainTextResponse("")
+
+    @app.route("/proxy")
+    def proxy(request):
+        return JSONResponse(
+            {"scheme": request.scope["scheme"], "client": request.scope["client"]}
+        )
+
+    @app.route("/large")
+    def large(request):
+        return PlainTextResponse("x" * 1000)
+
+    @app.route("/streamed")
+    def streamed(request):
+        async def content():
+            for _ in range(10):
+                yield b"x" * 100
+
+        return StreamingResponse(content(), media_type="text/plain")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+@pytest.fixture
+def mock_uuid(monkeypatch):
+    class UUIDMock:
+        @staticmethod
+        def uuid4():
+            return "1-2-3-4-5"
+
+    monkeypatch.setattr(layab._statistics, "uuid", UUIDMock)
+
+
+def test_log_get_request_details(client, caplog, mock_uuid):
+    caplog.set_level(logging.INFO)
+    response = client.get(
+        "/logging?param1=1&param2=test", headers={"X-Request-Id": "original"}
+    )
+    assert response.status_code == 200
+    assert response.text == ""
+    assert len(caplog.messages) == 2
+    start_message = eval(caplog.messages[0])
+    assert start_message.pop("request_headers.accept-encoding")
+    assert start_message == {
+        "request_args.param1": "1",
+        "request_args.param2": "test",
+        "request_headers.accept": "*/*",
+        "request_headers.connection": "keep-alive",
+        "request_headers.host": "testserver",
+        "request_headers.user-agent": "testclient",
+        "request_headers.x-request-id": "original",
+        "request_id": "original,1-2-3-4-5",
+        "request_method": "GET",
+        "request_status": "start",
+        "request_url.path": "/logging",
+    }
+    end_message = eval(caplog.messages[1])
+    assert end_message.pop("request_processing_time")
+    assert end_message.pop("request_headers.accept-encoding")
+    assert end_message == {
+        "request_args.param1": "1",
+        "request_args.param2": "test",
+        "request_headers.accept": "*/*",
+        "request_headers.connection": "keep-alive",
+        "request_headers.host": "testserver",
+        "request_headers.user-agent": "testclient",
+        "request_headers.x-request-id": "original",
+        "request_id": "original,1-2-3-4-5",
+        "request_method": "GET",
+        "request_status": "success",
+        "request_status_code": 200,
+        "request_url.path": "/logging",
+    }
+
+
+def test_log_post_request_details_on_failure(client, caplog, mock_uuid):
+    caplog.set_level(logging.INFO)
+    response = client.post("/logging_failure", data=b"posted")
+    assert response.status_code == 500
+    assert response.text == "Internal Server Error"
+    end_message = eval(caplog.messages[1])
+    assert end_message.pop("error.traceback")
+    assert end_message["error.class"] == "Exception"
+    assert end_message["error.msg"] == "Error message"
+    assert end_message["request.data"] == b"posted"
+    assert end_message["request_status"] == "error"
+    assert end_message["request_url.path"] == "/logging_failure"
+
+
+def test_skip_log_request(client, caplog):
+    caplog.set_level(logging.INFO)
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert len(caplog.messages) == 0
+
+
+def test_no_cors_headers_without_origin(client):
+    response = client.get("/logging")
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_cors_simple_request(client):
+    response = client.get("/logging", headers={"Origin": "http://my_origin"})
+    assert response.headers["access-control-allow-origin"] == "*"
+
+
+def test_cors_simple_request_with_cookie(client):
+    response = client.get(
+        "/logging", headers={"Origin": "http://my_origin", "Cookie": "a=b"}
+    )
+    assert response.headers["access-control-allow-origin"] == "http://my_origin"
+
+
+def test_cors_preflight_request(client, caplog):
+    caplog.set_level(logging.INFO)
+    response = client.options(
+        "/logging",
+        headers={
+            "Origin": "http://my_origin",
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "X-Custom",
+        },
+    )
+    assert response.status_code == 200
+    assert response.text == "OK"
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert response.headers["access-control-allow-headers"] == "X-Custom"
+    assert (
+        response.headers["access-control-allow-methods"]
+        == "DELETE, GET, OPTIONS, PATCH, POST, PUT"
+    )
+    assert eval(caplog.messages[1])["request_status_code"] == 200
+
+
+def test_forwarded_proto_and_for(client):
+    response = client.get(
+        "/proxy",
+        headers={"x-forwarded-proto": "https", "x-forwarded-for": "my_original_url"},
+    )
+    assert response.json() == {"client": ["my_original_url", 0], "scheme": "https"}
+
+
+def test_small_response_is_not_compressed(client):
+    response = client.get("/logging", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_large_response_is_compressed(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < 1000
+    assert response.text == "x" * 1000
+
+
+def test_large_response_is_not_compressed_if_not_accepted(client):
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == "x" * 1000
+
+
+def test_streamed_response_is_compressed(client):
+    response = client.get("/streamed", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == b"x" * 1000
+
+
+def test_minimal_fused_middleware(caplog):
+    app = Starlette(
+        middleware=[
+            Middleware(
+                layab.starlette.FusedMiddleware,
+                cors=False,
+                reverse_proxy=False,
+            )
+        ]
+    )
+
+    @app.route("/proxy")
+    def proxy(request):
+        return JSONResponse({"scheme": request.scope["scheme"]})
+
+    caplog.set_level(logging.INFO)
+    response = TestClient(app).get(
+        "/proxy", headers={"Origin": "http://my_origin", "x-forwarded-proto": "https"}
+    )
+    assert response.json() == {"scheme": "http"}
+    assert "access-control-allow-origin" not in response.headers
+    assert len(caplog.messages) == 2
+
+
+def test_server_timing(caplog):
+    app = Starlette(
+        middleware=layab.starlette.middleware(
+            compress=True, fused=True, server_timing=True
+        )
+    )
+
+    @app.route("/large")
+    def large(request):
+        with layab.starlette.timing("render"):
+            content = "x" * 1000
+        return PlainTextResponse(content)
+
+    @app.route("/health")
+    def health(request):
+        return PlainTextResponse("")
+
+    caplog.set_level(logging.INFO)
+    client = TestClient(app)
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["server-timing"].startswith("render;dur=")
+    assert ", total;dur=" in response.headers["server-timing"]
+    assert eval(caplog.messages[1])["request_timing.render"] >= 0
+    assert "server-timing" not in client.get("/health").headers
+
+
+def test_graceful_shutdown():
+    graceful_shutdown = layab.GracefulShutdown(refuse_after=0)
+    app = Starlette(
+        middleware=layab.starlette.middleware(
+            fused=True, graceful_shutdown=graceful_shutdown
+        )
+    )
+
+    @app.route("/logging")
+    def logging_endpoint(request):
+        assert graceful_shutdown.in_flight == 1
+        return PlainTextResponse("")
+
+    @app.route("/failure")
+    def failure(request):
+        raise Exception("Error message")
+
+    @app.route("/health")
+    def health(request):
+        return PlainTextResponse("")
+
+    client = TestClient(app, raise_server_exceptions=False)
+    assert client.get("/logging").status_code == 200
+    assert client.get("/failure").status_code == 500
+    assert graceful_shutdown.in_flight == 0
+    graceful_shutdown.start()
+    response = client.get("/logging")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/health").status_code == 200
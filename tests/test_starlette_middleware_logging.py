@@ -8,6 +8,8 @@ from starlette.middleware import Middleware
 from starlette.responses import PlainTextResponse
 from starlette.testclient import TestClient
 
+import layab
+import layab._statistics
 import layab.starlette
 
 
@@ -71,7 +73,7 @@ def mock_uuid(monkeypatch):
         def uuid4():
             return "1-2-3-4-5"
 
-    monkeypatch.setattr(layab.starlette, "uuid", UUIDMock)
+    monkeypatch.setattr(layab._statistics, "uuid", UUIDMock)
 
 
 def test_log_get_request_details(client, caplog, mock_uuid):
@@ -231,6 +233,7 @@ def test_log_get_request_details_on_failure(client, caplog, mock_uuid):
     }
     end_message = eval(caplog.messages[1])
     end_message.pop("error.traceback")
+    end_message.pop("request_processing_time")
     assert end_message == {
         "error.class": "Exception",
         "error.msg": "Error message",
@@ -267,6 +270,7 @@ def test_log_delete_request_details_on_failure(client, caplog, mock_uuid):
     }
     end_message = eval(caplog.messages[1])
     end_message.pop("error.traceback")
+    end_message.pop("request_processing_time")
     assert end_message == {
         "error.class": "Exception",
         "error.msg": "Error message",
@@ -304,6 +308,7 @@ def test_log_post_request_details_on_failure(client, caplog, mock_uuid):
     }
     end_message = eval(caplog.messages[1])
     end_message.pop("error.traceback")
+    end_message.pop("request_processing_time")
     assert end_message == {
         "error.class": "Exception",
         "error.msg": "Error message",
@@ -341,6 +346,7 @@ def test_log_put_request_details_on_failure(client, caplog, mock_uuid):
     }
     end_message = eval(caplog.messages[1])
     end_message.pop("error.traceback")
+    end_message.pop("request_processing_time")
     assert end_message == {
         "error.class": "Exception",
         "error.msg": "Error message",
@@ -388,3 +394,107 @@ def test_skip_log_put_request(client, caplog):
     assert response.status_code == 200
     assert response.text == ""
     assert len(caplog.messages) == 0
+
+
+def test_log_memory(caplog, mock_uuid):
+    app = Starlette(
+        middleware=[
+            Middleware(
+                layab.starlette.LoggingMiddleware,
+                memory_tracker=layab.MemoryTracker(),
+            )
+        ]
+    )
+
+    @app.route("/logging")
+    def logging_endpoint(request):
+        return PlainTextResponse("")
+
+    caplog.set_level(logging.INFO)
+    response = TestClient(app).get("/logging")
+    assert response.status_code == 200
+    end_message = eval(caplog.messages[1])
+    assert isinstance(end_message.pop("request_allocated_memory"), int)
+    assert end_message.pop("request_peak_memory") >= 0
+    assert "request_allocated_memory" not in eval(caplog.messages[0])
+
+
+def test_log_timing(caplog, mock_uuid):
+    app = Starlette(
+        middleware=[Middleware(layab.starlette.LoggingMiddleware, server_timing=True)]
+    )
+
+    @app.route("/logging")
+    async def logging_endpoint(request):
+        with layab.starlette.timing("db"):
+            pass
+        with layab.starlette.timing("db"):
+            pass
+        with layab.starlette.timing("render"):
+            pass
+        return PlainTextResponse("")
+
+    caplog.set_level(logging.INFO)
+    response = TestClient(app).get("/logging")
+    assert response.status_code == 200
+    metrics = [
+        metric.split(";") for metric in response.headers["server-timing"].split(", ")
+    ]
+    assert [name for name, _ in metrics] == ["db", "render", "total"]
+    assert all(duration.startswith("dur=") for _, duration in metrics)
+    end_message = eval(caplog.messages[1])
+    assert end_message["request_timing.db"] >= 0
+    assert end_message["request_timing.render"] >= 0
+    assert "request_timing.db" not in eval(caplog.messages[0])
+
+
+def test_timing_outside_of_request():
+    with layab.starlette.timing("db"):
+        pass
+
+
+def test_request_context_in_application_logs(caplog, mock_uuid):
+    app = Starlette(middleware=[Middleware(layab.starlette.LoggingMiddleware)])
+
+    @app.route("/logging")
+    def logging_endpoint(request):
+        # Synchronous endpoints are run in a thread pool
+        logging.getLogger("application").info(layab.current_request_id())
+        return PlainTextResponse("")
+
+    caplog.set_level(logging.INFO)
+    caplog.handler.addFilter(layab.RequestContextFilter())
+    response = TestClient(app).get("/logging")
+    assert response.status_code == 200
+    assert [record.request_id for record in caplog.records] == ["1-2-3-4-5"] * 3
+    assert [record.request_route for record in caplog.records] == ["GET /logging"] * 3
+    assert caplog.messages[1] == "1-2-3-4-5"
+
+    logging.getLogger("application").info("outside of a request")
+    assert caplog.records[3].request_id is None
+    assert layab.current_request_id() is None
+
+
+def test_graceful_shutdown():
+    graceful_shutdown = layab.GracefulShutdown(refuse_after=0)
+    app = Starlette(
+        middleware=layab.starlette.middleware(graceful_shutdown=graceful_shutdown)
+    )
+
+    @app.route("/logging")
+    def logging_endpoint(request):
+        assert graceful_shutdown.in_flight == 1
+        return PlainTextResponse("")
+
+    @app.route("/health")
+    def health(request):
+        return PlainTextResponse("")
+
+    client = TestClient(app)
+    assert client.get("/logging").status_code == 200
+    assert graceful_shutdown.in_flight == 0
+    graceful_shutdown.start()
+    response = client.get("/logging")
+    assert response.status_code == 503
+    assert response.text == "Service is shutting down."
+    assert client.get("/health").status_code == 200
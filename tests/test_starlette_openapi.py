@@ -0,0 +1,143 @@
+import json
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.testclient import TestClient
+
+import layab._json
+import layab.starlette
+
+BASE_SCHEMA = {"openapi": "3.0.0", "info": {"title": "My API.", "version": "1.0.0"}}
+
+
+@pytest.fixture
+def server_environment():
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    yield "test"
+    os.environ.pop("SERVER_ENVIRONMENT", None)
+
+
+def get_item(request):
+    """
+    responses:
+      200:
+        description: Item.
+    """
+    return PlainTextResponse("")
+
+
+def _app(openapi: layab.starlette.OpenAPIEndpoint) -> Starlette:
+    app = Starlette()
+
+    @app.route("/items")
+    def get_items(request):
+        """
+        responses:
+          200:
+            description: Items.
+        """
+        return PlainTextResponse("")
+
+    app.add_route("/openapi.json", openapi, methods=["GET"], include_in_schema=False)
+    return app
+
+
+def test_openapi_definition(server_environment):
+    client = TestClient(_app(layab.starlette.OpenAPIEndpoint(BASE_SCHEMA)))
+    response = client.get("/openapi.json", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["cache-control"] == "no-cache"
+    assert "content-encoding" not in response.headers
+    assert response.json() == {
+        "openapi": "3.0.0",
+        "info": {
+            "title": "My API.",
+            "version": "1.0.0",
+            "x-server-environment": "test",
+        },
+        "paths": {"/items": {"get": {"responses": {"200": {"description": "Items."}}}}},
+    }
+
+
+def test_provided_server_environment_is_kept(server_environment):
+    openapi = layab.starlette.OpenAPIEndpoint(
+        {"openapi": "3.0.0", "info": {"x-server-environment": "provided"}}
+    )
+    assert openapi.schema([])["info"] == {"x-server-environment": "provided"}
+
+
+def test_conditional_request():
+    client = TestClient(_app(layab.starlette.OpenAPIEndpoint(BASE_SCHEMA)))
+    response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/openapi.json", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_definition_is_generated_once(monkeypatch):
+    openapi = layab.starlette.OpenAPIEndpoint(BASE_SCHEMA)
+    app = _app(openapi)
+    openapi.generate(app.routes)
+
+    def fail(content):
+        raise AssertionError("Definition should not be serialized again")
+
+    monkeypatch.setattr(layab._json, "dumps", fail)
+    client = TestClient(app)
+    assert client.get("/openapi.json").status_code == 200
+    assert client.get("/openapi.json").status_code == 200
+
+
+def test_definition_written_at_build_time(tmp_path):
+    schema_file = str(tmp_path / "openapi.json")
+    openapi = layab.starlette.OpenAPIEndpoint(BASE_SCHEMA, schema_file=schema_file)
+    openapi.write_schema(_app(openapi).routes, schema_file)
+    with open(schema_file) as written:
+        assert "/items" in json.load(written)["paths"]
+
+    with open(schema_file, "w") as written:
+        json.dump({"openapi": "3.0.0", "paths": {}}, written)
+    client = TestClient(_app(openapi))
+    response = client.get("/openapi.json")
+    assert response.json() == {
+        "openapi": "3.0.0",
+        "paths": {},
+    }
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_precompressed_definition_is_not_compressed_again(fused):
+    app = Starlette(middleware=layab.starlette.middleware(compress=True, fused=fused))
+    for index in range(200):
+        app.add_route(f"/items{index}", get_item)
+    app.add_route(
+        "/openapi.json",
+        layab.starlette.OpenAPIEndpoint(BASE_SCHEMA),
+        methods=["GET"],
+        include_in_schema=False,
+    )
+
+    response = TestClient(app).get(
+        "/openapi.json", headers={"Accept-Encoding": "gzip, deflate, br"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["paths"]) == 200
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_other_responses_are_still_compressed(fused):
+    app = Starlette(middleware=layab.starlette.middleware(compress=True, fused=fused))
+    app.add_route("/text", lambda request: PlainTextResponse("text" * 200))
+
+    response = TestClient(app).get("/text", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "text" * 200
@@ -1,5 +1,11 @@
+import array
+import datetime
+
 import pytest
 from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Mount, NoMatchFound, Router
 from starlette.testclient import TestClient
 
 import layab.starlette
@@ -37,3 +43,115 @@ def test_standard_post_response_with_reverse_proxy(client):
         response.headers["location"]
         == "http://localhost/reverse/standard_responses?id=42"
     )
+
+
+@pytest.fixture
+def url_client():
+    items = Router()
+
+    @items.route("/{item_id:int}")
+    def get_item(request):
+        return PlainTextResponse("")
+
+    app = Starlette(routes=[Mount("/items", app=items, name="items")])
+    urls = layab.starlette.URLBuilder(app)
+
+    @app.route("/links")
+    def links(request):
+        return JSONResponse(
+            {
+                "item": urls.url_for(request, "items:get_item", item_id=42),
+                "links": urls.url_for(request, "links"),
+            }
+        )
+
+    @app.route("/unknown")
+    def unknown(request):
+        return PlainTextResponse(urls.url_for(request, "missing"))
+
+    return TestClient(app)
+
+
+def test_url_for_without_reverse_proxy(url_client):
+    response = url_client.get("/links")
+    assert response.json() == {
+        "item": "http://testserver/items/42",
+        "links": "http://testserver/links",
+    }
+
+
+def test_url_for_with_reverse_proxy(url_client):
+    response = url_client.get(
+        "/links",
+        headers={"X-Original-Request-Uri": "/reverse/links", "Host": "localhost"},
+    )
+    assert response.json() == {
+        "item": "http://localhost/reverse/items/42",
+        "links": "http://localhost/reverse/links",
+    }
+
+
+def test_url_for_unknown_route(url_client):
+    with pytest.raises(NoMatchFound):
+        url_client.get("/unknown")
+
+
+def test_url_for_missing_path_parameter():
+    app = Starlette()
+
+    @app.route("/items/{item_id}")
+    def get_item(request):
+        return PlainTextResponse("")
+
+    request = Request(
+        {
+            "type": "http",
+            "scheme": "https",
+            "path": "/",
+            "headers": [],
+            "server": ("my_server", 8443),
+        }
+    )
+    urls = layab.starlette.URLBuilder(app)
+    assert (
+        urls.url_for(request, "get_item", item_id="a b")
+        == "https://my_server:8443/items/a b"
+    )
+    with pytest.raises(NoMatchFound):
+        urls.url_for(request, "get_item")
+
+
+def test_fast_json_response():
+    app = Starlette()
+
+    @app.route("/json")
+    def json_content(request):
+        return layab.starlette.FastJSONResponse(
+            {"date": datetime.date(2020, 10, 9)}, status_code=202
+        )
+
+    @app.route("/bytes")
+    def bytes_content(request):
+        return layab.starlette.FastJSONResponse(memoryview(b'{"already":"serialized"}'))
+
+    client = TestClient(app)
+    response = client.get("/json")
+    assert response.status_code == 202
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"date": "2020-10-09"}
+    response = client.get("/bytes")
+    assert response.headers["content-length"] == "24"
+    assert response.json() == {"already": "serialized"}
+
+
+def test_fast_json_response_memoryview_of_multi_bytes_items():
+    content = array.array("i", b'{"already":"serialized"}')
+    app = Starlette()
+
+    @app.route("/ints")
+    def ints_content(request):
+        return layab.starlette.FastJSONResponse(memoryview(content))
+
+    response = TestClient(app).get("/ints")
+    assert response.headers["content-length"] == "24"
+    assert response.json() == {"already": "serialized"}
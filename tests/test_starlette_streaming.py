@@ -0,0 +1,130 @@
+import asyncio
+import datetime
+import json
+
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+import layab.starlette
+
+
+def test_ndjson_from_sync_rows():
+    app = Starlette()
+
+    @app.route("/export")
+    def export(request):
+        return layab.starlette.NDJSONStreamingResponse(
+            ({"id": index} for index in range(1000)), chunk_size=100
+        )
+
+    response = TestClient(app).get("/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": index} for index in range(1000)
+    ]
+
+
+def test_ndjson_from_async_rows():
+    app = Starlette()
+
+    async def rows():
+        for index in range(1000):
+            await asyncio.sleep(0)
+            yield {"id": index}
+
+    @app.route("/export")
+    def export(request):
+        return layab.starlette.NDJSONStreamingResponse(rows(), chunk_size=100)
+
+    response = TestClient(app).get("/export")
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": index} for index in range(1000)
+    ]
+
+
+def test_ndjson_rows_are_serialized_as_json_responses():
+    row = {"date": datetime.datetime(2020, 1, 1), "name": "é"}
+    app = Starlette()
+
+    @app.route("/export")
+    def export(request):
+        return layab.starlette.NDJSONStreamingResponse([row])
+
+    response = TestClient(app).get("/export")
+    assert response.content == layab.starlette.FastJSONResponse(row).body + b"\n"
+    assert response.json() == {"date": "2020-01-01T00:00:00", "name": "é"}
+
+
+def test_csv_with_fieldnames():
+    app = Starlette()
+
+    @app.route("/export")
+    def export(request):
+        return layab.starlette.CSVStreamingResponse(
+            [{"id": 1, "name": "first, name"}, {"id": 2, "name": "second"}],
+            fieldnames=["id", "name"],
+        )
+
+    response = TestClient(app).get("/export")
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.text == 'id,name\r\n1,"first, name"\r\n2,second\r\n'
+
+
+def test_empty_csv():
+    app = Starlette()
+
+    @app.route("/export")
+    def export(request):
+        return layab.starlette.CSVStreamingResponse([])
+
+    assert TestClient(app).get("/export").text == ""
+
+
+def test_rows_are_serialized_once_previous_chunk_is_sent():
+    serialized = []
+    sent = []
+    app = Starlette()
+
+    def rows():
+        for index in range(3):
+            serialized.append(index)
+            # Only the previous chunk must be sent
+            assert len(sent) == index
+            yield [index]
+
+    @app.route("/export")
+    def export(request):
+        return layab.starlette.CSVStreamingResponse(rows(), chunk_size=1)
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message["body"]:
+            sent.append(message["body"])
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/export",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+    }
+    asyncio.new_event_loop().run_until_complete(app(scope, receive, send))
+    assert sent == [b"0\r\n", b"1\r\n", b"2\r\n"]
+
+
+def test_streamed_rows_are_compressed():
+    app = Starlette(middleware=layab.starlette.middleware(compress=True))
+
+    @app.route("/export")
+    def export(request):
+        return layab.starlette.CSVStreamingResponse(
+            ([index, "value"] for index in range(10000)), chunk_size=1024
+        )
+
+    response = TestClient(app).get("/export", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "".join(f"{index},value\r\n" for index in range(10000))
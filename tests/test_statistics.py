@@ -0,0 +1,99 @@
+import logging
+
+import layab._statistics
+from layab._statistics import RequestStatistics, request_id
+
+
+class FlatStatistics(RequestStatistics):
+    __slots__ = ()
+    flat = True
+    end_status = "success"
+
+
+def _statistics(statistics_class) -> RequestStatistics:
+    return statistics_class(
+        method="GET",
+        path="/items/1",
+        request_id="1-2-3-4-5",
+        args=[("param", "1"), ("param", "2")],
+        headers=[("Host", "localhost")],
+        route="GET /items/<id>",
+        path_params={"id": "1"},
+    )
+
+
+def test_request_id(monkeypatch):
+    class UUIDMock:
+        @staticmethod
+        def uuid4():
+            return "1-2-3-4-5"
+
+    monkeypatch.setattr(layab._statistics, "uuid", UUIDMock)
+    assert request_id(None) == "1-2-3-4-5"
+    assert request_id("provided") == "provided"
+    assert request_id("provided", chained=True) == "provided,1-2-3-4-5"
+
+
+def test_nested_records(caplog):
+    caplog.set_level(logging.INFO)
+    statistics = _statistics(RequestStatistics)
+    with statistics.timings.measure("db"):
+        pass
+    statistics.success(200, response_bytes=2)
+
+    start, end = (record.msg for record in caplog.records)
+    assert start == {
+        "request": {
+            "url.path": "/items/1",
+            "method": "GET",
+            "id": "1-2-3-4-5",
+            "args": {"param": ["1", "2"]},
+            "headers": {"Host": "localhost"},
+            "status": "start",
+        }
+    }
+    assert end["request"].pop("processing_time") >= 0
+    assert list(end["request"].pop("timing")) == ["db"]
+    assert end == {
+        "request": {
+            **start["request"],
+            "status": "end",
+            "status_code": 200,
+            "response_bytes": 2,
+        }
+    }
+    assert statistics.request_id == "1-2-3-4-5"
+
+
+def test_flat_records(caplog):
+    caplog.set_level(logging.INFO)
+    statistics = _statistics(FlatStatistics)
+    with statistics.timings.measure("db"):
+        pass
+    try:
+        raise ValueError("Error message")
+    except ValueError as e:
+        statistics.exception_occurred(e, b"body", timed_out=False)
+
+    start, end = (record.msg for record in caplog.records)
+    assert start == {
+        "request_url.path": "/items/1",
+        "request_method": "GET",
+        "request_id": "1-2-3-4-5",
+        "request_path.id": "1",
+        "request_args.param": "2",
+        "request_headers.Host": "localhost",
+        "request_status": "start",
+    }
+    assert end.pop("request_processing_time") >= 0
+    assert end.pop("request_timing.db") >= 0
+    assert "ValueError: Error message" in end.pop("error.traceback")
+    assert end == {
+        **start,
+        "request_status": "error",
+        "request_timed_out": False,
+        "request.data": b"body",
+        "error.class": "ValueError",
+        "error.msg": "Error message",
+    }
+    assert statistics.request_id == "1-2-3-4-5"
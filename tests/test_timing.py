@@ -0,0 +1,20 @@
+from layab._timing import Timings
+
+
+def test_phases_are_summed():
+    timings = Timings()
+    timings.add("db", 0.001)
+    timings.add("render", 0.002)
+    timings.add("db", 0.003)
+    assert timings.phases == {"db": 0.004, "render": 0.002}
+    assert (
+        timings.server_timing(0.01)
+        == "db;dur=4.000, render;dur=2.000, total;dur=10.000"
+    )
+
+
+def test_measure():
+    timings = Timings()
+    with timings.measure("db"):
+        pass
+    assert timings.phases["db"] >= 0
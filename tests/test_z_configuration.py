@@ -1,11 +1,14 @@
+import logging
 import os
 import os.path
 import tempfile
+import threading
 
 import pytest
 import yaml
 
 import layab
+from layab._configuration import _load_yaml
 
 # This file is named with a test_z prefix to ensure the logging configuration do not interfere with caplog fixture in other test files
 
@@ -231,3 +234,260 @@ def test_configurations_with_unsafe_code_can_be_loaded(remove_server_environment
         assert {"section_test": {"key": "value"}} == layab.load(
             os.path.join(server_folder, "server.py"), logging_loader=yaml.UnsafeLoader
         )
+
+
+def test_parsed_configuration_is_cached(remove_server_environment, monkeypatch):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configuration_folder = _add_dir(tmp_dir, "configuration")
+        cache_folder = os.path.join(tmp_dir, "cache")
+        _add_file(
+            configuration_folder,
+            "configuration_test.yml",
+            "section_test:",
+            "  key: value",
+        )
+        assert {"section_test": {"key": "value"}} == layab.load_configuration(
+            configuration_folder, cache_folder
+        )
+        assert len(os.listdir(cache_folder)) == 1
+
+        def fail(*args):
+            raise AssertionError("YAML should not be parsed")
+
+        monkeypatch.setattr(yaml, "load", fail)
+        assert {"section_test": {"key": "value"}} == layab.load_configuration(
+            configuration_folder, cache_folder
+        )
+
+
+def test_cached_configuration_is_parsed_again_once_modified(
+    remove_server_environment,
+):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configuration_folder = _add_dir(tmp_dir, "configuration")
+        cache_folder = os.path.join(tmp_dir, "cache")
+        _add_file(
+            configuration_folder,
+            "configuration_test.yml",
+            "section_test:",
+            "  key: value",
+        )
+        assert {"section_test": {"key": "value"}} == layab.load_configuration(
+            configuration_folder, cache_folder
+        )
+        _add_file(
+            configuration_folder,
+            "configuration_test.yml",
+            "section_test:",
+            "  key: other value",
+        )
+        assert {"section_test": {"key": "other value"}} == layab.load_configuration(
+            configuration_folder, cache_folder
+        )
+
+
+def test_corrupted_cache_is_ignored(remove_server_environment):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configuration_folder = _add_dir(tmp_dir, "configuration")
+        cache_folder = _add_dir(tmp_dir, "cache")
+        _add_file(
+            configuration_folder,
+            "configuration_test.yml",
+            "section_test:",
+            "  key: value",
+        )
+        layab.load_configuration(configuration_folder, cache_folder)
+        for cache_file in os.listdir(cache_folder):
+            _add_file(cache_folder, cache_file, "not a pickle")
+        assert {"section_test": {"key": "value"}} == layab.load_configuration(
+            configuration_folder, cache_folder
+        )
+
+
+class _LockLoader(yaml.SafeLoader):
+    """Loader providing objects that cannot be pickled."""
+
+
+_LockLoader.add_constructor("!lock", lambda loader, node: threading.Lock())
+
+
+def test_content_that_cannot_be_cached_is_provided():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_folder = _add_dir(tmp_dir, "cache")
+        _add_file(tmp_dir, "configuration.yml", "lock: !lock")
+        content = _load_yaml(
+            os.path.join(tmp_dir, "configuration.yml"), _LockLoader, cache_folder
+        )
+        assert isinstance(content["lock"], type(threading.Lock()))
+        # Partially written cache file is removed
+        assert os.listdir(cache_folder) == []
+
+
+def _value_loader(module: str, value: int) -> type:
+    loader = type("Loader", (yaml.SafeLoader,), {"__module__": module})
+    loader.add_constructor("!value", lambda loader, node: value)
+    return loader
+
+
+def test_loaders_with_the_same_name_do_not_share_cache():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_folder = _add_dir(tmp_dir, "cache")
+        _add_file(tmp_dir, "configuration.yml", "key: !value")
+        file_path = os.path.join(tmp_dir, "configuration.yml")
+        assert _load_yaml(file_path, _value_loader("first", 1), cache_folder) == {
+            "key": 1
+        }
+        assert _load_yaml(file_path, _value_loader("second", 2), cache_folder) == {
+            "key": 2
+        }
+
+
+def _add_logging_file(folder: str, level: str) -> None:
+    _add_file(
+        folder,
+        "logging_test.yml",
+        "version: 1",
+        "disable_existing_loggers: false",
+        "root:",
+        f"  level: {level}",
+    )
+
+
+def test_watcher_loads_configurations(remove_server_environment):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _add_file(tmp_dir, "configuration_test.yml", "section_test:", "  key: value")
+        _add_logging_file(tmp_dir, "ERROR")
+        watcher = layab.ConfigurationWatcher(tmp_dir)
+        assert watcher.configuration == {"section_test": {"key": "value"}}
+        assert logging.getLogger().level == logging.ERROR
+        assert not watcher.check()
+
+
+def test_watcher_reloads_modified_configurations(remove_server_environment):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _add_file(tmp_dir, "configuration_test.yml", "section_test:", "  key: value")
+        _add_logging_file(tmp_dir, "ERROR")
+        watcher = layab.ConfigurationWatcher(tmp_dir)
+        previous = watcher.configuration
+        notified = []
+        watcher.subscribe(notified.append)
+
+        _add_file(
+            tmp_dir, "configuration_test.yml", "section_test:", "  key: other value"
+        )
+        _add_logging_file(tmp_dir, "DEBUG")
+        assert watcher.check()
+        assert watcher.configuration == {"section_test": {"key": "other value"}}
+        assert notified == [watcher.configuration]
+        assert logging.getLogger().level == logging.DEBUG
+        # Configuration is replaced, not modified
+        assert previous == {"section_test": {"key": "value"}}
+
+
+def test_watcher_keeps_previous_configuration_if_invalid(remove_server_environment):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _add_file(tmp_dir, "configuration_test.yml", "section_test:", "  key: value")
+        watcher = layab.ConfigurationWatcher(tmp_dir)
+        notified = []
+        watcher.subscribe(notified.append)
+
+        _add_file(tmp_dir, "configuration_test.yml", "section_test: [invalid")
+        assert not watcher.check()
+        assert watcher.configuration == {"section_test": {"key": "value"}}
+        assert not notified
+
+
+def test_watcher_keeps_previous_configuration_if_emptied_or_removed(
+    remove_server_environment,
+):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _add_file(tmp_dir, "configuration_test.yml", "section_test:", "  key: value")
+        watcher = layab.ConfigurationWatcher(tmp_dir)
+        notified = []
+        watcher.subscribe(notified.append)
+
+        # Truncated file
+        _add_file(tmp_dir, "configuration_test.yml")
+        assert not watcher.check()
+        assert watcher.configuration == {"section_test": {"key": "value"}}
+
+        os.remove(os.path.join(tmp_dir, "configuration_test.yml"))
+        assert not watcher.check()
+        assert watcher.configuration == {"section_test": {"key": "value"}}
+        assert not notified
+
+        # Restored file is reloaded
+        _add_file(
+            tmp_dir, "configuration_test.yml", "section_test:", "  key: other value"
+        )
+        assert watcher.check()
+        assert notified == [{"section_test": {"key": "other value"}}]
+
+
+def test_watcher_keeps_previous_logging_configuration_if_emptied_or_removed(
+    remove_server_environment,
+):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _add_file(tmp_dir, "configuration_test.yml", "section_test:", "  key: value")
+        _add_logging_file(tmp_dir, "ERROR")
+        watcher = layab.ConfigurationWatcher(tmp_dir)
+
+        _add_file(tmp_dir, "logging_test.yml")
+        watcher.check()
+        assert logging.getLogger().level == logging.ERROR
+
+        os.remove(os.path.join(tmp_dir, "logging_test.yml"))
+        watcher.check()
+        assert logging.getLogger().level == logging.ERROR
+
+        _add_logging_file(tmp_dir, "DEBUG")
+        watcher.check()
+        assert logging.getLogger().level == logging.DEBUG
+
+
+def test_watcher_failing_subscriber_does_not_prevent_reload(
+    remove_server_environment,
+):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _add_file(tmp_dir, "configuration_test.yml", "section_test:", "  key: value")
+        watcher = layab.ConfigurationWatcher(tmp_dir)
+        notified = []
+
+        @watcher.subscribe
+        def failing(configuration):
+            raise Exception("Subscriber failure")
+
+        watcher.subscribe(notified.append)
+
+        _add_file(
+            tmp_dir, "configuration_test.yml", "section_test:", "  key: other value"
+        )
+        assert watcher.check()
+        assert notified == [{"section_test": {"key": "other value"}}]
+
+
+def test_watcher_reloads_in_background(remove_server_environment):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _add_file(tmp_dir, "configuration_test.yml", "section_test:", "  key: value")
+        watcher = layab.ConfigurationWatcher(tmp_dir, interval=0.01)
+        reloaded = threading.Event()
+        watcher.subscribe(lambda configuration: reloaded.set())
+        watcher.start()
+        try:
+            _add_file(
+                tmp_dir, "configuration_test.yml", "section_test:", "  key: other value"
+            )
+            assert reloaded.wait(5)
+            assert watcher.configuration == {"section_test": {"key": "other value"}}
+        finally:
+            watcher.stop()
@@ -0,0 +1,124 @@
+import gc
+import logging
+import logging.handlers
+import os
+import tempfile
+
+import pytest
+
+import layab
+from layab._prefork import _freeze
+
+# This file is named with a test_z prefix to ensure the logging configuration do not interfere with caplog fixture in other test files
+
+
+@pytest.fixture
+def remove_server_environment():
+    yield 1
+    os.environ.pop("SERVER_ENVIRONMENT", None)
+
+
+def _add_file(folder: str, file_name: str, *lines) -> None:
+    with open(os.path.join(folder, file_name), "w") as config_file:
+        config_file.writelines("\n".join(lines))
+
+
+def test_freeze_provides_read_only_configuration():
+    frozen = _freeze({"section": {"key": "value", "values": [1, {"nested": 2}]}})
+    assert frozen["section"]["key"] == "value"
+    assert frozen["section"]["values"] == (1, {"nested": 2})
+    with pytest.raises(TypeError):
+        frozen["section"]["key"] = "other value"
+    with pytest.raises(TypeError):
+        frozen["section"]["values"][1]["nested"] = 3
+
+
+def test_preload_loads_frozen_configuration(remove_server_environment):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configuration_folder = os.path.join(tmp_dir, "configuration")
+        os.makedirs(configuration_folder)
+        os.makedirs(os.path.join(tmp_dir, "my_server"))
+        _add_file(
+            configuration_folder,
+            "configuration_test.yml",
+            "section_test:",
+            "  key: value",
+        )
+        configuration = layab.preload(os.path.join(tmp_dir, "my_server", "server.py"))
+        try:
+            assert configuration == {"section_test": {"key": "value"}}
+            with pytest.raises(TypeError):
+                configuration["section_test"]["key"] = "other value"
+            assert gc.get_freeze_count() > 0
+        finally:
+            gc.unfreeze()
+
+
+def test_reinitialize_logging_handlers_reopens_files_and_sockets():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_handler = logging.FileHandler(os.path.join(tmp_dir, "test.log"))
+        socket_handler = logging.handlers.DatagramHandler("localhost", 9999)
+        socket_handler.sock = socket_handler.makeSocket()
+        logger = logging.getLogger("layab.test_prefork")
+        logger.addHandler(file_handler)
+        logger.addHandler(socket_handler)
+        try:
+            stream = file_handler.stream
+            sock = socket_handler.sock
+            layab.reinitialize_logging_handlers()
+            assert stream.closed
+            assert file_handler.stream is None
+            assert sock.fileno() == -1
+            assert socket_handler.sock is None
+
+            logger.removeHandler(socket_handler)
+            logger.warning("reopened")
+            file_handler.flush()
+            with open(os.path.join(tmp_dir, "test.log")) as log_file:
+                assert log_file.read() == "reopened\n"
+        finally:
+            logger.removeHandler(file_handler)
+            logger.removeHandler(socket_handler)
+            file_handler.close()
+            socket_handler.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+def test_forked_process_reopens_log_files(remove_server_environment):
+    os.environ["SERVER_ENVIRONMENT"] = "test"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configuration_folder = os.path.join(tmp_dir, "configuration")
+        os.makedirs(configuration_folder)
+        os.makedirs(os.path.join(tmp_dir, "my_server"))
+        log_file_path = os.path.join(tmp_dir, "server.log")
+        _add_file(
+            configuration_folder,
+            "logging_test.yml",
+            "version: 1",
+            "disable_existing_loggers: false",
+            "handlers:",
+            "  file:",
+            "    class: logging.FileHandler",
+            f"    filename: {log_file_path}",
+            "loggers:",
+            "  layab.test_prefork_fork:",
+            "    level: INFO",
+            "    handlers: [file]",
+        )
+        layab.preload(os.path.join(tmp_dir, "my_server", "server.py"), freeze_gc=False)
+        logger = logging.getLogger("layab.test_prefork_fork")
+        logger.info("master")
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                logger.info("worker")
+                logging.shutdown()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        logger.handlers[0].close()
+
+        with open(log_file_path) as log_file:
+            assert log_file.read().splitlines() == ["master", "worker"]